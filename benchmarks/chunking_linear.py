@@ -0,0 +1,110 @@
+"""
+Chunk Construction Benchmark
+
+Compares the original chunk_text overlap construction (list.insert(0, ...)
+and re-splitting sentences on every pass) with the linear-time
+chunk_sentences engine on a multi-megabyte synthetic article, and checks
+that both produce byte-identical chunks.
+
+Sentence segmentation is the same for both and is excluded from timing.
+
+Usage:
+    python benchmarks/chunking_linear.py --megabytes 4 --max-words 200 --overlap-words 50
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "ingestion-api"))
+from chunking import chunk_sentences
+
+def legacy_chunk_sentences(sentences, max_words=200, overlap_words=50):
+    """The original chunk_text loop, kept verbatim as the reference"""
+    chunks = []
+    current_chunk = []
+    current_length = 0
+
+    i = 0
+    while i < len(sentences):
+        sentence = sentences[i]
+        sentence_length = len(sentence.split())
+
+        if current_length + sentence_length <= max_words:
+            current_chunk.append(sentence)
+            current_length += sentence_length
+            i += 1
+        else:
+            chunks.append(" ".join(current_chunk))
+
+            overlap = []
+            overlap_len = 0
+            j = len(current_chunk) - 1
+
+            while j >= 0 and overlap_len < overlap_words:
+                s = current_chunk[j]
+                overlap.insert(0, s)
+                overlap_len += len(s.split())
+                j -= 1
+
+            current_chunk = overlap
+            current_length = overlap_len
+
+    if current_chunk:
+        chunks.append(" ".join(current_chunk))
+
+    return chunks
+
+def synthetic_article(megabytes, seed=42):
+    """Prose-like text: sentences of 3-30 words drawn from a fixed vocabulary"""
+    rng = random.Random(seed)
+    vocabulary = (
+        "database vector index query embedding table column row chunk model "
+        "search retrieval agent answer context document page sentence token "
+        "the a of to and in is for with on by as from that this are be"
+    ).split()
+    target = int(megabytes * 1024 * 1024)
+    sentences, size = [], 0
+    while size < target:
+        words = [rng.choice(vocabulary) for _ in range(rng.randint(3, 30))]
+        sentence = " ".join(words).capitalize() + rng.choice([".", ".", ".", "?", "!"])
+        sentences.append(sentence)
+        size += len(sentence) + 1
+    return " ".join(sentences)
+
+def time_call(func, *args, repeat=3):
+    """Best wall time of several runs, and the last result"""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chunk construction")
+    parser.add_argument("--megabytes", type=float, default=4.0)
+    parser.add_argument("--max-words", type=int, default=200)
+    parser.add_argument("--overlap-words", type=int, default=50)
+    args = parser.parse_args()
+
+    article = synthetic_article(args.megabytes)
+    sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", article) if s.strip()]
+    print(f"Article: {len(article) / 1024 / 1024:.1f} MB, {len(sentences):,} sentences")
+
+    legacy_seconds, legacy = time_call(legacy_chunk_sentences, sentences, args.max_words, args.overlap_words)
+    linear_seconds, linear = time_call(chunk_sentences, sentences, args.max_words, args.overlap_words)
+
+    identical = "\n".join(legacy).encode() == "\n".join(linear).encode() and len(legacy) == len(linear)
+    print(f"legacy:  {legacy_seconds:.3f}s  ({len(legacy):,} chunks)")
+    print(f"linear:  {linear_seconds:.3f}s  ({len(linear):,} chunks)")
+    print(f"speedup: {legacy_seconds / linear_seconds:.1f}x")
+    print(f"byte-identical output: {identical}")
+    if not identical:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+DB2 Bulk Insert Benchmark
+
+Compares the ingestion write paths for chunk rows: DB2VS.add_texts (the
+current path), one INSERT per row, and the bulk writer's array-bound
+executemany at several batch sizes. Each path appends --rows chunks in
+writes of --write-size chunks, as the batch pipeline does. "bulk retried"
+repeats every write, so each batch hits the duplicate key error and
+replaces its rows the way a retried, partly committed write does.
+
+By default a local stand-in for DB2 is used: SQLite behind a DB-API wrapper
+that translates the DB2-specific SQL, raises errors the way ibm_db_dbi
+does and charges --rtt-ms per statement round trip (execute or executemany
+call), with the probe embedding DB2VS computes costing --probe-ms. Pass --db2 to write to the database configured
+by the DB_* settings instead (tables BENCH_BULK_* are dropped afterwards).
+
+Usage:
+    python benchmarks/db2_bulk_insert.py --rows 10000 --write-size 500
+    python benchmarks/db2_bulk_insert.py --db2 --rows 20000 --batch-sizes 500 1000 5000
+"""
+
+import argparse
+import json
+import random
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+import ibm_db_dbi
+from dotenv import load_dotenv
+
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent.parent / "ingestion-api"))
+from langchain_core.embeddings import Embeddings
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_db2.db2vs import DB2VS
+from rag_common.embeddings import PrecomputedEmbeddings
+from bulk_writer import BulkWriter, vector_literal, row_id
+
+# ============================================================================
+# DB2 STAND-IN
+# ============================================================================
+
+TRANSLATIONS = [
+    (re.compile(r"VECTOR\(\?, \d+, FLOAT32\)", re.IGNORECASE), "?"),
+    (re.compile(r"SYSTOOLS\.JSON2BSON\(\?\)", re.IGNORECASE), "?"),
+    (re.compile(r"VECTOR\(\d+, FLOAT32\)", re.IGNORECASE), "BLOB"),
+    (re.compile(r"SELECT COUNT\(\*\) FROM SYSCAT\.TABLES\s+WHERE TABNAME = \? AND TABSCHEMA = CURRENT SCHEMA", re.IGNORECASE),
+     "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND upper(name) = ?"),
+]
+
+def duplicate_key_error(error):
+    """A primary key violation as the DB2 driver reports it"""
+    return ibm_db_dbi.Error(
+        f"[IBM][CLI Driver][DB2/LINUXX8664] SQL0803N  One or more values in the INSERT statement "
+        f"are not valid because they would produce duplicate rows ({error}).  SQLSTATE=23505"
+    )
+
+class StandInCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.cursor = connection.sqlite.cursor()
+
+    def _round_trip(self):
+        self.connection.round_trips += 1
+        time.sleep(self.connection.rtt)
+
+    def _sql(self, sql):
+        for pattern, replacement in TRANSLATIONS:
+            sql = pattern.sub(replacement, sql)
+        return sql
+
+    def execute(self, sql, params=()):
+        self._round_trip()
+        if sql.strip().upper() == "COMMIT":
+            self.connection.sqlite.commit()
+            return
+        try:
+            self.cursor.execute(self._sql(sql), params)
+        except sqlite3.OperationalError as e:
+            if "no such table" in str(e):
+                raise Exception(f"SQL0204N {e}")
+            raise
+        except sqlite3.IntegrityError as e:
+            raise duplicate_key_error(e)
+
+    def executemany(self, sql, rows):
+        self._round_trip()
+        try:
+            self.cursor.executemany(self._sql(sql), rows)
+        except sqlite3.IntegrityError as e:
+            # ibm_db_dbi's executemany re-raises driver failures as a plain Error
+            raise duplicate_key_error(e)
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def close(self):
+        self.cursor.close()
+
+class StandInConnection:
+    """SQLite with DB2VS's SQL translated and a simulated network round trip per statement"""
+
+    def __init__(self, rtt_ms):
+        self.sqlite = sqlite3.connect(":memory:", check_same_thread=False)
+        self.rtt = rtt_ms / 1000
+        self.round_trips = 0
+
+    def cursor(self):
+        return StandInCursor(self)
+
+    def commit(self):
+        self.cursor().execute("COMMIT")
+
+    def rollback(self):
+        self.sqlite.rollback()
+
+class ProbeModel(Embeddings):
+    """Fallback model behind PrecomputedEmbeddings; only DB2VS's dimension probe reaches it"""
+
+    def __init__(self, dim, probe_ms):
+        self.dim = dim
+        self.probe_ms = probe_ms
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        time.sleep(self.probe_ms / 1000)
+        return [0.0] * self.dim
+
+# ============================================================================
+# WRITE PATHS
+# ============================================================================
+
+def table_exists(connection, table_name):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT COUNT(*) FROM SYSCAT.TABLES WHERE TABNAME = ? AND TABSCHEMA = CURRENT SCHEMA", (table_name.upper(),)
+        )
+        return cursor.fetchone()[0] > 0
+    finally:
+        cursor.close()
+
+def write_db2vs(connection, table_name, chunks, vectors, metadatas, fallback):
+    """The current write_chunks path"""
+    embeddings = PrecomputedEmbeddings(chunks, vectors, fallback=fallback)
+    if table_exists(connection, table_name):
+        DB2VS(client=connection, table_name=table_name, embedding_function=embeddings).add_texts(
+            texts=chunks, metadatas=metadatas
+        )
+    else:
+        DB2VS.from_texts(
+            texts=chunks, embedding=embeddings, metadatas=metadatas, client=connection,
+            table_name=table_name, distance_strategy=DistanceStrategy.EUCLIDEAN_DISTANCE,
+        )
+
+def write_row_by_row(connection, table_name, chunks, vectors, metadatas, writer):
+    """One INSERT statement (and round trip) per row, one commit per write"""
+    if not table_exists(connection, table_name):
+        writer.create_table(connection, table_name, len(vectors[0]))
+    cursor = connection.cursor()
+    try:
+        for chunk, vector, metadata in zip(chunks, vectors, metadatas):
+            cursor.execute(
+                f"INSERT INTO {table_name} (id, embedding, metadata, text) "
+                f"VALUES (?, VECTOR(?, {len(vector)}, FLOAT32), SYSTOOLS.JSON2BSON(?), ?)",
+                (row_id(metadata), vector_literal(vector), json.dumps(metadata), chunk),
+            )
+        connection.commit()
+    finally:
+        cursor.close()
+
+def write_bulk(connection, table_name, chunks, vectors, metadatas, writer):
+    """The bulk writer, as write_chunks uses it"""
+    if not table_exists(connection, table_name):
+        writer.create_table(connection, table_name, len(vectors[0]))
+    writer.write(connection, table_name, chunks, vectors, metadatas)
+
+def write_bulk_retried(connection, table_name, chunks, vectors, metadatas, writer):
+    """The bulk writer retrying each write after it committed, so every batch replaces its rows"""
+    write_bulk(connection, table_name, chunks, vectors, metadatas, writer)
+    writer.write(connection, table_name, chunks, vectors, metadatas)
+
+def drop(connection, table_name):
+    if table_exists(connection, table_name):
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"DROP TABLE {table_name}")
+            connection.commit()
+        finally:
+            cursor.close()
+
+def run(connection, table_name, write, rows, write_size, dim):
+    rng = random.Random(7)
+    drop(connection, table_name)
+    stand_in = isinstance(connection, StandInConnection)
+    round_trips = connection.round_trips if stand_in else 0
+    seconds = 0.0
+    for start in range(0, rows, write_size):
+        count = min(write_size, rows - start)
+        chunks = [f"chunk {start + i} " + " ".join(rng.choice("abcdefgh") * 5 for _ in range(40)) for i in range(count)]
+        vectors = [[rng.uniform(-1, 1) for _ in range(dim)] for _ in range(count)]
+        metadatas = [{"id": f"bench#{start + i}", "source": "benchmark"} for i in range(count)]
+        started = time.perf_counter()
+        write(connection, table_name, chunks, vectors, metadatas)
+        seconds += time.perf_counter() - started
+    trips = connection.round_trips - round_trips if stand_in else None
+    drop(connection, table_name)
+    return seconds, trips
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DB2 vector insert paths")
+    parser.add_argument("--rows", type=int, default=10000, help="Chunks to write per path")
+    parser.add_argument("--write-size", type=int, default=500, help="Chunks per write (the pipeline's write_batch_size)")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[50, 200, 1000], help="Bulk writer batch sizes")
+    parser.add_argument("--dim", type=int, default=384, help="Vector dimension")
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="Stand-in round trip per statement")
+    parser.add_argument("--probe-ms", type=float, default=0.2, help="Stand-in cost of DB2VS's probe embedding (a cache hit)")
+    parser.add_argument("--skip-row-by-row", action="store_true", help="Leave out the one-INSERT-per-row path")
+    parser.add_argument("--db2", action="store_true", help="Use the DB2 database from the DB_* settings")
+    args = parser.parse_args()
+
+    if args.db2:
+        load_dotenv(Path(__file__).parent.parent / ".env")
+        from rag_common.db_pool import connect
+        connection = connect()
+    else:
+        connection = StandInConnection(args.rtt_ms)
+    fallback = ProbeModel(args.dim, args.probe_ms)
+
+    paths = [("DB2VS.add_texts", lambda *a: write_db2vs(*a, fallback))]
+    if not args.skip_row_by_row:
+        paths.append(("row by row", lambda *a: write_row_by_row(*a, BulkWriter())))
+    for batch_size in args.batch_sizes:
+        paths.append((f"bulk batch={batch_size}", lambda *a, writer=BulkWriter(batch_size): write_bulk(*a, writer)))
+    retry_writer = BulkWriter(args.batch_sizes[-1])
+    paths.append(("bulk retried", lambda *a: write_bulk_retried(*a, retry_writer)))
+
+    print(f"{args.rows} rows of dim {args.dim} in writes of {args.write_size} "
+          f"({'DB2' if args.db2 else f'stand-in, {args.rtt_ms:g} ms round trip'})")
+    print(f"{'path':>18} {'rows/s':>9} {'ms/write':>9} {'round trips':>12}")
+    writes = -(-args.rows // args.write_size)
+    for i, (label, write) in enumerate(paths):
+        seconds, trips = run(connection, f"BENCH_BULK_{i}", write, args.rows, args.write_size, args.dim)
+        print(f"{label:>18} {args.rows / seconds:>9.0f} {1000 * seconds / writes:>9.1f} {trips if trips is not None else '-':>12}")
+    print(f"bulk retried: {retry_writer.stats()['rows_replaced']} rows replaced on retry")
+
+if __name__ == "__main__":
+    main()
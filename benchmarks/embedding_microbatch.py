@@ -0,0 +1,97 @@
+"""
+Embedding Micro-Batching Benchmark
+
+Simulates many concurrent single-query embedding requests (as produced by
+concurrent searches) and compares throughput and latency for different
+max_batch_size / max_wait_ms settings.
+
+By default a synthetic model with a fixed per-call cost plus a per-text
+cost stands in for llama.cpp; pass --model-path to use a real GGUF model.
+
+Usage:
+    python benchmarks/embedding_microbatch.py --clients 32 --requests 20
+    python benchmarks/embedding_microbatch.py --model-path models/granite-embedding-30m-english-Q6_K.gguf
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from rag_common.embedding_service import MicroBatchingEmbeddings
+
+class SyntheticModel:
+    """Stand-in model: each call costs call_ms plus text_ms per text"""
+
+    def __init__(self, call_ms=8.0, text_ms=0.5, dim=384):
+        self.call_ms = call_ms
+        self.text_ms = text_ms
+        self.dim = dim
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            time.sleep((self.call_ms + self.text_ms * len(texts)) / 1000)
+        return [[0.0] * self.dim for _ in texts]
+
+def run(embedder, clients, requests_per_client):
+    """Each client thread embeds requests_per_client queries back to back"""
+    latencies = []
+    lock = threading.Lock()
+
+    def client(client_id):
+        for i in range(requests_per_client):
+            started = time.perf_counter()
+            embedder.embed_documents([f"query {client_id}-{i}"])
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(clients)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": 1000 * statistics.median(latencies),
+        "p95_ms": 1000 * latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding micro-batching")
+    parser.add_argument("--model-path", help="GGUF model to use instead of the synthetic model")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent callers")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per caller")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--wait-ms", type=float, nargs="+", default=[0, 2, 5, 10])
+    args = parser.parse_args()
+
+    if args.model_path:
+        from rag_common.embeddings import registry
+        model = registry.get(args.model_path)
+        model.embed_query("warm up")
+    else:
+        model = SyntheticModel()
+
+    baseline = run(model, args.clients, args.requests)
+    print(f"{'setting':>24} {'emb/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    print(f"{'unbatched':>24} {baseline['throughput']:>9.1f} {baseline['p50_ms']:>8.1f} {baseline['p95_ms']:>8.1f}")
+
+    for batch_size in args.batch_sizes:
+        for wait_ms in args.wait_ms:
+            embedder = MicroBatchingEmbeddings(model, max_batch_size=batch_size, max_wait_ms=wait_ms)
+            result = run(embedder, args.clients, args.requests)
+            stats = embedder.stats()
+            label = f"batch={batch_size} wait={wait_ms:g}ms"
+            print(
+                f"{label:>24} {result['throughput']:>9.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f}"
+                f"   avg batch {stats['avg_batch_texts']:.1f}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Sentence Segmentation Benchmark
+
+Compares the chunker's sentence segmentation backends (full spaCy parser,
+sentencizer-only spaCy pipeline, pure regex) on throughput and on how well
+their sentence boundaries and final chunks agree with the parser, which is
+the reference.
+
+Text comes from --file / --url if given, otherwise a synthetic article with
+abbreviations, quotes, numbers and paragraph breaks.
+
+Usage:
+    python benchmarks/segmentation.py --kilobytes 512
+    python benchmarks/segmentation.py --url https://www.ibm.com/think/topics/vector-database
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "ingestion-api"))
+from chunking import SEGMENTERS, load_pipeline, split_sentences, chunk_sentences
+
+TEMPLATES = [
+    "The {noun} stores every {noun} as a {adj} vector.",
+    "Dr. Smith said the {noun} was {adj}, e.g. for {noun} workloads.",
+    "Version 11.5.9 added a {adj} {noun}; it is {num}% faster.",
+    "\"Why is the {noun} so {adj}?\" the {noun} team asked.",
+    "Results (see Table {num}) show a {adj} {noun}.",
+    "Is the {noun} {adj}? Yes! It handles {num} queries per second.",
+    "In the U.S. most {noun} deployments use a {adj} {noun}.",
+]
+WORDS = {
+    "noun": "database index query embedding table model agent chunk page document".split(),
+    "adj": "fast large sparse dense vector relational hybrid small".split(),
+}
+
+class _Filler(dict):
+    """Fills template slots with random words"""
+
+    def __init__(self, rng):
+        super().__init__()
+        self.rng = rng
+
+    def __missing__(self, key):
+        if key == "num":
+            return str(self.rng.randint(1, 99))
+        return self.rng.choice(WORDS[key])
+
+def synthetic_article(kilobytes, seed=7):
+    """Prose with the punctuation patterns that trip up rule-based splitters"""
+    rng = random.Random(seed)
+    target = int(kilobytes * 1024)
+    paragraphs, size = [], 0
+    while size < target:
+        sentences = []
+        for _ in range(rng.randint(3, 8)):
+            template = rng.choice(TEMPLATES)
+            sentences.append(template.format_map(_Filler(rng)))
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+def load_text(args):
+    if args.file:
+        return "\n\n".join(Path(f).read_text(encoding="utf-8") for f in args.file)
+    if args.url:
+        import trafilatura
+        return trafilatura.extract(trafilatura.fetch_url(args.url)) or ""
+    return synthetic_article(args.kilobytes)
+
+def boundary_offsets(text, sentences):
+    """Character offsets where each sentence ends in the original text"""
+    offsets, cursor = set(), 0
+    for sentence in sentences:
+        position = text.find(sentence, cursor)
+        if position < 0:
+            continue
+        cursor = position + len(sentence)
+        offsets.add(cursor)
+    return offsets
+
+def time_split(text, segmenter, repeat):
+    """Best wall time of several runs, and the last result"""
+    best, sentences = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        sentences = split_sentences(text, segmenter)
+        best = min(best, time.perf_counter() - started)
+    return best, sentences
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sentence segmentation backends")
+    parser.add_argument("--file", nargs="+", help="Text files to segment")
+    parser.add_argument("--url", help="Page to fetch and extract with trafilatura")
+    parser.add_argument("--kilobytes", type=float, default=256.0, help="Size of the synthetic article")
+    parser.add_argument("--max-words", type=int, default=200)
+    parser.add_argument("--overlap-words", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    text = load_text(args)
+    if not text:
+        sys.exit("No text to segment")
+    print(f"Text: {len(text) / 1024:.0f} KB")
+
+    # Pipeline loading is a one-off per process, keep it out of the timings
+    for segmenter in SEGMENTERS:
+        if segmenter != "regex":
+            load_pipeline(segmenter)
+
+    results = {segmenter: time_split(text, segmenter, args.repeat) for segmenter in SEGMENTERS}
+    reference_sentences = results["parser"][1]
+    reference_bounds = boundary_offsets(text, reference_sentences)
+    reference_chunks = chunk_sentences(reference_sentences, args.max_words, args.overlap_words)
+
+    print(f"{'segmenter':>12} {'seconds':>8} {'KB/s':>9} {'speedup':>8} {'sentences':>10} "
+          f"{'precision':>10} {'recall':>7} {'same chunks':>12}")
+    for segmenter, (seconds, sentences) in results.items():
+        bounds = boundary_offsets(text, sentences)
+        matched = len(bounds & reference_bounds)
+        precision = matched / len(bounds) if bounds else 0.0
+        recall = matched / len(reference_bounds) if reference_bounds else 0.0
+
+        chunks = chunk_sentences(sentences, args.max_words, args.overlap_words)
+        same_chunks = len(set(chunks) & set(reference_chunks)) / len(reference_chunks) if reference_chunks else 0.0
+
+        print(f"{segmenter:>12} {seconds:>8.3f} {len(text) / 1024 / seconds:>9.0f} "
+              f"{results['parser'][0] / seconds:>7.1f}x {len(sentences):>10,} "
+              f"{precision:>10.3f} {recall:>7.3f} {same_chunks:>11.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,9 @@ Single FastAPI application that includes both ingestion and search functionality
 
 import sys
 from pathlib import Path
+from typing import Literal
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, HttpUrl
 
 # Add parent directory to path to import sibling modules
 parent_dir = Path(__file__).parent.parent
@@ -21,6 +22,11 @@ try:
     
     from ingestion_api import app as ingestion_app
     from search_api import app as search_app
+    # Both services share one DB2 pool and embedding registry in this process
+    from rag_common.db_pool import all_pool_stats
+    from rag_common.embeddings import registry as embedding_registry
+    from rag_common.embedding_service import all_service_stats
+    from rag_common.embedding_cache import cache_stats
     SERVICES_AVAILABLE = True
 except ImportError as e:
     print(f"Warning: Could not import child APIs: {e}")
@@ -39,11 +45,59 @@ app = FastAPI(
 # MODELS
 # ============================================================================
 
+# Request models mirror ingestion-api's, constraints included (defaults target AI_KNOWLEDGE)
+
 class IngestRequest(BaseModel):
-    url: str
+    url: HttpUrl
+    table_name: str = "AI_KNOWLEDGE"
+    max_words: int = 200
+    overlap_words: int = 50
+    segmenter: Literal["parser", "sentencizer", "regex"] | None = None  # default: CHUNK_SEGMENTER
+    chunk_by: Literal["words", "tokens"] = "words"
+    max_tokens: int | None = Field(default=None, ge=8, description="Token budget per chunk when chunk_by='tokens' (default and cap: the embedding model's limit)")
+    overlap_tokens: int = Field(default=64, ge=0, description="Token overlap between chunks when chunk_by='tokens'")
+    skip_duplicates: bool = True
+    force: bool = False
+
+class BatchIngestRequest(BaseModel):
+    urls: list[HttpUrl] = []
+    sitemap_url: HttpUrl | None = None
+    table_name: str = "AI_KNOWLEDGE"
+    max_words: int = 200
+    overlap_words: int = 50
+    segmenter: Literal["parser", "sentencizer", "regex"] | None = None
+    chunk_by: Literal["words", "tokens"] = "words"
+    max_tokens: int | None = Field(default=None, ge=8, description="Token budget per chunk when chunk_by='tokens' (default and cap: the embedding model's limit)")
+    overlap_tokens: int = Field(default=64, ge=0, description="Token overlap between chunks when chunk_by='tokens'")
+    skip_duplicates: bool = True
+    force: bool = False
+    max_concurrency: int = Field(default=8, ge=1, le=64, description="URLs processed at once")
+    write_batch_size: int = Field(default=500, ge=1, description="Chunks per DB2 write")
+    chunk_batch_size: int | None = Field(default=None, ge=1, description="Articles per nlp.pipe batch (default: CHUNK_PIPE_BATCH_SIZE)")
+    chunk_processes: int | None = Field(default=None, ge=1, description="spaCy worker processes (default: CHUNK_PIPE_PROCESSES)")
+
+class CrawlRequest(BatchIngestRequest):
+    max_pages: int = Field(default=100, ge=1, le=100_000, description="Pages to ingest at most")
+    max_depth: int = Field(default=2, ge=0, description="Link hops from a seed or sitemap page")
+    allowed_hosts: list[str] = []
+    path_prefix: str | None = None
+    respect_robots: bool = True
+
+class FileIngestRequest(BaseModel):
+    paths: list[str]
     table_name: str = "AI_KNOWLEDGE"
     max_words: int = 200
     overlap_words: int = 50
+    segmenter: Literal["parser", "sentencizer", "regex"] | None = None
+    chunk_by: Literal["words", "tokens"] = "words"
+    max_tokens: int | None = Field(default=None, ge=8, description="Token budget per chunk when chunk_by='tokens' (default and cap: the embedding model's limit)")
+    overlap_tokens: int = Field(default=64, ge=0, description="Token overlap between chunks when chunk_by='tokens'")
+    skip_duplicates: bool = True
+    force: bool = False
+    max_concurrency: int = Field(default=8, ge=1, le=64, description="Documents processed at once")
+    write_batch_size: int = Field(default=500, ge=1, description="Chunks per DB2 write")
+    chunk_batch_size: int | None = Field(default=None, ge=1, description="Articles per nlp.pipe batch (default: CHUNK_PIPE_BATCH_SIZE)")
+    chunk_processes: int | None = Field(default=None, ge=1, description="spaCy worker processes (default: CHUNK_PIPE_PROCESSES)")
 
 class SearchRequest(BaseModel):
     query: str
@@ -73,12 +127,12 @@ async def root():
     return {
         "service": "All-in-One RAG API",
         "status": status,
-        "endpoints": ["/ingest", "/search", "/clear", "/health"]
+        "endpoints": ["/ingest", "/ingest/batch", "/ingest/crawl", "/ingest/files", "/jobs/{job_id}", "/search", "/search/stream", "/clear", "/health"]
     }
 
 @app.post("/ingest")
 async def ingest(request: IngestRequest):
-    """Ingest document from URL"""
+    """Queue a document URL for ingestion; returns a job id"""
     if not SERVICES_AVAILABLE:
         raise HTTPException(status_code=503, detail="Ingestion service not available")
     
@@ -87,6 +141,46 @@ async def ingest(request: IngestRequest):
     from ingestion_api import ingest_document
     return await ingest_document(request)
 
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Report progress of a queued ingestion job"""
+    if not SERVICES_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Ingestion service not available")
+    
+    sys.path.append(str(parent_dir / "ingestion-api"))
+    from ingestion_api import get_job
+    return await get_job(job_id)
+
+@app.post("/ingest/batch")
+async def ingest_batch(request: BatchIngestRequest):
+    """Ingest many URLs and/or a sitemap concurrently"""
+    if not SERVICES_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Ingestion service not available")
+    
+    sys.path.append(str(parent_dir / "ingestion-api"))
+    from ingestion_api import ingest_batch
+    return await ingest_batch(request)
+
+@app.post("/ingest/crawl")
+async def ingest_crawl(request: CrawlRequest):
+    """Crawl a site from seed URLs and/or a sitemap, following in-scope links"""
+    if not SERVICES_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Ingestion service not available")
+    
+    sys.path.append(str(parent_dir / "ingestion-api"))
+    from ingestion_api import ingest_crawl
+    return await ingest_crawl(request)
+
+@app.post("/ingest/files")
+async def ingest_files(request: FileIngestRequest):
+    """Ingest local files, directories, tarballs and WARC files"""
+    if not SERVICES_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Ingestion service not available")
+    
+    sys.path.append(str(parent_dir / "ingestion-api"))
+    from ingestion_api import ingest_files
+    return await ingest_files(request)
+
 @app.post("/search")
 async def search(request: SearchRequest):
     """Search documents using Agentic RAG"""
@@ -98,6 +192,16 @@ async def search(request: SearchRequest):
     from search_api import search
     return await search(request)
 
+@app.post("/search/stream")
+async def search_stream(request: SearchRequest):
+    """Stream agent progress and answer tokens as Server-Sent Events"""
+    if not SERVICES_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Search service not available")
+    
+    sys.path.append(str(parent_dir / "search-api"))
+    from search_api import search_stream
+    return await search_stream(request)
+
 @app.post("/clear")
 async def clear_table(request: ClearRequest):
     """Clear/delete a vector database table"""
@@ -148,7 +252,11 @@ async def health():
     return {
         "status": status,
         "services": services,
-        "mode": "all-in-one"
+        "mode": "all-in-one",
+        "database_pools": all_pool_stats(),
+        "embedding_models": embedding_registry.stats(),
+        "embedding_services": all_service_stats(),
+        "embedding_cache": cache_stats()
     }
 
 # ============================================================================
@@ -165,14 +273,14 @@ async def list_services():
         "services": {
             "ingestion": {
                 "mounted_at": "/internal/ingestion",
-                "endpoints": ["POST /ingest", "POST /clear", "GET /health"]
+                "endpoints": ["POST /ingest", "POST /ingest/batch", "POST /ingest/crawl", "POST /ingest/files", "GET /jobs/{job_id}", "POST /clear", "GET /health"]
             },
             "search": {
                 "mounted_at": "/internal/search", 
-                "endpoints": ["POST /search", "GET /health"]
+                "endpoints": ["POST /search", "POST /search/stream", "GET /health"]
             }
         },
-        "unified_endpoints": ["/ingest", "/search", "/clear", "/health"]
+        "unified_endpoints": ["/ingest", "/ingest/batch", "/ingest/crawl", "/ingest/files", "/jobs/{job_id}", "/search", "/search/stream", "/clear", "/health"]
     }
 
 # ============================================================================
@@ -183,6 +291,15 @@ async def list_services():
 async def startup_event():
     """Initialize embedded services on startup"""
     if SERVICES_AVAILABLE:
+        # Mounted apps don't receive startup events, so start ingestion job workers here
+        try:
+            sys.path.append(str(parent_dir / "ingestion-api"))
+            from ingestion_api import startup_event as ingestion_startup
+            await ingestion_startup()
+            print("Ingestion service initialized successfully")
+        except Exception as e:
+            print(f"Warning: Failed to initialize ingestion service: {e}")
+        
         try:
             # Initialize search service components
             sys.path.append(str(parent_dir / "search-api"))
@@ -192,6 +309,14 @@ async def startup_event():
         except Exception as e:
             print(f"Warning: Failed to initialize search service: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop embedded ingestion job workers"""
+    if SERVICES_AVAILABLE:
+        sys.path.append(str(parent_dir / "ingestion-api"))
+        from ingestion_api import shutdown_event as ingestion_shutdown
+        await ingestion_shutdown()
+
 if __name__ == "__main__":
     import uvicorn
     print("Starting All-in-One RAG API...")
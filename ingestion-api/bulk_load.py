@@ -0,0 +1,351 @@
+"""
+Offline Bulk Loader
+
+First-time builds of large vector tables at LOAD speed instead of INSERT speed.
+
+stage:   documents from local files, directories and archives (see
+         local_files.py) are extracted, chunked and embedded, and their rows
+         (id, text, metadata, vector) are written to a DB2 DEL staging file,
+         with a manifest and the per-document records kept by the service
+         (chunk SimHash signatures included). Vectors skip the persistent
+         embedding cache unless --embedding-cache is given.
+load:    the file is LOADed (NONRECOVERABLE) into a staging table of plain
+         text columns, moved into a new table with the DB2VS layout by one
+         set-based INSERT ... SELECT that converts metadata to BSON and
+         vectors to VECTOR (not logged), and only then is the primary key
+         index built and RUNSTATS run. The document records are saved so
+         later ingestion through the API is incremental, and the chunk
+         signatures go into the near-duplicate index.
+records: save the records and signatures after a --client-script load.
+
+LOAD runs through SYSPROC.ADMIN_CMD, so the DB2 server must be able to read
+the staging file. When it cannot, --client-script writes the same steps as
+a CLP script using LOAD CLIENT, to run with `db2 -tvf` where the file is.
+
+Usage:
+    python bulk_load.py stage corpus/ dumps/wiki.tar.gz --out /data/build/docs.del
+    python bulk_load.py load /data/build/docs.del --table DOCS_EUCLIDEAN
+    python bulk_load.py load /data/build/docs.del --table DOCS_EUCLIDEAN --client-script load.clp
+    python bulk_load.py records /data/build/docs.del --table DOCS_EUCLIDEAN
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import wait
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Same settings and shared components as the service, without the service itself
+parent_dir = Path(__file__).parent.parent
+load_dotenv(parent_dir / ".env")
+sys.path.append(str(parent_dir))
+from rag_common.db_pool import get_pool
+from bulk_writer import vector_literal
+from chunking import chunk_config, chunk_texts
+from dedup import get_signature_index, simhash
+from documents import DocumentStore, ChunkPlan, content_hash, chunk_metadatas, db2_chunk_id, document_store_path
+from embedding_model import get_tokenizer, token_budget, embed_chunks
+from extraction import get_extraction_pool, close_extraction_pool, extract_article, ExtractionError, ExtractionTimeout
+from local_files import LocalSources, UnreadableFile, decode_text, markdown_to_text, pdf_to_text, HTML, MARKDOWN, PDF
+from tables import table_exists, drop_table, drop_vector_table, invalidate_cached_answers
+
+# Longest value DB2 accepts inline in a DEL file for a LOB column
+MAX_INLINE_BYTES = 32700
+
+# ============================================================================
+# STAGE
+# ============================================================================
+
+def del_field(value):
+    """A character field of a DEL file: double-quoted, inner quotes doubled"""
+    return '"' + value.replace("\x00", "").replace('"', '""') + '"'
+
+def document_text(document, future=None):
+    """Text of a local document; HTML is extracted in the pool (future already submitted)"""
+    if document.kind == HTML:
+        return future.result() if future is not None else extract_article(document.data)
+    if document.kind == PDF:
+        return pdf_to_text(document.data)
+    if document.kind == MARKDOWN:
+        return markdown_to_text(decode_text(document.data))
+    return decode_text(document.data)
+
+def document_texts(documents, pool):
+    """(document, text) for the documents text could be extracted from; HTML pages in parallel"""
+    futures = {}
+    if pool is not None:
+        futures = {i: pool.executor.submit(pool.extract, d.data) for i, d in enumerate(documents) if d.kind == HTML}
+        wait(futures.values())
+    texts = []
+    for i, document in enumerate(documents):
+        try:
+            text = document_text(document, futures.get(i))
+        except (ExtractionTimeout, ExtractionError, UnreadableFile) as e:
+            print(f"Skipping {document.source}: {str(e)}")
+            continue
+        if text and text.strip():
+            texts.append((document, text))
+    return texts
+
+def stage(args):
+    """Extract, chunk and embed documents into a DEL staging file"""
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    max_tokens = token_budget(args.chunk_by, args.max_tokens)
+    tokenizer = get_tokenizer() if max_tokens else None
+    config = chunk_config(args.max_words, args.overlap_words, args.segmenter, max_tokens, args.overlap_tokens)
+    sources = LocalSources(args.paths, int(args.max_mb * 1024 * 1024))
+    pool = get_extraction_pool()
+    seen = set()
+    counts = {"documents": 0, "rows": 0, "rows_too_long": 0}
+    dimension = None
+    started = time.perf_counter()
+
+    def flush(batch, rows_file, records_file):
+        nonlocal dimension
+        texts = document_texts(batch, pool)
+        chunked = chunk_texts(
+            [text for _, text in texts], args.max_words, args.overlap_words, args.segmenter,
+            args.chunk_batch_size, args.chunk_processes, tokenizer, max_tokens, args.overlap_tokens
+        )
+        pages = []
+        for (document, text), chunks in zip(texts, chunked):
+            plan = ChunkPlan(document.source)
+            chunks, raw_ids = plan.split(chunks)
+            if chunks:
+                pages.append((document, text, plan, chunks, raw_ids))
+        vectors = iter(embed_chunks([chunk for *_, chunks, _ in pages for chunk in chunks], cached=args.embedding_cache))
+
+        for document, text, plan, chunks, raw_ids in pages:
+            stored_chunks, stored_ids, signatures = [], [], []
+            for chunk, raw_id, metadata in zip(chunks, raw_ids, chunk_metadatas(document.source, raw_ids)):
+                vector = next(vectors)
+                dimension = dimension or len(vector)
+                fields = [db2_chunk_id(raw_id), chunk, json.dumps(metadata), vector_literal(vector)]
+                if max(len(field.encode("utf-8")) for field in fields) > MAX_INLINE_BYTES:
+                    counts["rows_too_long"] += 1
+                    continue
+                stored_chunks.append(chunk)
+                stored_ids.append(raw_id)
+                signatures.append(simhash(chunk))
+                rows_file.write(",".join(del_field(field) for field in fields) + "\n")
+            # Signatures go in the records; load adds them to the duplicate index
+            plan.add_stored(stored_chunks, stored_ids, signatures)
+            counts["documents"] += 1
+            counts["rows"] += len(stored_chunks)
+            records_file.write(json.dumps({
+                "url": document.source,
+                "validators": {"etag": None, "last_modified": document.modified},
+                "content_hash": content_hash(text),
+                "chunks": plan.entries(),
+            }) + "\n")
+
+    records_path = out.with_suffix(out.suffix + ".documents.jsonl")
+    with open(out, "w", encoding="utf-8", newline="\n") as rows_file, open(records_path, "w", encoding="utf-8") as records_file:
+        batch = []
+        for document in sources:
+            if document.source in seen:
+                continue
+            seen.add(document.source)
+            batch.append(document)
+            if len(batch) >= args.batch_documents:
+                flush(batch, rows_file, records_file)
+                batch = []
+                elapsed = time.perf_counter() - started
+                print(f"Staged {counts['documents']} documents, {counts['rows']} rows ({counts['rows'] / elapsed:.0f} rows/s)")
+        if batch:
+            flush(batch, rows_file, records_file)
+    close_extraction_pool()
+
+    manifest = {
+        "rows": counts["rows"],
+        "documents": counts["documents"],
+        "dimension": dimension,
+        "chunk_config": config,
+        "records": records_path.name,
+        "sources": sources.counters,
+        "rows_too_long": counts["rows_too_long"],
+    }
+    out.with_suffix(out.suffix + ".json").write_text(json.dumps(manifest, indent=2))
+    elapsed = time.perf_counter() - started
+    print(f"Staged {counts['rows']} rows from {counts['documents']} documents in {elapsed:.1f}s -> {out}")
+    if counts["rows_too_long"]:
+        print(f"Left out {counts['rows_too_long']} rows with a field over {MAX_INLINE_BYTES} bytes")
+
+# ============================================================================
+# LOAD
+# ============================================================================
+
+def read_manifest(path):
+    manifest_path = Path(str(path) + ".json")
+    if not manifest_path.exists():
+        raise SystemExit(f"No manifest next to {path} (expected {manifest_path}); run stage first")
+    return json.loads(manifest_path.read_text())
+
+def load_steps(path, table_name, dimension, client=False):
+    """The load as (kind, statement) steps: "sql", "command" (a LOAD/RUNSTATS utility) or "commit"
+
+    The table is created without its primary key and NOT LOGGED INITIALLY;
+    activating that for the INSERT ... SELECT keeps the move out of the
+    log, and it must share a unit of work with the INSERT.
+    """
+    stage_table = f"{table_name}_STAGE"
+    messages = "" if client else "MESSAGES ON SERVER "
+    return [
+        ("sql", f"CREATE TABLE {stage_table} (id CHAR(16) NOT NULL, text CLOB(1M), metadata CLOB(1M), embedding CLOB(1M))"),
+        ("commit", None),
+        ("command", f"LOAD {'CLIENT ' if client else ''}FROM {Path(path).resolve()} OF DEL MODIFIED BY CODEPAGE=1208 DELPRIORITYCHAR "
+                    f"{messages}REPLACE INTO {stage_table} (id, text, metadata, embedding) NONRECOVERABLE"),
+        ("sql", f"CREATE TABLE {table_name} (id CHAR(16) NOT NULL, text CLOB, metadata BLOB, "
+                f"embedding VECTOR({dimension}, FLOAT32)) NOT LOGGED INITIALLY"),
+        ("commit", None),
+        ("sql", f"ALTER TABLE {table_name} ACTIVATE NOT LOGGED INITIALLY"),
+        ("sql", f"INSERT INTO {table_name} (id, text, metadata, embedding) "
+                f"SELECT id, text, SYSTOOLS.JSON2BSON(metadata), VECTOR(CAST(embedding AS VARCHAR(32672)), {dimension}, FLOAT32) "
+                f"FROM {stage_table}"),
+        ("commit", None),
+        # The DB2VS layout's only index, built once over the loaded rows
+        ("sql", f"ALTER TABLE {table_name} ADD PRIMARY KEY (id)"),
+        ("commit", None),
+        ("command", f"RUNSTATS ON TABLE {table_name} WITH DISTRIBUTION AND INDEXES ALL"),
+        ("sql", f"DROP TABLE {stage_table}"),
+        ("commit", None),
+    ]
+
+def run_steps(connection, steps):
+    cursor = connection.cursor()
+    try:
+        for kind, statement in steps:
+            if kind == "commit":
+                connection.commit()
+                continue
+            print(f"{statement[:120]}{'...' if len(statement) > 120 else ''}")
+            started = time.perf_counter()
+            if kind == "command":
+                cursor.execute("CALL SYSPROC.ADMIN_CMD(?)", (statement,))
+                if statement.startswith("LOAD") and cursor.description:
+                    row = cursor.fetchone()
+                    result = dict(zip([column[0].upper() for column in cursor.description], row or ()))
+                    print(f"  read {result.get('ROWS_READ')}, loaded {result.get('ROWS_LOADED')}, "
+                          f"rejected {result.get('ROWS_REJECTED')}")
+            else:
+                cursor.execute(statement)
+            print(f"  {time.perf_counter() - started:.1f}s")
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def write_script(path, steps):
+    """The steps as a CLP script for `db2 -tvf` (after `db2 connect to ...`)"""
+    lines = ["UPDATE COMMAND OPTIONS USING C OFF;"]
+    lines += ["COMMIT;" if kind == "commit" else f"{statement};" for kind, statement in steps]
+    Path(path).write_text("\n".join(lines) + "\n")
+
+def save_records(path, table_name, manifest):
+    """Save the staged documents' records, and their chunk signatures to the duplicate index
+
+    Re-ingesting the documents through the API is then incremental, and
+    chunks ingested later are checked for near duplicates of the loaded ones.
+    """
+    records_path = Path(path).parent / manifest["records"]
+    document_store = DocumentStore(document_store_path())
+    index = get_signature_index()
+    saved = 0
+
+    def save(batch):
+        document_store.save_many(table_name, batch, manifest["chunk_config"])
+        if index is not None:
+            index.add(table_name, [
+                entry["signature"] for record in batch for entry in record["chunks"] if entry["signature"] is not None
+            ])
+
+    with open(records_path, encoding="utf-8") as records_file:
+        batch = []
+        for line in records_file:
+            batch.append(json.loads(line))
+            if len(batch) >= 1000:
+                save(batch)
+                saved += len(batch)
+                batch = []
+        if batch:
+            save(batch)
+            saved += len(batch)
+    invalidate_cached_answers(table_name)
+    print(f"Saved records of {saved} documents for '{table_name}'")
+
+def load(args):
+    """LOAD a staging file into a new DB2VS-layout table, then index it"""
+    manifest = read_manifest(args.file)
+    if not manifest["rows"]:
+        raise SystemExit("The staging file has no rows")
+    steps = load_steps(args.file, args.table, manifest["dimension"], client=bool(args.client_script))
+    if args.client_script:
+        write_script(args.client_script, steps)
+        print(f"Wrote {args.client_script}; run it with `db2 -tvf {args.client_script}` on a machine with the staging file, "
+              f"then `python bulk_load.py records {args.file} --table {args.table}`")
+        return
+
+    with get_pool().connection() as connection:
+        if table_exists(connection, args.table) and not args.replace:
+            raise SystemExit(f"Table '{args.table}' exists; pass --replace to drop it first")
+        if table_exists(connection, f"{args.table}_STAGE"):
+            drop_table(connection, f"{args.table}_STAGE")
+        if args.replace:
+            drop_vector_table(connection, args.table, DocumentStore(document_store_path()))
+
+    started = time.perf_counter()
+    with get_pool().connection() as connection:
+        run_steps(connection, steps)
+    elapsed = time.perf_counter() - started
+    print(f"Loaded {manifest['rows']} rows into '{args.table}' in {elapsed:.1f}s ({manifest['rows'] / elapsed:.0f} rows/s)")
+    save_records(args.file, args.table, manifest)
+
+def records(args):
+    save_records(args.file, args.table, read_manifest(args.file))
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline bulk loader for initial vector table builds")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    stage_parser = commands.add_parser("stage", help="Extract, chunk and embed local documents into a DEL file")
+    stage_parser.add_argument("paths", nargs="+", help="Files, directories, tarballs, zip and WARC files")
+    stage_parser.add_argument("--out", required=True, help="Staging file to write")
+    stage_parser.add_argument("--max-words", type=int, default=200)
+    stage_parser.add_argument("--overlap-words", type=int, default=50)
+    stage_parser.add_argument("--segmenter", choices=["parser", "sentencizer", "regex"], default=None)
+    stage_parser.add_argument("--chunk-by", choices=["words", "tokens"], default="words")
+    stage_parser.add_argument("--max-tokens", type=int, default=None)
+    stage_parser.add_argument("--overlap-tokens", type=int, default=64)
+    stage_parser.add_argument("--batch-documents", type=int, default=64, help="Documents extracted, chunked and embedded together")
+    stage_parser.add_argument("--chunk-batch-size", type=int, default=None, help="Articles per nlp.pipe batch")
+    stage_parser.add_argument("--chunk-processes", type=int, default=None, help="spaCy worker processes")
+    stage_parser.add_argument("--max-mb", type=float, default=50, help="Larger documents are skipped")
+    stage_parser.add_argument("--embedding-cache", action="store_true",
+                              help="Look up and store vectors in the persistent embedding cache (a corpus build only churns it)")
+    stage_parser.set_defaults(run=stage)
+
+    load_parser = commands.add_parser("load", help="LOAD a staging file into a new table and index it")
+    load_parser.add_argument("file", help="Staging file written by stage")
+    load_parser.add_argument("--table", required=True)
+    load_parser.add_argument("--replace", action="store_true", help="Drop the table first if it exists")
+    load_parser.add_argument("--client-script", help="Write a CLP script (LOAD CLIENT) here instead of loading")
+    load_parser.set_defaults(run=load)
+
+    records_parser = commands.add_parser("records", help="Save document records after a --client-script load")
+    records_parser.add_argument("file", help="Staging file written by stage")
+    records_parser.add_argument("--table", required=True)
+    records_parser.set_defaults(run=records)
+
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == "__main__":
+    main()
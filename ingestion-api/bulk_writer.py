@@ -0,0 +1,139 @@
+"""
+Bulk DB2 Vector Writer
+
+Writes chunk rows (id, text, metadata, embedding) straight to a vector table
+with parameter-array inserts: rows are bound in batches of batch_size, each
+batch is one executemany and one commit. Compared with DB2VS.add_texts this
+skips the probe embedding DB2VS computes (twice per write) to learn the
+vector dimension and the SELECT COUNT(*) it runs on the table to see whether
+it exists, and it bounds the size of each transaction.
+
+Tables have the layout DB2VS creates and row ids are derived the same way,
+so tables written here are searched through DB2VS as before.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+import ibm_db_dbi
+from documents import db2_chunk_id
+
+def vector_literal(vector):
+    """Text form of a vector for VECTOR(?, n, FLOAT32); 9 significant digits round-trip FLOAT32"""
+    return "[" + ",".join([format(value, ".9g") for value in vector]) + "]"
+
+def row_id(metadata):
+    """Row id of a chunk, as DB2VS derives it: hashed metadata "id", or a random one"""
+    raw_id = metadata.get("id") if metadata else None
+    return db2_chunk_id(raw_id if raw_id is not None else str(uuid.uuid4()))
+
+def is_duplicate_key(error):
+    """Whether a driver error is a primary key violation (SQL0803N, SQLSTATE 23505)
+
+    ibm_db_dbi's executemany re-raises every failure as a plain ibm_db_dbi.Error,
+    so the message is checked rather than the exception class.
+    """
+    message = str(error)
+    return "SQL0803N" in message or "SQLSTATE=23505" in message
+
+class BulkWriter:
+    """Array-bound inserts into DB2VS-layout vector tables, one transaction per batch"""
+
+    def __init__(self, batch_size=1000, text_field="text"):
+        self.batch_size = batch_size
+        self.text_field = text_field
+        self._lock = threading.Lock()
+        self._metrics = {"writes": 0, "rows": 0, "batches": 0, "rows_replaced": 0, "seconds": 0.0}
+
+    def create_table(self, connection, table_name, dimension):
+        """Create a vector table with the columns DB2VS uses"""
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"""
+                CREATE TABLE {table_name} (
+                    id CHAR(16) PRIMARY KEY NOT NULL,
+                    {self.text_field} CLOB,
+                    metadata BLOB,
+                    embedding VECTOR({dimension}, FLOAT32)
+                )
+            """)
+            connection.commit()
+        finally:
+            cursor.close()
+
+    def write(self, connection, table_name, chunks, vectors, metadatas=None):
+        """Insert chunks with their vectors; returns the row ids
+
+        Each batch commits on its own. A batch that hits rows left behind by
+        an earlier, partly committed write replaces them, so retrying a
+        failed write is safe.
+        """
+        if not chunks:
+            return []
+        started = time.perf_counter()
+        metadatas = metadatas or [{} for _ in chunks]
+        dimension = len(vectors[0])
+        insert = (
+            f"INSERT INTO {table_name} (id, embedding, metadata, {self.text_field}) "
+            f"VALUES (?, VECTOR(?, {dimension}, FLOAT32), SYSTOOLS.JSON2BSON(?), ?)"
+        )
+        rows = [
+            (row_id(metadata), vector_literal(vector), json.dumps(metadata), chunk)
+            for chunk, vector, metadata in zip(chunks, vectors, metadatas)
+        ]
+
+        batches = replaced = 0
+        cursor = connection.cursor()
+        try:
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start:start + self.batch_size]
+                try:
+                    cursor.executemany(insert, batch)
+                except ibm_db_dbi.Error as e:
+                    if not is_duplicate_key(e):
+                        raise
+                    connection.rollback()
+                    cursor.executemany(f"DELETE FROM {table_name} WHERE id = ?", [(row[0],) for row in batch])
+                    cursor.executemany(insert, batch)
+                    replaced += len(batch)
+                connection.commit()
+                batches += 1
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+        with self._lock:
+            self._metrics["writes"] += 1
+            self._metrics["rows"] += len(rows)
+            self._metrics["batches"] += batches
+            self._metrics["rows_replaced"] += replaced
+            self._metrics["seconds"] += time.perf_counter() - started
+        return [row[0] for row in rows]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._metrics)
+        stats["batch_size"] = self.batch_size
+        stats["rows_per_second"] = round(stats["rows"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+        return stats
+
+# ============================================================================
+# PROCESS-WIDE WRITER
+# ============================================================================
+
+_writer = None
+_lock = threading.Lock()
+
+def get_bulk_writer():
+    """Return the process-wide bulk writer, or None if DB2_BULK_WRITE=false (write through DB2VS)"""
+    global _writer
+    if os.getenv("DB2_BULK_WRITE", "true").lower() in ("0", "false", "no"):
+        return None
+    with _lock:
+        if _writer is None:
+            _writer = BulkWriter(batch_size=int(os.getenv("DB2_INSERT_BATCH_SIZE", "1000")))
+        return _writer
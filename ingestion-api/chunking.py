@@ -0,0 +1,387 @@
+"""
+Chunking Engine
+
+Splits text into sentences with a selectable segmentation backend and
+groups sentences into overlapping, word-bounded chunks in linear time.
+"""
+
+import math
+import multiprocessing
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+import spacy
+
+# ============================================================================
+# SENTENCE SEGMENTATION
+# ============================================================================
+
+# "parser":      full en_core_web_sm pipeline, sentences from the dependency parse
+# "sentencizer": tokenizer + rule-based sentencizer only (no tagger/parser/NER)
+# "regex":       pure-Python punctuation/whitespace rules, no spaCy at all
+SEGMENTERS = ("parser", "sentencizer", "regex")
+DEFAULT_SEGMENTER = os.getenv("CHUNK_SEGMENTER", "parser")
+
+# Multi-document segmentation (nlp.pipe): articles per batch and worker processes
+PIPE_BATCH_SIZE = int(os.getenv("CHUNK_PIPE_BATCH_SIZE", "8"))
+PIPE_PROCESSES = int(os.getenv("CHUNK_PIPE_PROCESSES", "1"))
+
+# Streaming chunker: characters of text segmented per window
+STREAM_WINDOW_CHARS = int(os.getenv("CHUNK_STREAM_WINDOW_CHARS", "50000"))
+
+_pipelines = {}
+_pipelines_lock = threading.Lock()
+
+# Sentence end: terminal punctuation (plus closing quotes/brackets) followed by
+# whitespace and an upper-case letter, digit or opening quote; or a blank line
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_BOUNDARY = re.compile(
+    r"""(?:(?<=[.!?])|(?<=[.!?]["')\]]))\s+(?=["'(\[]?[A-Z0-9])|\n\s*\n"""
+)
+
+def load_pipeline(segmenter):
+    """Load (once per process) the spaCy pipeline for a segmentation backend"""
+    with _pipelines_lock:
+        nlp = _pipelines.get(segmenter)
+        if nlp is None:
+            if segmenter == "parser":
+                nlp = spacy.load("en_core_web_sm")
+            elif segmenter == "sentencizer":
+                nlp = spacy.blank("en")
+                nlp.add_pipe("sentencizer")
+            else:
+                raise ValueError(f"No spaCy pipeline for segmenter '{segmenter}'")
+            _pipelines[segmenter] = nlp
+        return nlp
+
+def split_sentences_regex(text):
+    """Rule-based sentence split without spaCy"""
+    return [s.strip() for s in _SENTENCE_BOUNDARY.split(text) if s and s.strip()]
+
+def resolve_segmenter(segmenter):
+    """Validate a segmenter name, falling back to CHUNK_SEGMENTER"""
+    segmenter = segmenter or DEFAULT_SEGMENTER
+    if segmenter not in SEGMENTERS:
+        raise ValueError(f"Unknown segmenter '{segmenter}'. Choose one of: {', '.join(SEGMENTERS)}")
+    return segmenter
+
+def doc_sentences(doc):
+    return [sent.text.strip() for sent in doc.sents if sent.text.strip()]
+
+def split_sentences(text, segmenter=None):
+    """Split text into stripped, non-empty sentences with the chosen backend"""
+    segmenter = resolve_segmenter(segmenter)
+    if segmenter == "regex":
+        return split_sentences_regex(text)
+    return doc_sentences(load_pipeline(segmenter)(text))
+
+def _segment_batch(segmenter, texts):
+    """Sentence lists of a batch of texts (runs in a segmentation worker process)"""
+    return [doc_sentences(doc) for doc in load_pipeline(segmenter).pipe(texts, batch_size=len(texts))]
+
+_segmentation_pools = {}
+_segmentation_pools_lock = threading.Lock()
+
+def get_segmentation_pool(processes):
+    """Return the process-wide pool of segmentation worker processes of a given size
+
+    Workers are started once and keep their loaded pipelines. forkserver avoids
+    forking the multi-threaded service process (nlp.pipe's own n_process forks
+    new workers on every call).
+    """
+    with _segmentation_pools_lock:
+        pool = _segmentation_pools.get(processes)
+        if pool is None:
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload([__name__])
+            else:
+                context = multiprocessing.get_context("spawn")
+            pool = ProcessPoolExecutor(max_workers=processes, mp_context=context)
+            _segmentation_pools[processes] = pool
+        return pool
+
+def close_segmentation_pools():
+    with _segmentation_pools_lock:
+        pools = list(_segmentation_pools.values())
+        _segmentation_pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True)
+
+def split_sentences_many(texts, segmenter=None, batch_size=None, n_process=None):
+    """Split many texts at once, yielding one sentence list per text in order
+
+    spaCy backends stream the texts through nlp.pipe in batches. With
+    n_process > 1 the texts are spread over that many persistent worker
+    processes instead.
+    """
+    segmenter = resolve_segmenter(segmenter)
+    if segmenter == "regex":
+        yield from map(split_sentences_regex, texts)
+        return
+
+    batch_size = batch_size or PIPE_BATCH_SIZE
+    n_process = n_process or PIPE_PROCESSES
+    if n_process <= 1:
+        for doc in load_pipeline(segmenter).pipe(texts, batch_size=batch_size):
+            yield doc_sentences(doc)
+        return
+
+    texts = list(texts)
+    if not texts:
+        return
+    # Small enough batches that every worker gets some of the texts
+    size = min(batch_size, math.ceil(len(texts) / n_process))
+    batches = [texts[start:start + size] for start in range(0, len(texts), size)]
+    for sentence_lists in get_segmentation_pool(n_process).map(_segment_batch, [segmenter] * len(batches), batches):
+        yield from sentence_lists
+
+def _cut_oversized(text, limit):
+    """Cut prefixes of at most limit characters (at whitespace where possible) off text; returns (cuts, rest)"""
+    cuts = []
+    while len(text) > limit:
+        cut = text.rfind(" ", 0, limit)
+        if cut <= 0:
+            cut = limit
+        cuts.append(text[:cut])
+        text = text[cut:]
+    return cuts, text
+
+def iter_paragraphs(pieces, limit):
+    """Yield (paragraph, complete) from text arriving in pieces
+
+    Paragraphs longer than limit are yielded in parts with complete=False
+    for all but the last part.
+    """
+    if isinstance(pieces, str):
+        pieces = (pieces,)
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        *paragraphs, buffer = _PARAGRAPH_BREAK.split(buffer)
+        for paragraph in paragraphs:
+            cuts, rest = _cut_oversized(paragraph, limit)
+            yield from ((cut, False) for cut in cuts)
+            yield rest, True
+        # Don't let one endless paragraph grow the buffer without bound
+        cuts, buffer = _cut_oversized(buffer, limit)
+        yield from ((cut, False) for cut in cuts)
+    yield buffer, True
+
+def iter_windows(pieces, window_chars=None):
+    """Group paragraphs into windows of about window_chars; yields (window, complete)
+
+    complete is False when the window ends inside a paragraph, so its last
+    sentence may continue in the next window.
+    """
+    window_chars = window_chars or STREAM_WINDOW_CHARS
+    window, size = [], 0
+    for paragraph, complete in iter_paragraphs(pieces, window_chars):
+        if not paragraph.strip():
+            continue
+        if window and size + len(paragraph) > window_chars:
+            yield "\n\n".join(window), True
+            window, size = [], 0
+        window.append(paragraph)
+        size += len(paragraph) + 2
+        if not complete:
+            yield "\n\n".join(window), False
+            window, size = [], 0
+    if window:
+        yield "\n\n".join(window), True
+
+def iter_sentences(pieces, segmenter=None, window_chars=None):
+    """Yield sentences from text arriving in pieces, segmenting one bounded window at a time"""
+    window_chars = window_chars or STREAM_WINDOW_CHARS
+    carry = ""
+    for window, complete in iter_windows(pieces, window_chars):
+        sentences = split_sentences(carry + window, segmenter)
+        carry = ""
+        # The window was cut mid-paragraph: its last sentence may be unfinished
+        if not complete and sentences and len(sentences[-1]) < window_chars:
+            carry = sentences.pop()
+        yield from sentences
+    if carry:
+        yield carry
+
+# ============================================================================
+# CHUNK CONSTRUCTION
+# ============================================================================
+
+def sentence_word_counts(sentences):
+    """Word count of every sentence, computed once"""
+    return [len(sentence.split()) for sentence in sentences]
+
+def chunk_sentences(sentences, max_words=200, overlap_words=50, word_counts=None):
+    """Group sentences into chunks of at most max_words words.
+
+    Each new chunk starts with the shortest run of trailing sentences from
+    the previous chunk that holds at least overlap_words words. Chunks are
+    contiguous sentence ranges [start, end), so with prefix sums of the
+    word counts every chunk length is a subtraction, and the overlap start
+    only ever moves forward (a two-pointer sweep): O(n) overall.
+
+    A sentence longer than max_words becomes a chunk of its own, and the
+    overlap is dropped when overlap plus the next sentence can't fit.
+    """
+    if word_counts is None:
+        word_counts = sentence_word_counts(sentences)
+    prefix = [0, *accumulate(word_counts)]  # prefix[k] = words in sentences[:k]
+
+    chunks = []
+    start = 0  # first sentence of the current chunk
+    end = 0    # one past its last sentence
+
+    while end < len(sentences):
+        # A sentence always fits into an empty chunk, even if oversized
+        if start == end or prefix[end + 1] - prefix[start] <= max_words:
+            end += 1
+            continue
+
+        chunks.append(" ".join(sentences[start:end]))
+
+        # Overlap: latest start whose suffix still holds overlap_words words
+        if overlap_words <= 0:
+            start = end
+        else:
+            limit = prefix[end] - overlap_words
+            while start + 1 < end and prefix[start + 1] <= limit:
+                start += 1
+
+        # Overlap plus the next sentence would exceed max_words: start fresh
+        if prefix[end + 1] - prefix[start] > max_words:
+            start = end
+
+    if start < end:
+        chunks.append(" ".join(sentences[start:end]))
+
+    return chunks
+
+def iter_chunks(sentences, max_words=200, overlap_words=50, measure=None):
+    """Streaming chunk_sentences: yields each chunk as soon as it is complete
+
+    Holds only the sentences of the current chunk, so it works on sentence
+    iterators of any length and produces the same chunks as chunk_sentences.
+    measure(sentence) sizes a sentence in other units (default: words).
+    """
+    current = deque()  # (sentence, size) of the current chunk
+    length = 0
+
+    for sentence in sentences:
+        words = measure(sentence) if measure is not None else len(sentence.split())
+        if current and length + words > max_words:
+            yield " ".join(s for s, _ in current)
+
+            # Overlap: shortest suffix still holding overlap_words words
+            if overlap_words <= 0:
+                current.clear()
+                length = 0
+            else:
+                while len(current) > 1 and length - current[0][1] >= overlap_words:
+                    length -= current.popleft()[1]
+
+            # Overlap plus this sentence would exceed max_words: start fresh
+            if length + words > max_words:
+                current.clear()
+                length = 0
+
+        current.append((sentence, words))
+        length += words
+
+    if current:
+        yield " ".join(s for s, _ in current)
+
+# ============================================================================
+# TOKEN-BUDGET CHUNKING
+# ============================================================================
+
+# token_counter is any object with count(text) and count_many(texts), e.g.
+# rag_common.tokenizer.TokenCounter for the embedding model's tokenizer.
+# A sentence is measured with a leading space, as it appears inside a chunk.
+
+def split_to_budget(text, token_counter, max_tokens):
+    """Split text at word boundaries into the fewest pieces of at most max_tokens tokens"""
+    words = text.split()
+    pieces = []
+    while words:
+        # Longest prefix that fits (binary search)
+        low, high = 1, len(words)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if token_counter.count(" ".join(words[:middle])) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+
+        if low == 1 and token_counter.count(words[0]) > max_tokens:
+            # One "word" over budget (URLs, base64, tables without spaces): cut by characters
+            word = words[0]
+            while word:
+                low, high = 1, len(word)
+                while low < high:
+                    middle = (low + high + 1) // 2
+                    if token_counter.count(word[:middle]) <= max_tokens:
+                        low = middle
+                    else:
+                        high = middle - 1
+                pieces.append(word[:low])
+                word = word[low:]
+        else:
+            pieces.append(" ".join(words[:low]))
+        words = words[low:]
+    return pieces
+
+def iter_token_chunks(sentences, token_counter, max_tokens, overlap_tokens=0):
+    """Chunk sentences by token budget; every chunk fits in max_tokens tokens"""
+    def measure(sentence):
+        return token_counter.count(" " + sentence)
+
+    def fitted(sentences):
+        for sentence in sentences:
+            if measure(sentence) <= max_tokens:
+                yield sentence
+            else:
+                yield from split_to_budget(sentence, token_counter, max_tokens)
+
+    for chunk in iter_chunks(fitted(sentences), max_tokens, overlap_tokens, measure=measure):
+        # Summed sentence counts can miss a merge at a sentence edge: check the real count
+        if token_counter.count(chunk) <= max_tokens:
+            yield chunk
+        else:
+            yield from split_to_budget(chunk, token_counter, max_tokens)
+
+def chunk_sentences_by_tokens(sentences, token_counter, max_tokens, overlap_tokens=0):
+    """Group sentences into chunks of at most max_tokens tokens"""
+    token_counter.count_many([" " + sentence for sentence in sentences])  # tokenize all sentences in one pass
+    return list(iter_token_chunks(sentences, token_counter, max_tokens, overlap_tokens))
+
+def chunk_config(max_words, overlap_words, segmenter=None, max_tokens=None, overlap_tokens=0):
+    """Chunking settings that shaped a document's chunks; changing them means re-chunking"""
+    if max_tokens:
+        return f"tokens:{max_tokens}:{overlap_tokens}:{segmenter or DEFAULT_SEGMENTER}"
+    return f"words:{max_words}:{overlap_words}:{segmenter or DEFAULT_SEGMENTER}"
+
+def chunk_texts(texts, max_words=200, overlap_words=50, segmenter=None, batch_size=None, n_process=None,
+                token_counter=None, max_tokens=None, overlap_tokens=0):
+    """Chunk many documents in one segmentation pass; returns a chunk list per document
+
+    With max_tokens (and a token_counter) chunks are sized in tokens instead of words.
+    """
+    chunked = []
+    for sentences in split_sentences_many(texts, segmenter, batch_size, n_process):
+        if max_tokens:
+            chunked.append(chunk_sentences_by_tokens(sentences, token_counter, max_tokens, overlap_tokens))
+        else:
+            chunked.append(chunk_sentences(sentences, max_words, overlap_words))
+    return chunked
+
+def stream_chunks(pieces, max_words=200, overlap_words=50, segmenter=None, window_chars=None,
+                  token_counter=None, max_tokens=None, overlap_tokens=0):
+    """Chunk text arriving as a string or an iterable of pieces, yielding chunks as they are ready"""
+    sentences = iter_sentences(pieces, segmenter, window_chars)
+    if max_tokens:
+        return iter_token_chunks(sentences, token_counter, max_tokens, overlap_tokens)
+    return iter_chunks(sentences, max_words, overlap_words)
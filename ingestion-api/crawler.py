@@ -0,0 +1,139 @@
+"""
+Site Crawler
+
+Building blocks for crawl ingestion: URL normalization, link extraction,
+crawl scope (hosts and path prefix), robots.txt rules and a breadth-first
+frontier that de-duplicates URLs and enforces depth and page limits.
+"""
+
+import asyncio
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+from urllib.robotparser import RobotFileParser
+import lxml.html
+from lxml.etree import ParserError
+
+# Links to these are never pages worth extracting
+SKIPPED_EXTENSIONS = (
+    ".pdf", ".zip", ".gz", ".tar", ".tgz", ".rar", ".7z", ".exe", ".dmg", ".iso",
+    ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".bmp", ".tif", ".tiff",
+    ".mp3", ".mp4", ".avi", ".mov", ".webm", ".wav", ".css", ".js", ".json", ".xml", ".rss",
+    ".woff", ".woff2", ".ttf", ".eot", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx",
+)
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+def normalize_url(url):
+    """Canonical form of an http(s) URL for de-duplication, or None for other URLs"""
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        return None
+    host = parts.hostname
+    if port and (scheme, port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{port}"
+    query = urlencode([
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    ])
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+def extract_links(html, base_url):
+    """Absolute URLs of the <a href> links in a page (CPU stage)"""
+    try:
+        tree = lxml.html.fromstring(html)
+    except (ParserError, ValueError):
+        return []
+    base = tree.xpath("string(//base/@href)") or base_url
+    links = []
+    for href in tree.xpath("//a/@href"):
+        href = href.strip()
+        if href and not href.startswith(("#", "mailto:", "javascript:", "tel:")):
+            links.append(urljoin(base, href))
+    return links
+
+class CrawlScope:
+    """Which URLs a crawl may visit: allowed hosts (and their subdomains) and an optional path prefix"""
+
+    def __init__(self, hosts, path_prefix=None):
+        self.hosts = {host.lower() for host in hosts}
+        self.path_prefix = path_prefix
+
+    def __contains__(self, url):
+        parts = urlsplit(url)
+        host = parts.netloc.lower()
+        if not any(host == allowed or host.endswith("." + allowed) for allowed in self.hosts):
+            return False
+        if self.path_prefix and not parts.path.startswith(self.path_prefix):
+            return False
+        return not parts.path.lower().endswith(SKIPPED_EXTENSIONS)
+
+class Frontier:
+    """Breadth-first queue of (url, depth) that admits each URL once, up to max_pages"""
+
+    def __init__(self, scope, max_pages, max_depth):
+        self.scope = scope
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.queue = asyncio.Queue()
+        self.seen = set()
+        self.admitted = 0
+        self.counters = {"out_of_scope": 0, "too_deep": 0, "over_limit": 0}
+
+    def candidate(self, url, depth, check_scope=True):
+        """Normalized URL if it is new, in scope and not too deep, else None; marks it seen"""
+        url = normalize_url(url)
+        if url is None or url in self.seen:
+            return None
+        self.seen.add(url)
+        if depth > self.max_depth:
+            self.counters["too_deep"] += 1
+            return None
+        if check_scope and url not in self.scope:
+            self.counters["out_of_scope"] += 1
+            return None
+        return url
+
+    def push(self, url, depth):
+        """Queue a candidate URL unless max_pages URLs were already queued; returns True if queued"""
+        if self.admitted >= self.max_pages:
+            self.counters["over_limit"] += 1
+            return False
+        self.admitted += 1
+        self.queue.put_nowait((url, depth))
+        return True
+
+class RobotsRules:
+    """robots.txt rules per host, downloaded once per crawl through an async fetch function"""
+
+    def __init__(self, fetch, user_agent):
+        self.fetch = fetch
+        self.user_agent = user_agent
+        self._parsers = {}
+        self.disallowed = 0
+
+    async def _load(self, origin):
+        parser = RobotFileParser()
+        status, content, _ = await self.fetch(origin + "/robots.txt")
+        if status == 200 and content:
+            parser.parse(content.decode("utf-8", errors="replace").splitlines())
+        else:
+            # No robots.txt (or it could not be read): everything is allowed
+            parser.allow_all = True
+        return parser
+
+    async def allowed(self, url):
+        """Whether robots.txt of the URL's host lets our user agent fetch it"""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        if origin not in self._parsers:
+            self._parsers[origin] = asyncio.ensure_future(self._load(origin))
+        parser = await self._parsers[origin]
+        if parser.can_fetch(self.user_agent, url):
+            return True
+        self.disallowed += 1
+        return False
@@ -0,0 +1,190 @@
+"""
+Near-Duplicate Chunk Detection
+
+SimHash signatures of chunk text, indexed per vector table, so chunks that
+are (nearly) identical to ones already stored - navigation, footers,
+license text shared across pages - are skipped before they are embedded.
+
+Signatures are 64-bit SimHashes over word 3-shingles. Two chunks are near
+duplicates when their signatures differ in at most max_distance bits. The
+signature is split into four 16-bit bands: two signatures within 3 bits of
+each other agree exactly on at least one band, so candidates are found with
+indexed band lookups instead of a scan.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+BANDS = 4
+BAND_BITS = 64 // BANDS
+MAX_SUPPORTED_DISTANCE = BANDS - 1
+
+_WORD = re.compile(r"\w+")
+
+def simhash(text, shingle_size=3):
+    """64-bit SimHash of a text's lower-cased word shingles"""
+    words = _WORD.findall(text.lower())
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    # Each output bit is set when most shingle hashes have it set; columns of
+    # the hashes' bit strings are tallied with str.count instead of a bit loop
+    hashes = [
+        format(int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "big"), "064b")
+        for shingle in shingles
+    ]
+    half = len(hashes) / 2
+    return int("".join("1" if column.count("1") > half else "0" for column in zip(*hashes)), 2)
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+def bands_of(signature):
+    return [(signature >> (band * BAND_BITS)) & ((1 << BAND_BITS) - 1) for band in range(BANDS)]
+
+def _to_sql(signature):
+    """Unsigned 64-bit value as SQLite's signed INTEGER"""
+    return signature - (1 << 64) if signature >= 1 << 63 else signature
+
+def _from_sql(value):
+    return value + (1 << 64) if value < 0 else value
+
+class ChunkSignatureIndex:
+    """Per-table SimHash index of stored chunks, kept in SQLite"""
+
+    def __init__(self, db_path, max_distance=3):
+        if not 0 <= max_distance <= MAX_SUPPORTED_DISTANCE:
+            raise ValueError(f"max_distance must be between 0 and {MAX_SUPPORTED_DISTANCE}")
+        self.db_path = str(db_path)
+        self.max_distance = max_distance
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunk_bands (
+                    table_name TEXT NOT NULL,
+                    band INTEGER NOT NULL,
+                    value INTEGER NOT NULL,
+                    signature INTEGER NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS chunk_bands_lookup ON chunk_bands (table_name, band, value)")
+
+        self._metrics = {"checked": 0, "duplicates": 0, "added": 0}
+
+    @staticmethod
+    def _key(table_name):
+        return table_name.upper()
+
+    def _stored_match(self, table, signature):
+        where = " OR ".join("(band = ? AND value = ?)" for _ in range(BANDS))
+        params = [table]
+        for band, value in enumerate(bands_of(signature)):
+            params += [band, value]
+        rows = self._conn.execute(
+            f"SELECT DISTINCT signature FROM chunk_bands WHERE table_name = ? AND ({where})", params
+        ).fetchall()
+        return any(hamming(signature, _from_sql(row[0])) <= self.max_distance for row in rows)
+
+    def filter_new(self, table_name, chunks, pending=None):
+        """Split chunks into new ones and near duplicates
+
+        Returns (keep, signatures): indices of chunks to store and their
+        signatures. Chunks are compared with the table's stored chunks and
+        with earlier chunks in the same call. Nothing is recorded until add().
+
+        pending, a dict shared across calls, extends the comparison to chunks
+        kept by earlier calls that are not stored yet (e.g. other pages of
+        the same batch).
+        """
+        table = self._key(table_name)
+        signatures = [simhash(chunk) for chunk in chunks]
+        keep = []
+        kept_bands = pending if pending is not None else {}
+        with self._lock:
+            for i, signature in enumerate(signatures):
+                bands = bands_of(signature)
+                seen = {s for band, value in enumerate(bands) for s in kept_bands.get((band, value), ())}
+                if any(hamming(signature, s) <= self.max_distance for s in seen) or self._stored_match(table, signature):
+                    continue
+                keep.append(i)
+                for band, value in enumerate(bands):
+                    kept_bands.setdefault((band, value), []).append(signature)
+            self._metrics["checked"] += len(chunks)
+            self._metrics["duplicates"] += len(chunks) - len(keep)
+        return keep, [signatures[i] for i in keep]
+
+    def add(self, table_name, signatures):
+        """Record signatures of chunks that were written to the table"""
+        table = self._key(table_name)
+        rows = [
+            (table, band, value, _to_sql(signature))
+            for signature in signatures
+            for band, value in enumerate(bands_of(signature))
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT INTO chunk_bands (table_name, band, value, signature) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.execute("COMMIT")
+            self._metrics["added"] += len(signatures)
+
+    def remove(self, table_name, signatures):
+        """Forget signatures of chunks that were deleted from the table (one copy each)"""
+        table = self._key(table_name)
+        rows = [
+            (table, band, value, _to_sql(signature))
+            for signature in signatures
+            for band, value in enumerate(bands_of(signature))
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("""
+                DELETE FROM chunk_bands WHERE rowid = (
+                    SELECT rowid FROM chunk_bands WHERE table_name = ? AND band = ? AND value = ? AND signature = ? LIMIT 1
+                )
+            """, rows)
+            self._conn.execute("COMMIT")
+
+    def clear(self, table_name):
+        """Forget a table's signatures after it is dropped or truncated"""
+        with self._lock:
+            self._conn.execute("DELETE FROM chunk_bands WHERE table_name = ?", (self._key(table_name),))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["signatures"] = self._conn.execute("SELECT COUNT(*) FROM chunk_bands").fetchone()[0] // BANDS
+        stats["max_distance"] = self.max_distance
+        return stats
+
+# ============================================================================
+# PROCESS-WIDE INDEX
+# ============================================================================
+
+_index = None
+_lock = threading.Lock()
+
+def get_signature_index():
+    """Return the process-wide signature index, or None if CHUNK_DEDUP_ENABLED=false"""
+    global _index
+    if os.getenv("CHUNK_DEDUP_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    with _lock:
+        if _index is None:
+            default_path = Path(__file__).parent.parent / ".cache" / "chunk_signatures.db"
+            _index = ChunkSignatureIndex(
+                os.getenv("CHUNK_DEDUP_PATH", str(default_path)),
+                max_distance=int(os.getenv("CHUNK_DEDUP_MAX_DISTANCE", "3")),
+            )
+        return _index
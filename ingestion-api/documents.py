@@ -0,0 +1,174 @@
+"""
+Document Records
+
+Remembers, per vector table and URL, what was ingested last time: HTTP
+validators (ETag / Last-Modified), a hash of the extracted text, the
+chunking settings, and the hash and DB2 id of every stored chunk. Re-ingesting
+an unchanged page is skipped; for a changed page only chunks that differ
+are embedded and written, and chunks that disappeared are deleted.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# Document status after comparing a page with its record
+NEW = "new"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+
+def content_hash(text):
+    """Hash of extracted text, insensitive to whitespace changes"""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+def chunk_hash(chunk):
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+def db2_chunk_id(raw_id):
+    """The id DB2VS stores for a caller-supplied id (truncated SHA-256, upper-case hex)"""
+    return hashlib.sha256(raw_id.encode()).hexdigest()[:16].upper()
+
+def chunk_metadatas(url, raw_ids):
+    return [{"id": raw_id, "source": url} for raw_id in raw_ids]
+
+def document_store_path():
+    """Records database shared by the service and the bulk loader (INGEST_DOCUMENT_DB)"""
+    return os.getenv("INGEST_DOCUMENT_DB", str(Path(__file__).parent / "ingestion_documents.db"))
+
+class DocumentStore:
+    """Per-table URL records in a local SQLite database"""
+
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    table_name TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_hash TEXT NOT NULL,
+                    chunk_config TEXT NOT NULL,
+                    chunks TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (table_name, url)
+                )
+            """)
+
+    @staticmethod
+    def _key(table_name):
+        return table_name.upper()
+
+    def get(self, table_name, url):
+        """Return the record for a URL as a dict, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM documents WHERE table_name = ? AND url = ?", (self._key(table_name), url)
+            ).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        record["chunks"] = json.loads(record["chunks"])
+        return record
+
+    _UPSERT = """
+        INSERT INTO documents (table_name, url, etag, last_modified, content_hash, chunk_config, chunks, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (table_name, url) DO UPDATE SET
+            etag = excluded.etag, last_modified = excluded.last_modified,
+            content_hash = excluded.content_hash, chunk_config = excluded.chunk_config,
+            chunks = excluded.chunks, updated_at = excluded.updated_at
+    """
+
+    def save(self, table_name, url, validators, text_hash, chunk_config, chunks):
+        """Store a URL's record; chunks is a list of {hash, id, signature}"""
+        with self._lock:
+            self._conn.execute(self._UPSERT, (
+                self._key(table_name), url, validators.get("etag"), validators.get("last_modified"),
+                text_hash, chunk_config, json.dumps(chunks), time.time()
+            ))
+
+    def save_many(self, table_name, records, chunk_config):
+        """Store many records in one transaction; each is a dict of url, validators, content_hash and chunks"""
+        now = time.time()
+        rows = [
+            (
+                self._key(table_name), record["url"], record["validators"].get("etag"),
+                record["validators"].get("last_modified"), record["content_hash"], chunk_config,
+                json.dumps(record["chunks"]), now
+            )
+            for record in records
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(self._UPSERT, rows)
+            self._conn.execute("COMMIT")
+
+    def delete_table(self, table_name):
+        """Forget every record of a table that was dropped"""
+        with self._lock:
+            self._conn.execute("DELETE FROM documents WHERE table_name = ?", (self._key(table_name),))
+
+    def counts(self):
+        """Number of documents per table"""
+        with self._lock:
+            rows = self._conn.execute("SELECT table_name, COUNT(*) FROM documents GROUP BY table_name").fetchall()
+        return {table: count for table, count in rows}
+
+class ChunkPlan:
+    """Matches a page's new chunks against its previous record
+
+    Chunks whose text was stored before keep their row; the rest get fresh
+    deterministic ids and must be embedded and written. Whatever is left of
+    the old record once every chunk has been seen must be deleted.
+    """
+
+    def __init__(self, url, record=None):
+        self.url = url
+        self._previous = defaultdict(list)
+        for entry in (record or {}).get("chunks", []):
+            self._previous[entry["hash"]].append(entry)
+        self._used_ids = set()
+        self.kept = []    # entries reused from the record
+        self.stored = []  # entries written in this run
+
+    def split(self, chunks):
+        """Return (new_chunks, raw_ids) for chunks not already stored"""
+        new_chunks, raw_ids = [], []
+        for chunk in chunks:
+            digest = chunk_hash(chunk)
+            if self._previous[digest]:
+                entry = self._previous[digest].pop()
+                self.kept.append(entry)
+                self._used_ids.add(entry["id"])
+                continue
+            # The same text can occur several times on a page: number the copies
+            occurrence = 0
+            while db2_chunk_id(raw_id := f"{self.url}#{digest}#{occurrence}") in self._used_ids:
+                occurrence += 1
+            self._used_ids.add(db2_chunk_id(raw_id))
+            new_chunks.append(chunk)
+            raw_ids.append(raw_id)
+        return new_chunks, raw_ids
+
+    def add_stored(self, chunks, raw_ids, signatures=None):
+        """Record chunks that were written"""
+        signatures = signatures or [None] * len(chunks)
+        for chunk, raw_id, signature in zip(chunks, raw_ids, signatures):
+            self.stored.append({"hash": chunk_hash(chunk), "id": db2_chunk_id(raw_id), "signature": signature})
+
+    def removed(self):
+        """Entries of the previous record that no longer occur on the page"""
+        return [entry for entries in self._previous.values() for entry in entries]
+
+    def entries(self):
+        return self.kept + self.stored
@@ -0,0 +1,54 @@
+"""
+Embedding Model
+
+The Granite embedding model as ingestion uses it: where the model file is,
+the process-wide embeddings, and the model's own tokenizer for token-aware
+chunking. Shared by the service and the offline bulk loader; importers put
+the repository root on sys.path first (for rag_common).
+"""
+
+from pathlib import Path
+from rag_common.embeddings import resolve_model_path, DEFAULT_MODEL_FILE
+from rag_common.embedding_service import get_embedding_service
+from rag_common.embedding_cache import get_cached_embeddings
+from rag_common.tokenizer import get_token_counter, utilization_stats
+
+def get_embedding_model_path():
+    """Locate Granite embedding model, preferring parent/models/ directory"""
+    parent_dir = Path(__file__).parent.parent
+    return resolve_model_path([
+        parent_dir / "models" / DEFAULT_MODEL_FILE,  # Preferred: parent/models/
+        Path("models") / DEFAULT_MODEL_FILE,  # Fallback: local models/
+        Path(__file__).parent / "models" / DEFAULT_MODEL_FILE,
+        Path(DEFAULT_MODEL_FILE),  # Fallback: current directory
+        Path(__file__).parent / DEFAULT_MODEL_FILE
+    ])
+
+def get_embeddings():
+    """Return the process-wide Granite embeddings (model loaded once, calls micro-batched, vectors cached on disk)"""
+    return get_cached_embeddings(get_embedding_model_path())
+
+def get_tokenizer():
+    """Return the token counter for the Granite model's own tokenizer"""
+    return get_token_counter(get_embedding_model_path())
+
+def token_budget(chunk_by, max_tokens=None):
+    """Tokens per chunk for token-aware chunking (None when chunking by words)"""
+    if chunk_by != "tokens":
+        return None
+    limit = get_tokenizer().max_text_tokens
+    return min(max_tokens or limit, limit)
+
+def embed_chunks(chunks, cached=True):
+    """Compute chunk embeddings (CPU stage); cached=False bypasses the persistent embedding cache"""
+    embeddings = get_embeddings() if cached else get_embedding_service(get_embedding_model_path())
+    return embeddings.embed_documents(chunks)
+
+def chunk_token_counts(chunks):
+    """Model token count of every chunk (CPU stage)"""
+    return get_tokenizer().count_many(chunks)
+
+def token_stats(token_counts, max_tokens):
+    """Token utilization of chunks against their token budget (only computed when chunking by tokens)"""
+    limit = get_tokenizer().max_text_tokens
+    return utilization_stats(token_counts, max_tokens, limit)
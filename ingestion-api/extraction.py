@@ -0,0 +1,181 @@
+"""
+Process-Pool HTML Extraction
+
+trafilatura.extract is pure Python/lxml work that holds the GIL, so under
+batch load extraction threads stall each other and the rest of the service.
+This pool runs extraction in worker processes instead. Raw HTML bytes are
+sent over a pipe as-is (trafilatura decodes them in the worker), one page
+per worker at a time. A page that takes longer than the timeout gets its
+worker killed and replaced, so one pathological page cannot stall the
+pipeline. Workers are also replaced after a number of pages to cap lxml
+memory growth.
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class ExtractionTimeout(Exception):
+    pass
+
+class ExtractionError(Exception):
+    pass
+
+def extract_article(html):
+    """Extract main article text from HTML in this process (CPU stage)"""
+    import trafilatura
+    return trafilatura.extract(html)
+
+def _worker_main(conn):
+    """Worker process loop: HTML bytes in, (ok, text or error) out"""
+    import trafilatura
+    while True:
+        try:
+            html = conn.recv_bytes()
+        except EOFError:
+            return
+        try:
+            conn.send((True, trafilatura.extract(html)))
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {e}"))
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.pages = 0
+
+    def stop(self, kill=False):
+        self.conn.close()
+        if kill:
+            self.process.kill()
+        self.process.join(timeout=5)
+
+class ExtractionPool:
+    """Fixed set of extraction worker processes; extract() blocks until a worker is free"""
+
+    def __init__(self, processes=2, timeout=30.0, max_pages_per_worker=1000):
+        self.processes = processes
+        self.timeout = timeout
+        self.max_pages_per_worker = max_pages_per_worker
+        # forkserver avoids forking the multi-threaded service process. Its
+        # server preloads trafilatura (not the service's main module), so
+        # workers, including replacements, start without importing anything
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            self._context = multiprocessing.get_context("forkserver")
+            self._context.set_forkserver_preload([__name__, "trafilatura"])
+        else:
+            self._context = multiprocessing.get_context("spawn")
+        self._idle = queue.Queue()
+        for _ in range(processes):
+            self._idle.put(_Worker(self._context))
+        # Threads that wait on workers; waiting on a pipe doesn't hold the GIL
+        self.executor = ThreadPoolExecutor(max_workers=processes, thread_name_prefix="extract-wait")
+        self._lock = threading.Lock()
+        self._metrics = {"pages": 0, "bytes": 0, "timeouts": 0, "errors": 0, "crashes": 0, "recycled": 0}
+        self._closed = False
+
+    def _count(self, metric, amount=1):
+        with self._lock:
+            self._metrics[metric] += amount
+
+    def _restart(self, worker, kill=False):
+        """Stop a worker and start its replacement; None (an empty slot, refilled on next use) if that fails"""
+        try:
+            worker.stop(kill=kill)
+            return _Worker(self._context)
+        except Exception as e:
+            print(f"Warning: Failed to start extraction worker: {e}")
+            return None
+
+    def extract(self, html):
+        """Extract article text from HTML bytes (or str) in a worker process"""
+        if isinstance(html, str):
+            html = html.encode("utf-8")
+        worker = self._idle.get()
+        if worker is None:
+            try:
+                worker = _Worker(self._context)
+            except Exception as e:
+                self._idle.put(None)
+                raise ExtractionError(f"Failed to start extraction worker: {str(e) or type(e).__name__}")
+        replace = False
+        try:
+            worker.conn.send_bytes(html)
+            if not worker.conn.poll(self.timeout):
+                replace = True
+                self._count("timeouts")
+                raise ExtractionTimeout(f"Extraction took longer than {self.timeout:g}s")
+            ok, result = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            replace = True
+            self._count("crashes")
+            raise ExtractionError(f"Extraction worker died: {str(e) or type(e).__name__}")
+        finally:
+            worker.pages += 1
+            if replace or worker.pages >= self.max_pages_per_worker:
+                if not replace:
+                    self._count("recycled")
+                worker = self._restart(worker, kill=replace)
+            # Every slot goes back, even empty, so the pool never shrinks and close() never blocks
+            self._idle.put(worker)
+
+        self._count("pages")
+        self._count("bytes", len(html))
+        if not ok:
+            self._count("errors")
+            raise ExtractionError(result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._metrics)
+        stats.update({"processes": self.processes, "timeout": self.timeout, "idle": self._idle.qsize()})
+        return stats
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self.executor.shutdown(wait=True)
+        for _ in range(self.processes):
+            worker = self._idle.get()
+            if worker is not None:
+                worker.stop()
+
+# ============================================================================
+# PROCESS-WIDE POOL
+# ============================================================================
+
+_pool = None
+_lock = threading.Lock()
+
+def get_extraction_pool():
+    """Return the process-wide extraction pool, or None if EXTRACT_PROCESSES=0 (extract in threads)"""
+    global _pool
+    processes = int(os.getenv("EXTRACT_PROCESSES", str(min(4, os.cpu_count() or 1))))
+    if processes <= 0:
+        return None
+    with _lock:
+        if _pool is None:
+            _pool = ExtractionPool(
+                processes,
+                timeout=float(os.getenv("EXTRACT_TIMEOUT", "30")),
+                max_pages_per_worker=int(os.getenv("EXTRACT_MAX_PAGES_PER_WORKER", "1000")),
+            )
+        return _pool
+
+def extraction_stats():
+    """Metrics for the process-wide pool, if it has been started"""
+    return _pool.stats() if _pool is not None else None
+
+def close_extraction_pool():
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
@@ -0,0 +1,170 @@
+"""
+Async Page Fetcher
+
+Shared httpx.AsyncClient for page downloads: one keep-alive connection pool
+for the whole process, HTTP/2 when the h2 package is installed, a cap on
+concurrent requests per host with an optional delay between requests to the
+same host, retries with exponential backoff for connection errors and
+429/5xx responses, and a limit on response size.
+"""
+
+import asyncio
+import importlib.util
+import os
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+import httpx
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# httpx speaks HTTP/2 only with the optional h2 package (pip install "httpx[http2]")
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+class ResponseTooLarge(Exception):
+    pass
+
+def retry_after_seconds(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+class AsyncFetcher:
+    """Polite, pooled async HTTP fetcher"""
+
+    def __init__(self, max_connections=64, per_host=4, host_delay=0.0, retries=3, backoff=0.5,
+                 max_bytes=20 * 1024 * 1024, timeout=30.0, user_agent="rag-ingestion/1.0", http2=True):
+        self.per_host = per_host
+        self.host_delay = host_delay
+        self.retries = retries
+        self.backoff = backoff
+        self.max_bytes = max_bytes
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.client = httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+            follow_redirects=True,
+            headers={"User-Agent": user_agent},
+        )
+        self._host_slots = {}
+        self._next_start = {}
+        self._metrics = {"requests": 0, "retries": 0, "failures": 0, "too_large": 0, "bytes": 0, "http_versions": {}}
+
+    async def _wait_turn(self, host):
+        """Space out request starts to the same host by host_delay"""
+        if not self.host_delay:
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start = max(now, self._next_start.get(host, now))
+        self._next_start[host] = start + self.host_delay
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def _get(self, url, headers):
+        async with self.client.stream("GET", url, headers=headers) as response:
+            if response.status_code != 200:
+                await response.aread()
+                return response, None
+            length = response.headers.get("content-length")
+            if length and length.isdigit() and int(length) > self.max_bytes:
+                raise ResponseTooLarge(f"{length} bytes")
+            body = bytearray()
+            async for data in response.aiter_bytes():
+                body.extend(data)
+                if len(body) > self.max_bytes:
+                    raise ResponseTooLarge(f"over {self.max_bytes} bytes")
+            return response, bytes(body)
+
+    async def fetch(self, url, headers=None):
+        """Download a URL; returns (status, content, validators)
+
+        content is None unless the status is 200; status is None if the
+        request failed after all retries or the response was too large.
+        """
+        host = urlsplit(url).netloc.lower()
+        slot = self._host_slots.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with slot:
+            for attempt in range(self.retries + 1):
+                await self._wait_turn(host)
+                self._metrics["requests"] += 1
+                delay = self.backoff * 2 ** attempt * (0.5 + random.random())
+                try:
+                    response, content = await self._get(url, headers)
+                except ResponseTooLarge as e:
+                    print(f"Fetch skipped for {url}: response too large ({str(e)})")
+                    self._metrics["too_large"] += 1
+                    return None, None, {}
+                except httpx.RequestError as e:
+                    # Connection problems and timeouts are retried; redirect loops are not
+                    if attempt == self.retries or not isinstance(e, httpx.TransportError):
+                        print(f"Fetch failed for {url}: {str(e) or type(e).__name__}")
+                        self._metrics["failures"] += 1
+                        return None, None, {}
+                else:
+                    if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                        break
+                    delay = retry_after_seconds(response.headers.get("retry-after")) or delay
+                self._metrics["retries"] += 1
+                await asyncio.sleep(delay)
+
+        versions = self._metrics["http_versions"]
+        versions[response.http_version] = versions.get(response.http_version, 0) + 1
+        self._metrics["bytes"] += len(content or b"")
+        validators = {"etag": response.headers.get("etag"), "last_modified": response.headers.get("last-modified")}
+        return response.status_code, content, validators
+
+    def stats(self):
+        stats = dict(self._metrics, http_versions=dict(self._metrics["http_versions"]))
+        stats.update({"http2": self.http2, "per_host": self.per_host, "host_delay": self.host_delay, "hosts": len(self._host_slots)})
+        return stats
+
+    async def aclose(self):
+        await self.client.aclose()
+
+# ============================================================================
+# PROCESS-WIDE FETCHER
+# ============================================================================
+
+_fetcher = None
+_lock = threading.Lock()
+
+def get_fetcher():
+    """Return the process-wide fetcher configured by FETCH_* settings"""
+    global _fetcher
+    with _lock:
+        if _fetcher is None:
+            _fetcher = AsyncFetcher(
+                max_connections=int(os.getenv("FETCH_MAX_CONNECTIONS", "64")),
+                per_host=int(os.getenv("FETCH_PER_HOST", "4")),
+                host_delay=float(os.getenv("FETCH_HOST_DELAY", "0")),
+                retries=int(os.getenv("FETCH_RETRIES", "3")),
+                backoff=float(os.getenv("FETCH_BACKOFF", "0.5")),
+                max_bytes=int(float(os.getenv("FETCH_MAX_MB", "20")) * 1024 * 1024),
+                timeout=float(os.getenv("FETCH_TIMEOUT", "30")),
+                user_agent=os.getenv("FETCH_USER_AGENT", "rag-ingestion/1.0"),
+                http2=os.getenv("FETCH_HTTP2", "true").lower() not in ("0", "false", "no"),
+            )
+        return _fetcher
+
+def fetcher_stats():
+    """Metrics for the process-wide fetcher, if it has been created"""
+    return _fetcher.stats() if _fetcher is not None else None
+
+async def close_fetcher():
+    global _fetcher
+    with _lock:
+        fetcher, _fetcher = _fetcher, None
+    if fetcher is not None:
+        await fetcher.aclose()
@@ -6,14 +6,20 @@ Extracts text from URLs, chunks it, and stores with embeddings.
 """
 
 import os
+import sys
+import time
+import asyncio
+import functools
+from itertools import islice
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, HttpUrl
+from typing import Literal
+from pydantic import BaseModel, Field, HttpUrl
 from dotenv import load_dotenv
-import trafilatura
-import spacy
-import ibm_db_dbi
-from langchain_community.embeddings import LlamaCppEmbeddings
+from trafilatura.sitemaps import sitemap_search
 from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_db2.db2vs import DB2VS
 
@@ -21,6 +27,32 @@ from langchain_db2.db2vs import DB2VS
 parent_dir = Path(__file__).parent.parent
 load_dotenv(parent_dir / ".env")
 
+# Shared components (embedding registry, DB2 pool) live in parent/rag_common/
+sys.path.append(str(parent_dir))
+from rag_common.embeddings import registry, PrecomputedEmbeddings
+from rag_common.embedding_service import all_service_stats
+from rag_common.embedding_cache import cache_stats
+from rag_common.db_pool import get_pool, all_pool_stats, PoolError
+from job_queue import JobQueue, QUEUED
+from dedup import get_signature_index, simhash
+from documents import DocumentStore, ChunkPlan, content_hash, chunk_metadatas, document_store_path, NEW, CHANGED, UNCHANGED
+from embedding_model import (
+    get_embedding_model_path, get_embeddings, get_tokenizer, token_budget, embed_chunks, chunk_token_counts, token_stats
+)
+from tables import table_exists, drop_vector_table, invalidate_cached_answers
+from page_cache import get_page_cache, conditional_headers
+from fetcher import get_fetcher, fetcher_stats, close_fetcher
+from crawler import CrawlScope, Frontier, RobotsRules, extract_links
+from extraction import (
+    get_extraction_pool, extraction_stats, close_extraction_pool, extract_article, ExtractionError, ExtractionTimeout
+)
+from bulk_writer import get_bulk_writer
+from local_files import LocalSources, UnreadableFile, decode_text, markdown_to_text, pdf_to_text, HTML, MARKDOWN, PDF
+from chunking import (
+    chunk_sentences, chunk_sentences_by_tokens, chunk_texts, chunk_config, stream_chunks, split_sentences, load_pipeline,
+    close_segmentation_pools, DEFAULT_SEGMENTER, PIPE_BATCH_SIZE
+)
+
 app = FastAPI(
     title="Document Ingestion API", 
     version="1.0.0",
@@ -37,12 +69,140 @@ class IngestRequest(BaseModel):
     table_name: str = "Documents_EUCLIDEAN"
     max_words: int = 200
     overlap_words: int = 50
+    segmenter: Literal["parser", "sentencizer", "regex"] | None = None  # default: CHUNK_SEGMENTER
+    chunk_by: Literal["words", "tokens"] = "words"
+    max_tokens: int | None = Field(default=None, ge=8, description="Token budget per chunk when chunk_by='tokens' (default and cap: the embedding model's limit)")
+    overlap_tokens: int = Field(default=64, ge=0, description="Token overlap between chunks when chunk_by='tokens'")
+    skip_duplicates: bool = True  # drop chunks that near-duplicate chunks already in the table
+    force: bool = False  # re-chunk even if the page is unchanged since it was last ingested
+
+class TokenStats(BaseModel):
+    """Chunk sizes under the embedding model's tokenizer"""
+    chunks: int
+    budget_tokens: int
+    model_max_tokens: int
+    mean_tokens: float
+    min_tokens: int
+    max_tokens: int
+    mean_utilization: float  # mean tokens / budget_tokens
+    truncated_chunks: int  # chunks longer than the model embeds
+
+class JobResponse(BaseModel):
+    """Response model for a queued ingestion job"""
+    success: bool
+    message: str
+    job_id: str
+    status: str
+
+class DocumentChanges(BaseModel):
+    """How a page compared with its previous ingestion"""
+    document: str  # new, changed or unchanged
+    chunks_kept: int = 0  # chunks already stored, left in place
+    chunks_removed: int = 0  # stored chunks no longer on the page, deleted
+
+class JobStatusResponse(BaseModel):
+    """Progress and timings of an ingestion job"""
+    job_id: str
+    status: str
+    stage: str | None = None
+    url: str | None = None
+    table_name: str | None = None
+    chunks_created: int = 0
+    duplicates_skipped: int = 0
+    message: str | None = None
+    error: str | None = None
+    stage_timings: dict[str, float] = {}
+    token_stats: TokenStats | None = None
+    changes: DocumentChanges | None = None
+    queued_seconds: float | None = None
+    run_seconds: float | None = None
+
+class BatchIngestRequest(BaseModel):
+    """Request model for batch ingestion of many URLs and/or a sitemap"""
+    urls: list[HttpUrl] = []
+    sitemap_url: HttpUrl | None = None
+    table_name: str = "Documents_EUCLIDEAN"
+    max_words: int = 200
+    overlap_words: int = 50
+    segmenter: Literal["parser", "sentencizer", "regex"] | None = None  # default: CHUNK_SEGMENTER
+    chunk_by: Literal["words", "tokens"] = "words"
+    max_tokens: int | None = Field(default=None, ge=8, description="Token budget per chunk when chunk_by='tokens' (default and cap: the embedding model's limit)")
+    overlap_tokens: int = Field(default=64, ge=0, description="Token overlap between chunks when chunk_by='tokens'")
+    skip_duplicates: bool = True  # drop chunks that near-duplicate chunks already in the table
+    force: bool = False  # re-chunk pages even if they are unchanged since they were last ingested
+    max_concurrency: int = Field(default=8, ge=1, le=64, description="URLs processed at once")
+    write_batch_size: int = Field(default=500, ge=1, description="Chunks per DB2 write")
+    chunk_batch_size: int | None = Field(default=None, ge=1, description="Articles per nlp.pipe batch (default: CHUNK_PIPE_BATCH_SIZE)")
+    chunk_processes: int | None = Field(default=None, ge=1, description="spaCy worker processes (default: CHUNK_PIPE_PROCESSES)")
+
+class UrlIngestStatus(BaseModel):
+    """Outcome for a single URL in a batch"""
+    url: str
+    success: bool
+    chunks_created: int = 0
+    duplicates_skipped: int = 0
+    document_status: str | None = None  # new, changed or unchanged
+    chunks_kept: int = 0
+    chunks_removed: int = 0
+    error: str | None = None
 
-class IngestResponse(BaseModel):
-    """Response model for document ingestion"""
+class BatchIngestResponse(BaseModel):
+    """Response model for batch ingestion"""
     success: bool
     message: str
+    results: list[UrlIngestStatus] = []
+    urls_succeeded: int = 0
+    urls_failed: int = 0
     chunks_created: int = 0
+    duplicates_skipped: int = 0
+    elapsed_seconds: float = 0.0
+    urls_per_second: float = 0.0
+    chunks_per_second: float = 0.0
+    token_stats: TokenStats | None = None
+
+class CrawlRequest(BatchIngestRequest):
+    """Request model for crawling a site from seed URLs (urls) and/or a sitemap"""
+    max_pages: int = Field(default=100, ge=1, le=100_000, description="Pages to ingest at most")
+    max_depth: int = Field(default=2, ge=0, description="Link hops from a seed or sitemap page")
+    allowed_hosts: list[str] = []  # default: hosts of the seeds and sitemap (subdomains included)
+    path_prefix: str | None = None  # only follow links whose path starts with this
+    respect_robots: bool = True
+
+class CrawlResponse(BatchIngestResponse):
+    """Response model for a crawl; urls_per_second is pages ingested per second"""
+    urls_discovered: int = 0  # distinct URLs seen (seeds, sitemap and links)
+    links_found: int = 0
+    urls_out_of_scope: int = 0
+    urls_over_limit: int = 0  # in scope but beyond max_pages
+    urls_disallowed: int = 0  # blocked by robots.txt
+    depth_reached: int = 0
+
+class FileIngestRequest(BaseModel):
+    """Request model for ingesting local files, directories and archives (tar, zip, WARC)"""
+    paths: list[str]  # absolute, or relative to the first of INGEST_FILE_ROOTS
+    table_name: str = "Documents_EUCLIDEAN"
+    max_words: int = 200
+    overlap_words: int = 50
+    segmenter: Literal["parser", "sentencizer", "regex"] | None = None  # default: CHUNK_SEGMENTER
+    chunk_by: Literal["words", "tokens"] = "words"
+    max_tokens: int | None = Field(default=None, ge=8, description="Token budget per chunk when chunk_by='tokens' (default and cap: the embedding model's limit)")
+    overlap_tokens: int = Field(default=64, ge=0, description="Token overlap between chunks when chunk_by='tokens'")
+    skip_duplicates: bool = True  # drop chunks that near-duplicate chunks already in the table
+    force: bool = False  # re-chunk documents even if they are unchanged since they were last ingested
+    max_concurrency: int = Field(default=8, ge=1, le=64, description="Documents processed at once")
+    write_batch_size: int = Field(default=500, ge=1, description="Chunks per DB2 write")
+    chunk_batch_size: int | None = Field(default=None, ge=1, description="Articles per nlp.pipe batch (default: CHUNK_PIPE_BATCH_SIZE)")
+    chunk_processes: int | None = Field(default=None, ge=1, description="spaCy worker processes (default: CHUNK_PIPE_PROCESSES)")
+
+class FileIngestResponse(BatchIngestResponse):
+    """Response model for local file ingestion; each result's url is the document's source"""
+    documents_found: int = 0
+    documents_repeated: int = 0  # source seen before (e.g. a URL captured twice); only the first is ingested
+    documents_unsupported: int = 0
+    documents_too_large: int = 0  # over INGEST_FILE_MAX_MB
+    archives_read: int = 0
+    files_unreadable: int = 0
+    files_outside_roots: int = 0  # symlinks in a walked directory that lead outside INGEST_FILE_ROOTS
 
 class ClearRequest(BaseModel):
     """Request model for clearing table"""
@@ -58,9 +218,10 @@ class ClearResponse(BaseModel):
 # INITIALIZATION
 # ============================================================================
 
-# Load spaCy model for sentence splitting
+# Load the default sentence segmentation pipeline up front so a missing model fails fast
 try:
-    nlp = spacy.load("en_core_web_sm")
+    if DEFAULT_SEGMENTER != "regex":
+        load_pipeline(DEFAULT_SEGMENTER)
 except OSError:
     raise HTTPException(
         status_code=500, 
@@ -71,185 +232,1025 @@ except OSError:
 # HELPER FUNCTIONS
 # ============================================================================
 
+@contextmanager
 def get_db_connection():
-    """Connect to IBM DB2 database using environment variables"""
-    conn_str = f"DATABASE={os.getenv('DB_NAME')};hostname={os.getenv('DB_HOST')};port={os.getenv('DB_PORT')};protocol={os.getenv('DB_PROTOCOL')};uid={os.getenv('DB_USER')};pwd={os.getenv('DB_PASSWORD')}"
+    """Check out a pooled DB2 connection; it goes back to the pool on exit"""
+    try:
+        with get_pool().connection() as connection:
+            yield connection
+    except PoolError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def chunk_text(text, max_words=200, overlap_words=50, segmenter=None, max_tokens=None, overlap_tokens=0):
+    """Split text into overlapping chunks using sentence boundaries
+    
+    With max_tokens, chunks are filled up to that many model tokens instead of max_words words.
+    """
+    sentences = split_sentences(text, segmenter)
+    if max_tokens:
+        return chunk_sentences_by_tokens(sentences, get_tokenizer(), max_tokens, overlap_tokens)
+    return chunk_sentences(sentences, max_words, overlap_words)
+
+# ============================================================================
+# INGESTION PIPELINE STAGES
+# ============================================================================
+
+# Blocking stages run in executors so the event loop keeps serving requests.
+# Page downloads are async (see fetcher.py) and run on the loop itself.
+# I/O stages (DB2, local caches) get a wide pool; CPU stages (HTML extraction,
+# spaCy, llama.cpp) get one thread per core. Threads rather than processes
+# because the spaCy pipeline and embedding model are loaded once per process
+# and llama.cpp releases the GIL while it computes.
+io_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("INGEST_IO_WORKERS", "16")),
+    thread_name_prefix="ingest-io"
+)
+cpu_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("INGEST_CPU_WORKERS", str(os.cpu_count() or 4))),
+    thread_name_prefix="ingest-cpu"
+)
+
+async def run_stage(executor, func, *args, **kwargs):
+    """Run a blocking pipeline stage in an executor and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+async def fetch_html(url, headers=None):
+    """Download raw HTML and its HTTP validators for a URL (async I/O stage)
+    
+    Returns (status, html, validators); html is None unless the status is 200.
+    headers may carry If-None-Match / If-Modified-Since to get a 304 instead.
+    Runs on the event loop through the shared pooled, per-host limited fetcher.
+    """
+    return await get_fetcher().fetch(url, headers)
+
+# Pages waiting for (or in) an extraction worker process; more wait here, as bytes
+extract_slots = asyncio.Semaphore(int(os.getenv("EXTRACT_MAX_PENDING", "16")))
+
+async def extract_html(downloaded):
+    """Extract article text from HTML bytes in the extraction process pool
+    
+    Falls back to a CPU thread when the pool is disabled (EXTRACT_PROCESSES=0).
+    """
+    pool = get_extraction_pool()
+    if pool is None:
+        return await run_stage(cpu_executor, extract_article, downloaded)
+    async with extract_slots:
+        return await run_stage(pool.executor, pool.extract, downloaded)
+
+def write_chunks(table_name, chunks, vectors, metadatas=None):
+    """Write chunks and their precomputed vectors to DB2, creating the table if needed
+    
+    A metadata "id" becomes the chunk's row id (DB2VS hashes it). Rows go
+    through the bulk writer (array-bound batches of DB2_INSERT_BATCH_SIZE)
+    unless DB2_BULK_WRITE=false, which writes through DB2VS.
+    """
+    writer = get_bulk_writer()
+    if writer is not None:
+        with get_db_connection() as connection:
+            created = not table_exists(connection, table_name)
+            if created:
+                print(f"Creating table '{table_name}'...")
+                writer.create_table(connection, table_name, len(vectors[0]))
+            writer.write(connection, table_name, chunks, vectors, metadatas)
+        if created:
+            return f"Created table '{table_name}' with {len(chunks)} chunks"
+        return f"Added {len(chunks)} chunks to existing table '{table_name}'"
     
+    embeddings = PrecomputedEmbeddings(chunks, vectors, fallback=get_embeddings())
+    
+    print("Checking out database connection...")
+    with get_db_connection() as connection:
+        print(f"Checking if table '{table_name}' exists...")
+        
+        if table_exists(connection, table_name):
+            print("Table exists - adding chunks to existing table...")
+            vectorstore = DB2VS(
+                client=connection, 
+                table_name=table_name,
+                embedding_function=embeddings
+            )
+            vectorstore.add_texts(texts=chunks, metadatas=metadatas)
+            return f"Added {len(chunks)} chunks to existing table '{table_name}'"
+        
+        print("Table doesn't exist - creating new table...")
+        DB2VS.from_texts(
+            texts=chunks,
+            embedding=embeddings,
+            metadatas=metadatas,
+            client=connection,
+            table_name=table_name,
+            distance_strategy=DistanceStrategy.EUCLIDEAN_DISTANCE,
+        )
+        return f"Created table '{table_name}' with {len(chunks)} chunks"
+
+def store_chunks(table_name, chunks, vectors, metadatas=None):
+    """Write chunks to DB2 and invalidate cached answers for the table (I/O stage)"""
     try:
-        return ibm_db_dbi.connect(conn_str, '', '')
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database connection failed: {str(e)}")
-
-def get_embeddings():
-    """Load Granite embedding model from parent/models/ directory"""
-    parent_dir = Path(__file__).parent.parent
-    model_paths = [
-        parent_dir / "models" / "granite-embedding-30m-english-Q6_K.gguf",  # Preferred: parent/models/
-        "models/granite-embedding-30m-english-Q6_K.gguf",  # Fallback: local models/
-        Path(__file__).parent / "models" / "granite-embedding-30m-english-Q6_K.gguf",
-        "granite-embedding-30m-english-Q6_K.gguf",  # Fallback: current directory
-        Path(__file__).parent / "granite-embedding-30m-english-Q6_K.gguf"
-    ]
-    
-    for path in model_paths:
-        if Path(path).exists():
-            return LlamaCppEmbeddings(model_path=str(path))
-    
-    raise FileNotFoundError(
-        "Embedding model file 'granite-embedding-30m-english-Q6_K.gguf' not found. "
-        "Expected locations: parent/models/ directory, local models/ directory, or current directory"
-    )
+        return write_chunks(table_name, chunks, vectors, metadatas)
+    finally:
+        # Even a failed write may have changed the table
+        invalidate_cached_answers(table_name)
+
+def delete_chunks(table_name, chunk_ids):
+    """Delete chunk rows by id and invalidate cached answers for the table (I/O stage)"""
+    if not chunk_ids:
+        return
+    try:
+        with get_db_connection() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.executemany(f"DELETE FROM {table_name} WHERE id = ?", [(chunk_id,) for chunk_id in chunk_ids])
+                connection.commit()
+            finally:
+                cursor.close()
+    finally:
+        invalidate_cached_answers(table_name)
 
-def chunk_text(text, max_words=200, overlap_words=50):
-    """Split text into overlapping chunks using sentence boundaries"""
-    doc = nlp(text)
-    sentences = [sent.text.strip() for sent in doc.sents if sent.text.strip()]
+def drop_duplicate_chunks(table_name, chunks, skip_duplicates=True, pending=None):
+    """Find chunks that don't near-duplicate chunks already in the table (CPU stage)
     
-    chunks = []
-    current_chunk = []
-    current_length = 0
+    Returns (keep, signatures): indices of chunks to store and their
+    signatures, which are recorded with record_chunk_signatures once the
+    chunks are stored (None when duplicate detection is disabled).
+    """
+    index = get_signature_index()
+    if index is None:
+        return list(range(len(chunks))), None
+    if not skip_duplicates:
+        return list(range(len(chunks))), [simhash(chunk) for chunk in chunks]
+    return index.filter_new(table_name, chunks, pending)
 
-    i = 0
-    while i < len(sentences):
-        sentence = sentences[i]
-        sentence_length = len(sentence.split())
+def record_chunk_signatures(table_name, signatures):
+    """Remember signatures of chunks just written to a table (I/O stage)"""
+    index = get_signature_index()
+    if index is not None and signatures:
+        index.add(table_name, signatures)
 
-        if current_length + sentence_length <= max_words:
-            current_chunk.append(sentence)
-            current_length += sentence_length
-            i += 1
-        else:
-            # Save current chunk
-            chunks.append(" ".join(current_chunk))
-            
-            # Create overlap for context
-            overlap = []
-            overlap_len = 0
-            j = len(current_chunk) - 1
-            
-            while j >= 0 and overlap_len < overlap_words:
-                s = current_chunk[j]
-                overlap.insert(0, s)
-                overlap_len += len(s.split())
-                j -= 1
-                
-            current_chunk = overlap
-            current_length = overlap_len
+# ----------------------------------------------------------------------------
+# Incremental re-ingestion: per-URL records of what is stored
+# ----------------------------------------------------------------------------
+
+document_store = DocumentStore(document_store_path())
+
+def is_unchanged(record, text_hash, config):
+    return record is not None and record["content_hash"] == text_hash and record["chunk_config"] == config
+
+def forget_page_signatures(table_name, record):
+    """Take a page's previous chunks out of the duplicate index before re-ingesting it (I/O stage)
+    
+    Otherwise an edited chunk would count as a near duplicate of its own old version.
+    """
+    index = get_signature_index()
+    if index is not None and record:
+        index.remove(table_name, [entry["signature"] for entry in record["chunks"] if entry["signature"] is not None])
 
-    if current_chunk:
-        chunks.append(" ".join(current_chunk))
+def select_new_chunks(table_name, chunks, plan, skip_duplicates=True, pending=None):
+    """Chunks of a page that must be embedded and written (CPU stage)
+    
+    Drops chunks stored unchanged by an earlier ingestion of the page and
+    near duplicates of other stored chunks. Returns (chunks, raw_ids,
+    signatures, duplicates_skipped).
+    """
+    chunks, raw_ids = plan.split(chunks)
+    keep, signatures = drop_duplicate_chunks(table_name, chunks, skip_duplicates, pending)
+    return [chunks[i] for i in keep], [raw_ids[i] for i in keep], signatures, len(chunks) - len(keep)
+
+def finish_page(table_name, url, plan, validators, text_hash, config):
+    """Delete a page's vanished chunks and save its new record; returns chunks removed (I/O stage)"""
+    removed = plan.removed()
+    delete_chunks(table_name, [entry["id"] for entry in removed])
+    record_chunk_signatures(table_name, [entry["signature"] for entry in plan.kept if entry["signature"] is not None])
+    document_store.save(table_name, url, validators, text_hash, config, plan.entries())
+    return len(removed)
+
+def find_sitemap_urls(sitemap_url):
+    """Expand a sitemap (or sitemap index) into page URLs (I/O stage)"""
+    return sitemap_search(sitemap_url)
+
+async def notify_stage(on_stage, stage, **info):
+    """Await the on_stage callback, if any, as a pipeline stage starts"""
+    if on_stage is not None:
+        await on_stage(stage, **info)
+
+async def fetch_article(url, on_stage=None, on_html=None):
+    """Fetch and extract the article text for one URL; returns (article, validators)
+    
+    Pages in the page cache are revalidated with a conditional request; on
+    304 Not Modified the cached article is returned without extracting again.
+    on_html, if given, is awaited with the page's HTML (e.g. to find links).
+    """
+    page_cache = get_page_cache()
+    await notify_stage(on_stage, "fetching")
+    cached = await run_stage(io_executor, page_cache.get, url) if page_cache is not None else None
+    print(f"Fetching content from: {url}" + (" (revalidating cached copy)" if cached else ""))
+    status, downloaded, validators = await fetch_html(url, conditional_headers(cached))
+    
+    if status == 304 and cached:
+        await run_stage(io_executor, page_cache.revalidated, url, validators, len(cached["html"]))
+        validators = {
+            "etag": validators["etag"] or cached["etag"],
+            "last_modified": validators["last_modified"] or cached["last_modified"],
+        }
+        if on_html is not None:
+            await on_html(cached["html"])
+        if cached["article"]:
+            print("Not modified, using cached article")
+            return cached["article"], validators
+        downloaded = cached["html"]
+    elif not downloaded:
+        detail = "Failed to fetch content from URL" + (f" (HTTP {status})" if status else "")
+        raise HTTPException(status_code=400, detail=detail)
+    else:
+        if page_cache is not None:
+            await run_stage(io_executor, page_cache.put, url, downloaded, validators)
+        if on_html is not None:
+            await on_html(downloaded)
+    
+    await notify_stage(on_stage, "extracting")
+    print("Extracting text from HTML...")
+    try:
+        article = await extract_html(downloaded)
+    except (ExtractionTimeout, ExtractionError) as e:
+        raise HTTPException(status_code=400, detail=f"Failed to extract text from URL: {str(e)}")
+    if not article:
+        raise HTTPException(status_code=400, detail="Failed to extract text from URL")
+    if page_cache is not None:
+        await run_stage(io_executor, page_cache.set_article, url, article)
+    return article, validators
+
+async def read_local_document(document):
+    """Text of a local document; returns (article, validators) like fetch_article"""
+    print(f"Reading {document.source}")
+    try:
+        if document.kind == HTML:
+            article = await extract_html(document.data)
+        elif document.kind == PDF:
+            article = await run_stage(cpu_executor, pdf_to_text, document.data)
+        elif document.kind == MARKDOWN:
+            article = await run_stage(cpu_executor, markdown_to_text, decode_text(document.data))
+        else:
+            article = decode_text(document.data)
+    except (ExtractionTimeout, ExtractionError, UnreadableFile) as e:
+        raise HTTPException(status_code=400, detail=f"Failed to extract text: {str(e)}")
+    if not article or not article.strip():
+        raise HTTPException(status_code=400, detail="No text found in document")
+    return article, {"etag": None, "last_modified": document.modified}
 
+async def chunk_article(article, max_words, overlap_words, on_stage=None, segmenter=None,
+                        max_tokens=None, overlap_tokens=0):
+    """Chunk one article in memory"""
+    await notify_stage(on_stage, "chunking")
+    if max_tokens:
+        print(f"Splitting text into chunks (max {max_tokens} tokens, {overlap_tokens} overlap)...")
+    else:
+        print(f"Splitting text into chunks (max {max_words} words, {overlap_words} overlap)...")
+    chunks = await run_stage(
+        cpu_executor, chunk_text, article, max_words, overlap_words, segmenter, max_tokens, overlap_tokens
+    )
+    if not chunks:
+        raise HTTPException(status_code=400, detail="No text chunks were created")
+    print(f"Created {len(chunks)} chunks")
     return chunks
 
-def table_exists(connection, table_name):
-    """Check if database table exists"""
-    cursor = connection.cursor()
-    cursor.execute("""
-        SELECT COUNT(*) FROM SYSCAT.TABLES 
-        WHERE TABNAME = ? AND TABSCHEMA = CURRENT SCHEMA
-    """, (table_name.upper(),))
-    exists = cursor.fetchone()[0] > 0
-    cursor.close()
-    return exists
-
-def drop_table(connection, table_name):
-    """Drop/delete a database table completely"""
-    cursor = connection.cursor()
+# Articles at least this long are chunked, embedded and stored as a stream
+STREAM_MIN_CHARS = int(os.getenv("CHUNK_STREAM_MIN_CHARS", "200000"))
+STREAM_GROUP_CHUNKS = int(os.getenv("CHUNK_STREAM_GROUP_CHUNKS", "64"))
+
+def next_chunks(chunk_iter, count):
+    """Pull up to count chunks from the streaming chunker (CPU stage)"""
+    return list(islice(chunk_iter, count))
+
+async def stream_document(article, table_name, url, plan, max_words, overlap_words, segmenter=None,
+                          on_progress=None, max_tokens=None, overlap_tokens=0, skip_duplicates=True):
+    """Chunk, embed and store a long article group by group
+    
+    Returns (chunks_created, duplicates_skipped, token_counts).
+    
+    Sentences are segmented in bounded windows, and each group of new chunks
+    is embedded and written while later groups are still being segmented.
+    on_progress, if given, is awaited with the running chunk count after each write.
+    """
+    chunk_iter = stream_chunks(
+        article, max_words, overlap_words, segmenter,
+        token_counter=get_tokenizer() if max_tokens else None, max_tokens=max_tokens, overlap_tokens=overlap_tokens
+    )
+    chunked = asyncio.Queue(maxsize=2)
+    embedded = asyncio.Queue(maxsize=2)
+    written = {"chunks": 0, "duplicates": 0, "seen": 0}
+    token_counts = []
+    pending = {}  # signatures of kept chunks not yet written
+    
+    async def chunker():
+        while chunks := await run_stage(cpu_executor, next_chunks, chunk_iter, STREAM_GROUP_CHUNKS):
+            written["seen"] += len(chunks)
+            chunks, raw_ids, signatures, duplicates = await run_stage(
+                cpu_executor, select_new_chunks, table_name, chunks, plan, skip_duplicates, pending
+            )
+            written["duplicates"] += duplicates
+            if chunks:
+                if max_tokens:
+                    token_counts.extend(await run_stage(cpu_executor, chunk_token_counts, chunks))
+                await chunked.put((chunks, raw_ids, signatures))
+        await chunked.put(None)
+    
+    async def embedder():
+        while (item := await chunked.get()) is not None:
+            chunks = item[0]
+            await embedded.put((*item, await run_stage(cpu_executor, embed_chunks, chunks)))
+        await embedded.put(None)
+    
+    async def writer():
+        while (item := await embedded.get()) is not None:
+            chunks, raw_ids, signatures, vectors = item
+            await run_stage(io_executor, store_chunks, table_name, chunks, vectors, chunk_metadatas(url, raw_ids))
+            await run_stage(io_executor, record_chunk_signatures, table_name, signatures)
+            plan.add_stored(chunks, raw_ids, signatures)
+            written["chunks"] += len(chunks)
+            if on_progress is not None:
+                await on_progress(written["chunks"])
+    
+    tasks = [asyncio.create_task(stage()) for stage in (chunker, embedder, writer)]
     try:
-        cursor.execute(f"DROP TABLE {table_name}")
-        connection.commit()
-        cursor.close()
-        return True
-    except Exception as e:
-        cursor.close()
-        raise e
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    
+    if not written["seen"]:
+        raise HTTPException(status_code=400, detail="No text chunks were created")
+    return written["chunks"], written["duplicates"], token_counts
+
+def drop_existing_table(table_name):
+    """Drop a table if it exists; returns False when it doesn't (I/O stage)"""
+    print("Checking out database connection...")
+    with get_db_connection() as connection:
+        return drop_vector_table(connection, table_name, document_store)
 
-def truncate_table(connection, table_name):
-    """Remove all rows from table but keep table structure"""
-    cursor = connection.cursor()
+def check_database():
+    """Check out and return a pooled connection (validated on checkout)"""
+    with get_db_connection():
+        pass
+
+# ============================================================================
+# INGESTION JOBS
+# ============================================================================
+
+# /ingest enqueues a job and returns at once; a pool of async workers drains
+# the queue so ingestion never depends on the client keeping a connection open
+job_queue = JobQueue(
+    os.getenv("INGEST_JOB_DB", str(Path(__file__).parent / "ingestion_jobs.db")),
+    lease_seconds=float(os.getenv("INGEST_JOB_LEASE_SECONDS", "60")),
+)
+job_wakeup = asyncio.Event()
+job_workers = []
+
+async def run_ingest_job(job):
+    """Run one queued ingestion job, recording stage progress and timings"""
+    payload = job["payload"]
+    timings = {}
+    current = {"stage": None, "started": time.perf_counter()}
+    
+    async def on_stage(stage, chunks_created=None):
+        now = time.perf_counter()
+        if current["stage"] is not None:
+            timings[current["stage"]] = round(now - current["started"], 4)
+        current["stage"], current["started"] = stage, now
+        await run_stage(io_executor, job_queue.set_stage, job["id"], stage, timings, chunks_created)
+    
+    async def on_progress(chunks_created):
+        await run_stage(io_executor, job_queue.set_stage, job["id"], current["stage"], None, chunks_created)
+    
     try:
-        cursor.execute(f"TRUNCATE TABLE {table_name} IMMEDIATE")
-        connection.commit()
-        cursor.close()
-        return True
+        url, table_name = payload["url"], payload["table_name"]
+        article, validators = await fetch_article(url, on_stage)
+        max_tokens = await run_stage(cpu_executor, token_budget, payload.get("chunk_by", "words"), payload.get("max_tokens"))
+        chunking = {
+            "segmenter": payload.get("segmenter"),
+            "max_tokens": max_tokens,
+            "overlap_tokens": payload.get("overlap_tokens", 0),
+        }
+        config = chunk_config(payload["max_words"], payload["overlap_words"], **chunking)
+        text_hash = content_hash(article)
+        record = await run_stage(io_executor, document_store.get, table_name, url)
+        
+        if is_unchanged(record, text_hash, config) and not payload.get("force"):
+            # Same text, same chunking: nothing to embed or write
+            await run_stage(io_executor, document_store.save, table_name, url, validators, text_hash, config, record["chunks"])
+            timings[current["stage"]] = round(time.perf_counter() - current["started"], 4)
+            changes = {"document": UNCHANGED, "chunks_kept": len(record["chunks"]), "chunks_removed": 0}
+            message = f"Unchanged since last ingestion: {len(record['chunks'])} chunks already in '{table_name}'"
+            await run_stage(io_executor, job_queue.finish, job["id"], message, 0, timings, changes=changes)
+            print(f"Job {job['id']} completed: {message}")
+            return
+        
+        plan = ChunkPlan(url, record)
+        skip_duplicates = payload.get("skip_duplicates", True)
+        await run_stage(io_executor, forget_page_signatures, table_name, record)
+        if len(article) >= STREAM_MIN_CHARS:
+            # Long article: chunking, embedding and storing overlap
+            await on_stage("streaming")
+            chunks_created, duplicates, token_counts = await stream_document(
+                article, table_name, url, plan, payload["max_words"], payload["overlap_words"],
+                on_progress=on_progress, skip_duplicates=skip_duplicates, **chunking
+            )
+        else:
+            chunks = await chunk_article(
+                article, payload["max_words"], payload["overlap_words"], on_stage=on_stage, **chunking
+            )
+            chunks, raw_ids, signatures, duplicates = await run_stage(
+                cpu_executor, select_new_chunks, table_name, chunks, plan, skip_duplicates
+            )
+            if duplicates:
+                print(f"Skipping {duplicates} duplicate chunks")
+            
+            token_counts = []
+            if chunks:
+                if max_tokens:
+                    token_counts = await run_stage(cpu_executor, chunk_token_counts, chunks)
+                await on_stage("embedding", chunks_created=len(chunks))
+                print(f"Embedding {len(chunks)} new chunks...")
+                vectors = await run_stage(cpu_executor, embed_chunks, chunks)
+                
+                await on_stage("storing")
+                await run_stage(
+                    io_executor, store_chunks, table_name, chunks, vectors, chunk_metadatas(url, raw_ids)
+                )
+                await run_stage(io_executor, record_chunk_signatures, table_name, signatures)
+                plan.add_stored(chunks, raw_ids, signatures)
+            chunks_created = len(chunks)
+        
+        removed = await run_stage(io_executor, finish_page, table_name, url, plan, validators, text_hash, config)
+        timings[current["stage"]] = round(time.perf_counter() - current["started"], 4)
+        
+        changes = {"document": CHANGED if record else NEW, "chunks_kept": len(plan.kept), "chunks_removed": removed}
+        message = f"Stored {chunks_created} new chunks in '{table_name}'"
+        if record:
+            message += f", kept {len(plan.kept)} unchanged, removed {removed}"
+        if duplicates:
+            message += f" ({duplicates} duplicate chunks skipped)"
+        stats = await run_stage(cpu_executor, token_stats, token_counts, max_tokens) if max_tokens else None
+        await run_stage(
+            io_executor, job_queue.finish, job["id"], message, chunks_created, timings, stats, duplicates, changes
+        )
+        print(f"Job {job['id']} completed: {message}")
     except Exception as e:
-        cursor.close()
-        raise e
+        if current["stage"] is not None:
+            timings[current["stage"]] = round(time.perf_counter() - current["started"], 4)
+        error = e.detail if isinstance(e, HTTPException) else str(e)
+        print(f"Job {job['id']} failed during {current['stage']}: {error}")
+        await run_stage(io_executor, job_queue.fail, job["id"], error, timings)
+
+async def job_worker(worker_id):
+    """Claim and run queued jobs until cancelled"""
+    while True:
+        try:
+            job = await run_stage(io_executor, job_queue.claim_next)
+        except Exception as e:
+            print(f"Job worker {worker_id}: failed to claim job: {e}")
+            job = None
+        
+        if job is None:
+            # Sleep until a job is enqueued (or poll again after a second)
+            job_wakeup.clear()
+            try:
+                await asyncio.wait_for(job_wakeup.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        
+        await run_ingest_job(job)
+
+async def job_leases():
+    """Renew the leases on this process's running jobs, and re-queue jobs of processes that died"""
+    while True:
+        await asyncio.sleep(job_queue.lease_seconds / 3)
+        try:
+            await run_stage(io_executor, job_queue.renew_leases)
+            requeued = await run_stage(io_executor, job_queue.requeue_expired)
+            if requeued:
+                print(f"Re-queued {requeued} ingestion jobs whose worker stopped renewing its lease")
+        except Exception as e:
+            print(f"Warning: Renewing job leases failed: {e}")
+
+def start_job_workers():
+    """Re-queue interrupted jobs and start the worker pool"""
+    if job_workers:
+        return
+    requeued = job_queue.requeue_expired()
+    if requeued:
+        print(f"Re-queued {requeued} interrupted ingestion jobs")
+    job_workers.append(asyncio.create_task(job_leases()))
+    for worker_id in range(int(os.getenv("INGEST_JOB_WORKERS", "4"))):
+        job_workers.append(asyncio.create_task(job_worker(worker_id)))
+
+async def stop_job_workers():
+    """Cancel the worker pool and put its unfinished jobs back in the queue"""
+    for task in job_workers:
+        task.cancel()
+    await asyncio.gather(*job_workers, return_exceptions=True)
+    job_workers.clear()
+    released = await run_stage(io_executor, job_queue.release)
+    if released:
+        print(f"Re-queued {released} unfinished ingestion jobs")
 
 # ============================================================================
 # API ENDPOINTS
 # ============================================================================
 
-@app.post("/ingest", response_model=IngestResponse)
+@app.on_event("startup")
+async def startup_event():
+    """Start job workers, then warm up the embedding model, DB2 pool and extraction processes so the first ingest doesn't pay for them"""
+    start_job_workers()
+    
+    try:
+        await run_stage(io_executor, get_extraction_pool)
+    except Exception as e:
+        print(f"Warning: Starting extraction processes failed: {e}")
+    
+    try:
+        await run_stage(cpu_executor, registry.warm_up, get_embedding_model_path())
+    except Exception as e:
+        print(f"Warning: Embedding model warm-up failed: {e}")
+    
+    try:
+        await run_stage(io_executor, get_pool().prefill)
+    except Exception as e:
+        print(f"Warning: Database pool prefill failed: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop job workers, the HTTP client, extraction and segmentation processes"""
+    await stop_job_workers()
+    await close_fetcher()
+    await run_stage(io_executor, close_extraction_pool)
+    await run_stage(io_executor, close_segmentation_pools)
+
+@app.post("/ingest", response_model=JobResponse, status_code=202)
 async def ingest_document(request: IngestRequest):
     """
-    Ingest document from URL into vector database
+    Queue a document URL for ingestion into vector database
     
-    Steps: fetch URL -> extract text -> chunk -> embed -> store in DB2
+    Returns a job id immediately; poll GET /jobs/{job_id} for progress.
+    Job steps: fetch URL -> extract text -> chunk -> embed -> store in DB2
     """
     try:
-        # Fetch and extract text
-        print(f"Fetching content from: {request.url}")
-        downloaded = trafilatura.fetch_url(str(request.url))
-        if not downloaded:
-            raise HTTPException(status_code=400, detail="Failed to fetch content from URL")
-        
-        print("Extracting text from HTML...")
-        article = trafilatura.extract(downloaded)
-        if not article:
-            raise HTTPException(status_code=400, detail="Failed to extract text from URL")
-        
-        # Chunk text
-        print(f"Splitting text into chunks (max {request.max_words} words, {request.overlap_words} overlap)...")
-        chunks = chunk_text(article, request.max_words, request.overlap_words)
+        job_id = await run_stage(io_executor, job_queue.enqueue, "ingest", {
+            "url": str(request.url),
+            "table_name": request.table_name,
+            "max_words": request.max_words,
+            "overlap_words": request.overlap_words,
+            "segmenter": request.segmenter,
+            "chunk_by": request.chunk_by,
+            "max_tokens": request.max_tokens,
+            "overlap_tokens": request.overlap_tokens,
+            "skip_duplicates": request.skip_duplicates,
+            "force": request.force,
+        })
+    except Exception as e:
+        print(f"Error queueing ingestion: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to queue ingestion: {str(e)}")
+    
+    job_wakeup.set()
+    print(f"Queued ingestion job {job_id} for {request.url}")
+    
+    return JobResponse(
+        success=True,
+        message=f"Ingestion of {request.url} queued",
+        job_id=job_id,
+        status=QUEUED
+    )
+
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    """Report stage, chunk count and timings of an ingestion job"""
+    job = await run_stage(io_executor, job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    
+    queued_seconds = run_seconds = None
+    if job["started_at"] is not None:
+        queued_seconds = round(job["started_at"] - job["created_at"], 4)
+        run_seconds = round((job["finished_at"] or time.time()) - job["started_at"], 4)
+    
+    return JobStatusResponse(
+        job_id=job["id"],
+        status=job["status"],
+        stage=job["stage"],
+        url=job["payload"].get("url"),
+        table_name=job["payload"].get("table_name"),
+        chunks_created=job["chunks_created"],
+        duplicates_skipped=job["duplicates_skipped"],
+        message=job["message"],
+        error=job["error"],
+        stage_timings=job["stage_timings"],
+        token_stats=job["token_stats"],
+        changes=job["changes"],
+        queued_seconds=queued_seconds,
+        run_seconds=run_seconds
+    )
+
+async def ingest_pages(request, feed):
+    """
+    Run the batch pipeline over the pages a feed hands to it
+    
+    feed(process) awaits process(url, on_html=None, load=None) for every page
+    to ingest and returns once they are all processed; load, if given, is
+    awaited for (article, validators) instead of fetching the URL. Pages are fetched and extracted
+    concurrently (up to max_concurrency at once). Extracted articles are
+    segmented together through nlp.pipe in batches of chunk_batch_size using
+    chunk_processes worker processes, then embedded (up to max_concurrency
+    pages at once), while a single writer stores finished chunks in DB2 in
+    batches of write_batch_size. Every stage waits on the next one, so
+    memory stays bounded however fast pages arrive.
+    
+    Returns the summary fields shared by batch and crawl responses.
+    """
+    started = time.perf_counter()
+    results = {}
+    semaphore = asyncio.Semaphore(request.max_concurrency)
+    embed_slots = asyncio.Semaphore(request.max_concurrency)
+    articles = asyncio.Queue(maxsize=request.max_concurrency * 2)
+    ready = asyncio.Queue(maxsize=request.max_concurrency * 2)
+    chunk_batch_size = request.chunk_batch_size or PIPE_BATCH_SIZE
+    max_tokens = await run_stage(cpu_executor, token_budget, request.chunk_by, request.max_tokens)
+    tokenizer = await run_stage(cpu_executor, get_tokenizer) if max_tokens else None
+    token_counts = {}
+    pending = {}  # signatures of chunks kept earlier in this batch
+    config = chunk_config(request.max_words, request.overlap_words, request.segmenter, max_tokens, request.overlap_tokens)
+    pages = {}  # url -> what is needed to finish the page once its chunks are stored
+    
+    async def process(url, on_html=None, load=None):
+        results[url] = UrlIngestStatus(url=url, success=False)
+        async with semaphore:
+            try:
+                if load is None:
+                    article, validators = await fetch_article(url, on_html=on_html)
+                else:
+                    article, validators = await load()
+                text_hash = content_hash(article)
+                record = await run_stage(io_executor, document_store.get, request.table_name, url)
+                if is_unchanged(record, text_hash, config) and not request.force:
+                    await run_stage(
+                        io_executor, document_store.save, request.table_name, url, validators, text_hash, config, record["chunks"]
+                    )
+                    results[url].success = True
+                    results[url].document_status = UNCHANGED
+                    results[url].chunks_kept = len(record["chunks"])
+                    return
+            except HTTPException as e:
+                results[url].error = e.detail
+                return
+            except Exception as e:
+                results[url].error = str(e)
+                return
+        pages[url] = {
+            "plan": ChunkPlan(url, record), "record": record, "validators": validators, "hash": text_hash,
+        }
+        await articles.put((url, article))
+    
+    async def finish(url):
+        page = pages[url]
+        removed = await run_stage(
+            io_executor, finish_page, request.table_name, url, page["plan"], page["validators"], page["hash"], config
+        )
+        results[url].success = True
+        results[url].document_status = CHANGED if page["record"] else NEW
+        results[url].chunks_kept = len(page["plan"].kept)
+        results[url].chunks_removed = removed
+    
+    async def embed(url, chunks):
         if not chunks:
-            raise HTTPException(status_code=400, detail="No text chunks were created")
-        print(f"Created {len(chunks)} chunks")
-        
-        # Setup database and embeddings
-        print("Connecting to database...")
-        connection = get_db_connection()
-        
-        print("Loading embedding model...")
-        embeddings = get_embeddings()
+            results[url].error = "No text chunks were created"
+            return
+        try:
+            plan = pages[url]["plan"]
+            await run_stage(io_executor, forget_page_signatures, request.table_name, pages[url]["record"])
+            chunks, raw_ids, signatures, duplicates = await run_stage(
+                cpu_executor, select_new_chunks, request.table_name, chunks, plan, request.skip_duplicates, pending
+            )
+            results[url].duplicates_skipped = duplicates
+            if not chunks:
+                # Nothing new on this page
+                await finish(url)
+                return
+            if max_tokens:
+                token_counts[url] = await run_stage(cpu_executor, chunk_token_counts, chunks)
+            vectors = await run_stage(cpu_executor, embed_chunks, chunks)
+        except Exception as e:
+            results[url].error = str(e)
+            return
+        await ready.put((url, chunks, vectors, signatures, raw_ids))
+    
+    async def embed_released(url, chunks):
+        try:
+            await embed(url, chunks)
+        finally:
+            embed_slots.release()
+    
+    async def chunker():
+        # Segment whatever articles are waiting (up to chunk_batch_size) in one nlp.pipe pass
+        embedding = []
+        done = False
+        while not done:
+            item = await articles.get()
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < chunk_batch_size and not articles.empty():
+                item = articles.get_nowait()
+                if item is None:
+                    done = True
+                    break
+                batch.append(item)
+            
+            batch_urls = [url for url, _ in batch]
+            try:
+                chunked = await run_stage(
+                    cpu_executor, chunk_texts, [article for _, article in batch],
+                    request.max_words, request.overlap_words, request.segmenter,
+                    chunk_batch_size, request.chunk_processes,
+                    tokenizer, max_tokens, request.overlap_tokens
+                )
+            except Exception as e:
+                for url in batch_urls:
+                    results[url].error = f"Chunking failed: {str(e)}"
+                continue
+            for url, chunks in zip(batch_urls, chunked):
+                # Wait for a free embed slot, so extraction stalls when embedding falls behind
+                await embed_slots.acquire()
+                embedding = [task for task in embedding if not task.done()]
+                embedding.append(asyncio.create_task(embed_released(url, chunks)))
+        await asyncio.gather(*embedding)
+    
+    async def flush(batch):
+        texts = [text for _, chunks, _, _, _ in batch for text in chunks]
+        vectors = [vector for _, _, vecs, _, _ in batch for vector in vecs]
+        signatures = [sig for _, _, _, sigs, _ in batch for sig in sigs or ()]
+        metadatas = [meta for url, _, _, _, raw_ids in batch for meta in chunk_metadatas(url, raw_ids)]
+        try:
+            await run_stage(io_executor, store_chunks, request.table_name, texts, vectors, metadatas)
+            await run_stage(io_executor, record_chunk_signatures, request.table_name, signatures)
+        except Exception as e:
+            for url, _, _, _, _ in batch:
+                results[url].error = f"Database write failed: {str(e)}"
+            return
+        for url, chunks, _, sigs, raw_ids in batch:
+            pages[url]["plan"].add_stored(chunks, raw_ids, sigs)
+            results[url].chunks_created = len(chunks)
+            try:
+                await finish(url)
+            except Exception as e:
+                results[url].error = f"Updating document record failed: {str(e)}"
+    
+    async def writer():
+        batch, batch_chunks = [], 0
+        while True:
+            item = await ready.get()
+            if item is None:
+                break
+            batch.append(item)
+            batch_chunks += len(item[1])
+            if batch_chunks >= request.write_batch_size:
+                await flush(batch)
+                batch, batch_chunks = [], 0
+        if batch:
+            await flush(batch)
+    
+    writer_task = asyncio.create_task(writer())
+    chunker_task = asyncio.create_task(chunker())
+    await feed(process)
+    await articles.put(None)
+    await chunker_task
+    await ready.put(None)
+    await writer_task
+    
+    elapsed = time.perf_counter() - started
+    succeeded = [r for r in results.values() if r.success]
+    chunks_created = sum(r.chunks_created for r in succeeded)
+    stats = None
+    if max_tokens:
+        # Token stats only when chunking by tokens: words mode never loads the tokenizer
+        stats = await run_stage(
+            cpu_executor, token_stats, [n for r in succeeded for n in token_counts.get(r.url, [])], max_tokens
+        )
+    return {
+        "success": len(succeeded) > 0,
+        "results": list(results.values()),
+        "urls_succeeded": len(succeeded),
+        "urls_failed": len(results) - len(succeeded),
+        "chunks_created": chunks_created,
+        "duplicates_skipped": sum(r.duplicates_skipped for r in succeeded),
+        "elapsed_seconds": round(elapsed, 3),
+        "urls_per_second": round(len(results) / elapsed, 3) if elapsed else 0.0,
+        "chunks_per_second": round(chunks_created / elapsed, 3) if elapsed else 0.0,
+        "token_stats": stats,
+    }
+
+@app.post("/ingest/batch", response_model=BatchIngestResponse)
+async def ingest_batch(request: BatchIngestRequest):
+    """
+    Ingest many URLs (listed and/or from a sitemap) into vector database
+    
+    See ingest_pages for how the pages flow through the pipeline.
+    """
+    urls = [str(url) for url in request.urls]
+    if request.sitemap_url:
+        print(f"Reading sitemap: {request.sitemap_url}")
+        try:
+            urls.extend(await run_stage(io_executor, find_sitemap_urls, str(request.sitemap_url)))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Failed to read sitemap: {str(e)}")
+    urls = list(dict.fromkeys(urls))  # de-duplicate, keep order
+    if not urls:
+        raise HTTPException(status_code=400, detail="No URLs to ingest")
+    
+    async def feed(process):
+        await asyncio.gather(*(process(url) for url in urls))
+    
+    print(f"Batch ingesting {len(urls)} URLs (concurrency {request.max_concurrency})...")
+    summary = await ingest_pages(request, feed)
+    print(f"Batch ingestion finished: {summary['urls_succeeded']}/{len(urls)} URLs, "
+          f"{summary['chunks_created']} chunks in {summary['elapsed_seconds']:.1f}s")
+    
+    return BatchIngestResponse(
+        message=f"Ingested {summary['urls_succeeded']} of {len(urls)} URLs into '{request.table_name}'",
+        **summary
+    )
+
+@app.post("/ingest/crawl", response_model=CrawlResponse)
+async def ingest_crawl(request: CrawlRequest):
+    """
+    Crawl a site into vector database
+    
+    Starts from the seed URLs and/or the pages of a sitemap and follows links
+    breadth-first, up to max_depth hops and max_pages pages, staying on the
+    allowed hosts (and under path_prefix). Each URL is visited once. Pages go
+    through the batch pipeline (see ingest_pages) as they are fetched; links
+    are read from each page's HTML while earlier pages are still being
+    chunked, embedded and stored.
+    """
+    seeds = [str(url) for url in request.urls]
+    sitemap_urls = []
+    if request.sitemap_url:
+        print(f"Reading sitemap: {request.sitemap_url}")
+        try:
+            sitemap_urls = await run_stage(io_executor, find_sitemap_urls, str(request.sitemap_url))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Failed to read sitemap: {str(e)}")
+    
+    hosts = request.allowed_hosts or {
+        urlsplit(url).netloc for url in seeds + ([str(request.sitemap_url)] if request.sitemap_url else [])
+    }
+    frontier = Frontier(CrawlScope(hosts, request.path_prefix), request.max_pages, request.max_depth)
+    fetcher = get_fetcher()
+    robots = RobotsRules(fetcher.fetch, fetcher.client.headers["User-Agent"]) if request.respect_robots else None
+    links_found = 0
+    depth_reached = 0
+    
+    async def admit(urls, depth, check_scope=True):
+        # robots.txt is checked before a URL takes one of the max_pages slots
+        for url in urls:
+            url = frontier.candidate(url, depth, check_scope)
+            if url is not None and (robots is None or await robots.allowed(url)):
+                frontier.push(url, depth)
+    
+    await admit(seeds, 0, check_scope=False)  # seeds are crawled even if outside allowed_hosts
+    await admit(sitemap_urls, 0)
+    if frontier.queue.empty():
+        raise HTTPException(status_code=400, detail="No URLs to crawl")
+    
+    async def feed(process):
+        async def visit(url, depth):
+            nonlocal depth_reached
+            depth_reached = max(depth_reached, depth)
+            
+            async def follow_links(html):
+                nonlocal links_found
+                if depth < request.max_depth:
+                    links = await run_stage(cpu_executor, extract_links, html, url)
+                    links_found += len(links)
+                    await admit(links, depth + 1)
+            
+            await process(url, on_html=follow_links)
         
-        # Store in database
-        print(f"Checking if table '{request.table_name}' exists...")
+        async def crawler():
+            while True:
+                url, depth = await frontier.queue.get()
+                try:
+                    await visit(url, depth)
+                except Exception as e:
+                    print(f"Crawling {url} failed: {str(e)}")
+                finally:
+                    frontier.queue.task_done()
         
-        if table_exists(connection, request.table_name):
-            print("Table exists - adding chunks to existing table...")
-            vectorstore = DB2VS(
-                client=connection, 
-                table_name=request.table_name,
-                embedding_function=embeddings
-            )
-            vectorstore.add_texts(texts=chunks)
-            message = f"Added {len(chunks)} chunks to existing table '{request.table_name}'"
-        else:
-            print("Table doesn't exist - creating new table...")
-            vectorstore = DB2VS.from_texts(
-                texts=chunks,
-                embedding=embeddings,
-                client=connection,
-                table_name=request.table_name,
-                distance_strategy=DistanceStrategy.EUCLIDEAN_DISTANCE,
-            )
-            message = f"Created table '{request.table_name}' with {len(chunks)} chunks"
+        crawlers = [asyncio.create_task(crawler()) for _ in range(request.max_concurrency)]
+        await frontier.queue.join()
+        for task in crawlers:
+            task.cancel()
+        await asyncio.gather(*crawlers, return_exceptions=True)
+    
+    print(f"Crawling {', '.join(sorted(hosts))} (max {request.max_pages} pages, depth {request.max_depth})...")
+    summary = await ingest_pages(request, feed)
+    pages = len(summary["results"])
+    print(f"Crawl finished: {summary['urls_succeeded']}/{pages} pages, "
+          f"{summary['chunks_created']} chunks in {summary['elapsed_seconds']:.1f}s "
+          f"({summary['urls_per_second']} pages/s, {summary['chunks_per_second']} chunks/s)")
+    
+    return CrawlResponse(
+        message=f"Crawled {pages} pages, ingested {summary['urls_succeeded']} into '{request.table_name}'",
+        urls_discovered=len(frontier.seen),
+        links_found=links_found,
+        urls_out_of_scope=frontier.counters["out_of_scope"] + frontier.counters["too_deep"],
+        urls_over_limit=frontier.counters["over_limit"],
+        urls_disallowed=robots.disallowed if robots is not None else 0,
+        depth_reached=depth_reached,
+        **summary
+    )
+
+# Local directories /ingest/files may read (os.pathsep-separated); unset disables it
+FILE_ROOTS = [Path(root).resolve() for root in os.getenv("INGEST_FILE_ROOTS", "").split(os.pathsep) if root]
+FILE_MAX_BYTES = int(float(os.getenv("INGEST_FILE_MAX_MB", "50")) * 1024 * 1024)
+
+def resolve_local_path(path):
+    """Resolve a requested path, which must exist under one of FILE_ROOTS
+    
+    Files found while walking a directory are checked the same way (see LocalSources).
+    """
+    resolved = (FILE_ROOTS[0] / Path(path).expanduser()).resolve()
+    if not any(resolved.is_relative_to(root) for root in FILE_ROOTS):
+        raise HTTPException(status_code=403, detail=f"Path is outside INGEST_FILE_ROOTS: {path}")
+    if not resolved.exists():
+        raise HTTPException(status_code=400, detail=f"Path not found: {path}")
+    return resolved
+
+@app.post("/ingest/files", response_model=FileIngestResponse)
+async def ingest_files(request: FileIngestRequest):
+    """
+    Ingest local files, directories and archives into vector database
+    
+    Directories are walked; tarballs, zip files and WARC files (gzipped or
+    not) are read one member or record at a time, so archives are never
+    loaded into memory whole and at most a few documents wait between
+    reading and extraction. HTML goes through the extraction process pool,
+    Markdown, plain text and PDF are read directly. Documents then flow
+    through the batch pipeline (see ingest_pages) and are written to DB2 in
+    batches of write_batch_size. A document's source (its file:// URI, or
+    the captured URL for WARC records) plays the part of the page URL, so
+    re-ingesting unchanged documents is skipped.
+    """
+    if not FILE_ROOTS:
+        raise HTTPException(status_code=403, detail="Local file ingestion is disabled; set INGEST_FILE_ROOTS")
+    paths = [resolve_local_path(path) for path in request.paths]
+    if not paths:
+        raise HTTPException(status_code=400, detail="No paths to ingest")
+    sources = LocalSources(paths, FILE_MAX_BYTES, roots=FILE_ROOTS)
+    repeated = 0
+    
+    async def feed(process):
+        documents = iter(sources)
+        queue = asyncio.Queue(maxsize=request.max_concurrency * 2)
+        seen = set()
         
-        connection.close()
-        print("Ingestion completed successfully!")
+        async def reader():
+            nonlocal repeated
+            # One reader advances the (blocking) walk; archives must be read in order
+            try:
+                while (document := await run_stage(io_executor, next, documents, None)) is not None:
+                    if document.source in seen:
+                        repeated += 1
+                        continue
+                    seen.add(document.source)
+                    await queue.put(document)
+            finally:
+                for _ in range(request.max_concurrency):
+                    await queue.put(None)
         
-        return IngestResponse(
-            success=True,
-            message=message,
-            chunks_created=len(chunks)
-        )
+        async def worker():
+            while (document := await queue.get()) is not None:
+                await process(document.source, load=functools.partial(read_local_document, document))
         
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Error during ingestion: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Ingestion failed: {str(e)}")
+        await asyncio.gather(reader(), *(worker() for _ in range(request.max_concurrency)))
+    
+    print(f"Ingesting local files from {', '.join(str(path) for path in paths)} (concurrency {request.max_concurrency})...")
+    summary = await ingest_pages(request, feed)
+    counters = sources.counters
+    print(f"File ingestion finished: {summary['urls_succeeded']}/{len(summary['results'])} documents, "
+          f"{summary['chunks_created']} chunks in {summary['elapsed_seconds']:.1f}s "
+          f"({summary['urls_per_second']} documents/s, {summary['chunks_per_second']} chunks/s)")
+    
+    return FileIngestResponse(
+        message=f"Ingested {summary['urls_succeeded']} of {len(summary['results'])} documents into '{request.table_name}'",
+        documents_found=counters["documents"],
+        documents_repeated=repeated,
+        documents_unsupported=counters["unsupported"],
+        documents_too_large=counters["too_large"],
+        archives_read=counters["archives"],
+        files_unreadable=counters["unreadable"],
+        files_outside_roots=counters["outside_roots"],
+        **summary
+    )
 
 @app.post("/clear", response_model=ClearResponse)
 async def clear_table(request: ClearRequest):
@@ -267,22 +1268,12 @@ async def clear_table(request: ClearRequest):
                 detail="Must set 'confirm=true' to clear table. This action cannot be undone."
             )
         
-        print(f"Connecting to database...")
-        connection = get_db_connection()
-        
-        print(f"Checking if table '{request.table_name}' exists...")
-        if not table_exists(connection, request.table_name):
-            connection.close()
+        if not await run_stage(io_executor, drop_existing_table, request.table_name):
             raise HTTPException(
                 status_code=404, 
                 detail=f"Table '{request.table_name}' does not exist"
             )
         
-        # Drop the table completely
-        print(f"Dropping table '{request.table_name}'...")
-        drop_table(connection, request.table_name)
-        
-        connection.close()
         print(f"Table '{request.table_name}' cleared successfully!")
         
         return ClearResponse(
@@ -299,11 +1290,36 @@ async def clear_table(request: ClearRequest):
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {
+    status = {
         "status": "healthy", 
         "service": "Document Ingestion API",
         "description": "Ready to ingest documents into vector database"
     }
+    
+    # Check database (checkout validates the pooled connection)
+    try:
+        await run_stage(io_executor, check_database)
+        status["database"] = "healthy"
+    except Exception as e:
+        status["database"] = f"error: {str(e)}"
+        status["status"] = "unhealthy"
+    
+    status["embedding_models"] = registry.stats()
+    status["embedding_services"] = all_service_stats()
+    status["embedding_cache"] = cache_stats()
+    signature_index = get_signature_index()
+    status["chunk_dedup"] = signature_index.stats() if signature_index is not None else None
+    status["documents"] = await run_stage(io_executor, document_store.counts)
+    bulk_writer = get_bulk_writer()
+    status["bulk_writer"] = bulk_writer.stats() if bulk_writer is not None else None
+    status["fetcher"] = fetcher_stats()
+    status["extraction"] = extraction_stats()
+    page_cache = get_page_cache()
+    status["page_cache"] = await run_stage(io_executor, page_cache.stats) if page_cache is not None else None
+    status["database_pools"] = all_pool_stats()
+    status["jobs"] = await run_stage(io_executor, job_queue.counts)
+    status["job_workers"] = len(job_workers)
+    return status
 
 # ============================================================================
 # APPLICATION STARTUP
@@ -0,0 +1,178 @@
+"""
+Ingestion Job Queue
+
+Persistent, SQLite-backed queue of ingestion jobs. Jobs survive restarts
+and several service processes may share one queue: a worker that claims a
+job holds a lease on it and renews it while the job runs. Jobs whose lease
+ran out (their process died) are re-queued; jobs another live process is
+running are left alone.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+# Job lifecycle
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+class JobQueue:
+    """Thread-safe job queue stored in a local SQLite database
+
+    worker_id identifies this process as the owner of the jobs it claims.
+    """
+
+    def __init__(self, db_path, lease_seconds=60.0):
+        self.db_path = str(db_path)
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    chunks_created INTEGER NOT NULL DEFAULT 0,
+                    message TEXT,
+                    error TEXT,
+                    stage_timings TEXT NOT NULL DEFAULT '{}',
+                    token_stats TEXT,
+                    duplicates_skipped INTEGER NOT NULL DEFAULT 0,
+                    changes TEXT,
+                    worker_id TEXT,
+                    lease_expires REAL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            # Job databases created before these columns existed
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for column, definition in (
+                ("token_stats", "TEXT"),
+                ("duplicates_skipped", "INTEGER NOT NULL DEFAULT 0"),
+                ("changes", "TEXT"),
+                ("worker_id", "TEXT"),
+                ("lease_expires", "REAL"),
+            ):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+
+    def enqueue(self, kind, payload):
+        """Add a job and return its id"""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, stage, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), QUEUED, QUEUED, time.time())
+            )
+        return job_id
+
+    def claim_next(self):
+        """Atomically mark the oldest queued job as running under this worker's lease and return it (or None)"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("""
+                UPDATE jobs SET status = ?, started_at = ?, worker_id = ?, lease_expires = ?
+                WHERE id = (SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1)
+                RETURNING *
+            """, (RUNNING, now, self.worker_id, now + self.lease_seconds, QUEUED)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def renew_leases(self):
+        """Extend the lease on every job this worker is running; returns how many"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE status = ? AND worker_id = ?",
+                (time.time() + self.lease_seconds, RUNNING, self.worker_id)
+            )
+        return cursor.rowcount
+
+    def set_stage(self, job_id, stage, stage_timings=None, chunks_created=None):
+        """Record the stage a running job has reached"""
+        with self._lock:
+            self._conn.execute("""
+                UPDATE jobs SET stage = ?,
+                    stage_timings = COALESCE(?, stage_timings),
+                    chunks_created = COALESCE(?, chunks_created)
+                WHERE id = ?
+            """, (stage, json.dumps(stage_timings) if stage_timings is not None else None, chunks_created, job_id))
+
+    def finish(self, job_id, message, chunks_created, stage_timings, token_stats=None, duplicates_skipped=0,
+               changes=None):
+        """Mark a job as succeeded"""
+        self._complete(job_id, SUCCEEDED, "done", message, None, chunks_created, stage_timings,
+                       token_stats, duplicates_skipped, changes)
+
+    def fail(self, job_id, error, stage_timings):
+        """Mark a job as failed, keeping the stage it failed in"""
+        self._complete(job_id, FAILED, None, None, error, None, stage_timings)
+
+    def _complete(self, job_id, status, stage, message, error, chunks_created, stage_timings,
+                  token_stats=None, duplicates_skipped=0, changes=None):
+        # Only the lease holder completes a job: one re-queued after its lease ran out belongs to its new worker
+        with self._lock:
+            self._conn.execute("""
+                UPDATE jobs SET status = ?, stage = COALESCE(?, stage), message = ?, error = ?,
+                    chunks_created = COALESCE(?, chunks_created),
+                    stage_timings = ?, token_stats = ?, duplicates_skipped = ?, changes = ?,
+                    finished_at = ?, lease_expires = NULL
+                WHERE id = ? AND worker_id = ?
+            """, (status, stage, message, error, chunks_created, json.dumps(stage_timings),
+                  json.dumps(token_stats) if token_stats is not None else None, duplicates_skipped,
+                  json.dumps(changes) if changes is not None else None, time.time(), job_id, self.worker_id))
+
+    def get(self, job_id):
+        """Return a job as a dict, or None if unknown"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def requeue_expired(self):
+        """Put running jobs whose lease ran out (their worker died) back in the queue; returns how many
+
+        Jobs from databases that predate leases have none and count as expired.
+        """
+        with self._lock:
+            cursor = self._conn.execute("""
+                UPDATE jobs SET status = ?, stage = ?, started_at = NULL, worker_id = NULL, lease_expires = NULL
+                WHERE status = ? AND (lease_expires IS NULL OR lease_expires < ?)
+            """, (QUEUED, QUEUED, RUNNING, time.time()))
+        return cursor.rowcount
+
+    def release(self):
+        """Put the jobs this worker is running back in the queue (on shutdown); returns how many"""
+        with self._lock:
+            cursor = self._conn.execute("""
+                UPDATE jobs SET status = ?, stage = ?, started_at = NULL, worker_id = NULL, lease_expires = NULL
+                WHERE status = ? AND worker_id = ?
+            """, (QUEUED, QUEUED, RUNNING, self.worker_id))
+        return cursor.rowcount
+
+    def counts(self):
+        """Number of jobs per status"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    @staticmethod
+    def _to_dict(row):
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["stage_timings"] = json.loads(job["stage_timings"])
+        job["token_stats"] = json.loads(job["token_stats"]) if job["token_stats"] else None
+        job["changes"] = json.loads(job["changes"]) if job["changes"] else None
+        return job
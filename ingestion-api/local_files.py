@@ -0,0 +1,321 @@
+"""
+Local Files and Archives
+
+Reads documents for ingestion from local directories, tarballs, zip files
+and WARC files without loading whole archives into memory: directories are
+walked, tar and WARC files are read as streams one member or record at a
+time (gzip, bzip2 and xz compression included), and tarballs of WARC files
+are read record by record too.
+
+Documents are HTML, Markdown, plain text and PDF (PDF needs the optional
+pypdf package: pip install pypdf). A WARC response record keeps the URL it
+was captured from as its source.
+"""
+
+import gzip
+import io
+import os
+import re
+import tarfile
+import zipfile
+import zlib
+from collections import namedtuple
+from datetime import datetime
+from email.utils import formatdate
+from pathlib import Path, PurePosixPath
+
+HTML = "html"
+MARKDOWN = "markdown"
+TEXT = "text"
+PDF = "pdf"
+
+DOCUMENT_EXTENSIONS = {
+    ".html": HTML, ".htm": HTML, ".xhtml": HTML,
+    ".md": MARKDOWN, ".markdown": MARKDOWN,
+    ".txt": TEXT,
+    ".pdf": PDF,
+}
+
+CONTENT_TYPES = {
+    "text/html": HTML, "application/xhtml+xml": HTML,
+    "text/markdown": MARKDOWN, "text/x-markdown": MARKDOWN,
+    "text/plain": TEXT,
+    "application/pdf": PDF,
+}
+
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+WARC_SUFFIXES = (".warc", ".warc.gz")
+
+# source: file:// URI (archive members add #member) or the URL a WARC record captured
+# modified: HTTP date, stored as the document's Last-Modified
+LocalDocument = namedtuple("LocalDocument", ["source", "kind", "data", "modified"])
+
+class UnreadableFile(Exception):
+    pass
+
+def _http_date(timestamp):
+    return formatdate(timestamp, usegmt=True) if timestamp else None
+
+def _suffix(name):
+    return PurePosixPath(name.lower()).suffix
+
+def _is_tar(name):
+    return name.lower().endswith(TAR_SUFFIXES)
+
+def _is_warc(name):
+    return name.lower().endswith(WARC_SUFFIXES)
+
+# ----------------------------------------------------------------------------
+# Text from non-HTML documents (HTML goes through trafilatura)
+# ----------------------------------------------------------------------------
+
+_FRONT_MATTER = re.compile(r"\A---\n.*?\n---\n", re.DOTALL)
+_FENCE = re.compile(r"^\s*(```|~~~).*$", re.MULTILINE)
+_IMAGE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_LINK = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+_REFERENCE = re.compile(r"^\s*\[[^\]]+\]:\s+\S+.*$", re.MULTILINE)
+_HEADING = re.compile(r"^\s{0,3}#{1,6}\s+", re.MULTILINE)
+_TAG = re.compile(r"<[^>\n]+>")
+_EMPHASIS = re.compile(r"(\*\*|__|\*|`)")
+
+def decode_text(data):
+    return data.decode("utf-8-sig", errors="replace")
+
+def markdown_to_text(markdown):
+    """Prose of a Markdown document: markup, link targets and front matter removed"""
+    text = _FRONT_MATTER.sub("", markdown.replace("\r\n", "\n"))
+    text = _FENCE.sub("", text)
+    text = _IMAGE.sub(r"\1", text)
+    text = _LINK.sub(r"\1", text)
+    text = _REFERENCE.sub("", text)
+    text = _HEADING.sub("", text)
+    text = _TAG.sub("", text)
+    return _EMPHASIS.sub("", text)
+
+def pdf_to_text(data):
+    """Text of a PDF's pages (CPU stage); needs the optional pypdf package"""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise UnreadableFile("PDF support requires the pypdf package (pip install pypdf)")
+    try:
+        reader = PdfReader(io.BytesIO(data))
+        return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+    except Exception as e:
+        raise UnreadableFile(f"Failed to read PDF: {str(e) or type(e).__name__}")
+
+# ----------------------------------------------------------------------------
+# WARC
+# ----------------------------------------------------------------------------
+
+def _read_headers(stream):
+    """Header lines up to the next blank line as a lower-cased dict; None at end of stream"""
+    headers = {}
+    line = stream.readline()
+    while line in (b"\r\n", b"\n"):  # records are separated by blank lines
+        line = stream.readline()
+    if not line:
+        return None
+    while line and line not in (b"\r\n", b"\n"):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+        line = stream.readline()
+    return headers
+
+def _skip(stream, length):
+    while length > 0:
+        data = stream.read(min(length, 1024 * 1024))
+        if not data:
+            break
+        length -= len(data)
+
+def _dechunk(body):
+    """Undo HTTP chunked transfer encoding"""
+    stream, out = io.BytesIO(body), bytearray()
+    while True:
+        size = stream.readline().split(b";")[0].strip()
+        if not size:
+            break
+        size = int(size, 16)
+        if size == 0:
+            break
+        out.extend(stream.read(size))
+        stream.readline()
+    return bytes(out)
+
+def _http_payload(block):
+    """(status, content type, body) of an HTTP response stored in a WARC record"""
+    head, _, body = block.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    parts = lines[0].split()
+    status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip().lower()
+    if "chunked" in headers.get("transfer-encoding", ""):
+        body = _dechunk(body)
+    encoding = headers.get("content-encoding", "")
+    if encoding in ("gzip", "x-gzip", "deflate"):
+        # wbits 47 accepts gzip and zlib streams alike
+        body = zlib.decompressobj(47).decompress(body)
+    return status, headers.get("content-type", ""), body
+
+def _warc_date(value):
+    try:
+        return _http_date(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+    except (AttributeError, ValueError):
+        return None
+
+def warc_documents(stream, max_bytes, counters):
+    """Documents in a WARC stream: 200 responses and resource records with a supported type"""
+    if not isinstance(stream, io.BufferedIOBase):
+        stream = io.BufferedReader(stream)
+    while (headers := _read_headers(stream)) is not None:
+        length = int(headers.get("content-length", "0"))
+        record_type = headers.get("warc-type")
+        uri = headers.get("warc-target-uri", "").strip("<>")
+        if record_type not in ("response", "resource") or not uri:
+            _skip(stream, length)
+            continue
+        if length > max_bytes:
+            counters["too_large"] += 1
+            _skip(stream, length)
+            continue
+        block = stream.read(length)
+        if record_type == "response":
+            if not headers.get("content-type", "").startswith("application/http"):
+                continue
+            try:
+                status, content_type, body = _http_payload(block)
+            except (ValueError, zlib.error):
+                counters["unreadable"] += 1
+                continue
+            if status != 200:
+                continue
+        else:
+            content_type, body = headers.get("content-type", ""), block
+        kind = CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+        if kind is None:
+            counters["unsupported"] += 1
+            continue
+        yield LocalDocument(uri, kind, body, _warc_date(headers.get("warc-date")))
+
+# ----------------------------------------------------------------------------
+# Walking paths
+# ----------------------------------------------------------------------------
+
+class LocalSources:
+    """Iterates the documents under a list of files and directories
+
+    Iterate in one thread at a time. Counters record what was read and skipped;
+    archives that cannot be read are reported and skipped, not raised. With
+    roots, every file found in a directory must resolve (following symlinks)
+    to a path under one of them; files that lead elsewhere are skipped.
+    """
+
+    def __init__(self, paths, max_bytes=50 * 1024 * 1024, roots=None):
+        self.paths = [Path(path) for path in paths]
+        self.max_bytes = max_bytes
+        self.roots = [Path(root).resolve() for root in roots] if roots else None
+        self.counters = {
+            "documents": 0, "archives": 0, "unsupported": 0, "too_large": 0, "unreadable": 0, "outside_roots": 0,
+        }
+
+    def __iter__(self):
+        for path in self.paths:
+            if path.is_dir():
+                for root, dirs, files in _walk(path):
+                    for name in files:
+                        if self._allowed(root / name):
+                            yield from self._counted(self._file(root / name))
+            else:
+                yield from self._counted(self._file(path))
+
+    def _allowed(self, path):
+        """Whether a file found in a directory resolves to a path under the roots"""
+        if self.roots is None:
+            return True
+        try:
+            resolved = path.resolve(strict=True)
+        except (OSError, RuntimeError) as e:
+            self._unreadable(path, e)
+            return False
+        if any(resolved.is_relative_to(root) for root in self.roots):
+            return True
+        print(f"Skipping {path}: it leads outside the allowed roots")
+        self.counters["outside_roots"] += 1
+        return False
+
+    def _counted(self, documents):
+        for document in documents:
+            self.counters["documents"] += 1
+            yield document
+
+    def _unreadable(self, name, error):
+        print(f"Skipping unreadable file {name}: {str(error) or type(error).__name__}")
+        self.counters["unreadable"] += 1
+
+    def _file(self, path):
+        name = path.name
+        try:
+            stat = path.stat()
+            if _is_warc(name):
+                self.counters["archives"] += 1
+                with (gzip.open(path) if name.lower().endswith(".gz") else open(path, "rb")) as stream:
+                    yield from warc_documents(stream, self.max_bytes, self.counters)
+            elif _is_tar(name):
+                self.counters["archives"] += 1
+                with tarfile.open(path, mode="r|*") as archive:
+                    yield from self._tar(archive, path.as_uri())
+            elif _suffix(name) == ".zip":
+                self.counters["archives"] += 1
+                with zipfile.ZipFile(path) as archive:
+                    yield from self._zip(archive, path.as_uri())
+            elif _suffix(name) not in DOCUMENT_EXTENSIONS:
+                self.counters["unsupported"] += 1
+            elif stat.st_size > self.max_bytes:
+                self.counters["too_large"] += 1
+            else:
+                yield LocalDocument(path.as_uri(), DOCUMENT_EXTENSIONS[_suffix(name)], path.read_bytes(), _http_date(stat.st_mtime))
+        except (OSError, EOFError, ValueError, tarfile.TarError, zipfile.BadZipFile) as e:
+            self._unreadable(path, e)
+
+    def _tar(self, archive, uri):
+        # Stream mode: members arrive in order and each must be read before the next
+        for member in archive:
+            if not member.isfile():
+                continue
+            if _is_warc(member.name):
+                self.counters["archives"] += 1
+                stream = archive.extractfile(member)
+                if member.name.lower().endswith(".gz"):
+                    stream = gzip.GzipFile(fileobj=stream)
+                yield from warc_documents(stream, self.max_bytes, self.counters)
+            elif _suffix(member.name) not in DOCUMENT_EXTENSIONS:
+                self.counters["unsupported"] += 1
+            elif member.size > self.max_bytes:
+                self.counters["too_large"] += 1
+            else:
+                data = archive.extractfile(member).read()
+                kind = DOCUMENT_EXTENSIONS[_suffix(member.name)]
+                yield LocalDocument(f"{uri}#{member.name}", kind, data, _http_date(member.mtime))
+
+    def _zip(self, archive, uri):
+        for member in archive.infolist():
+            if member.is_dir():
+                continue
+            if _suffix(member.filename) not in DOCUMENT_EXTENSIONS:
+                self.counters["unsupported"] += 1
+            elif member.file_size > self.max_bytes:
+                self.counters["too_large"] += 1
+            else:
+                modified = datetime(*member.date_time).timestamp()
+                kind = DOCUMENT_EXTENSIONS[_suffix(member.filename)]
+                yield LocalDocument(f"{uri}#{member.filename}", kind, archive.read(member), _http_date(modified))
+
+def _walk(path):
+    """os.walk in a stable order, skipping hidden files and directories"""
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        yield Path(root), dirs, sorted(f for f in files if not f.startswith("."))
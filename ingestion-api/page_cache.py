@@ -0,0 +1,164 @@
+"""
+Page Cache
+
+On-disk HTTP cache of fetched pages: the raw HTML, the validators the server
+sent with it (ETag / Last-Modified) and the article text extracted from it.
+Refreshing a cached page sends a conditional request; when the server answers
+304 Not Modified, neither the page nor its extraction is redone.
+
+Pages are stored zlib-compressed in SQLite and the cache is bounded by total
+compressed size with least-recently-used eviction.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+def conditional_headers(entry):
+    """Request headers that revalidate a cached page"""
+    headers = {}
+    if entry and entry["etag"]:
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry["last_modified"]:
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+def _pack(data):
+    if data is None:
+        return None
+    return zlib.compress(data.encode("utf-8") if isinstance(data, str) else data, 6)
+
+class PageCache:
+    """SQLite-backed page store with conditional-request validators and LRU eviction"""
+
+    def __init__(self, db_path, max_bytes=512 * 1024 * 1024):
+        self.db_path = str(db_path)
+        self.max_bytes = max_bytes
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    html BLOB NOT NULL,
+                    article BLOB,
+                    size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    checked_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS pages_checked_at ON pages (checked_at)")
+            self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+        self._metrics = {"not_modified": 0, "modified": 0, "uncached": 0, "bytes_not_downloaded": 0, "evictions": 0}
+
+    def get(self, url):
+        """Return the cached page as a dict (html as bytes, article as str or None), or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "url": url,
+            "etag": row["etag"],
+            "last_modified": row["last_modified"],
+            "html": zlib.decompress(row["html"]),
+            "article": zlib.decompress(row["article"]).decode("utf-8") if row["article"] is not None else None,
+            "fetched_at": row["fetched_at"],
+        }
+
+    def put(self, url, html, validators, article=None):
+        """Store a freshly downloaded page (counted as a cache miss)"""
+        html_blob, article_blob = _pack(html), _pack(article)
+        size = len(html_blob) + len(article_blob or b"")
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM pages WHERE url = ?", (url,)).fetchone()
+            self._conn.execute("""
+                INSERT OR REPLACE INTO pages (url, etag, last_modified, html, article, size, fetched_at, checked_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (url, validators.get("etag"), validators.get("last_modified"), html_blob, article_blob, size, now, now))
+            self._bytes += size - (previous["size"] if previous else 0)
+            self._metrics["modified" if previous else "uncached"] += 1
+            self._evict()
+
+    def set_article(self, url, article):
+        """Attach extracted text to a cached page"""
+        article_blob = _pack(article)
+        with self._lock:
+            row = self._conn.execute("SELECT article FROM pages WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return
+            self._conn.execute("UPDATE pages SET article = ?, size = size + ? WHERE url = ?",
+                               (article_blob, len(article_blob) - len(row["article"] or b""), url))
+            self._bytes += len(article_blob) - len(row["article"] or b"")
+
+    def revalidated(self, url, validators, html_bytes=0):
+        """Record a 304: the cached copy is current; the server may have sent new validators"""
+        with self._lock:
+            self._conn.execute("""
+                UPDATE pages SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), checked_at = ?
+                WHERE url = ?
+            """, (validators.get("etag"), validators.get("last_modified"), time.time(), url))
+            self._metrics["not_modified"] += 1
+            self._metrics["bytes_not_downloaded"] += html_bytes
+
+    def _evict(self):
+        if self._bytes <= self.max_bytes:
+            return
+        # Evict down to 90% so we don't evict on every write
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute("SELECT url, size FROM pages ORDER BY checked_at").fetchall()
+        evicted = []
+        for row in rows:
+            if self._bytes <= target:
+                break
+            evicted.append((row["url"],))
+            self._bytes -= row["size"]
+        self._conn.executemany("DELETE FROM pages WHERE url = ?", evicted)
+        self._metrics["evictions"] += len(evicted)
+
+    def stats(self):
+        """Revalidation counts, size and evictions"""
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["pages"] = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            stats["bytes"] = self._bytes
+        refreshed = stats["not_modified"] + stats["modified"]
+        stats.update({
+            "max_bytes": self.max_bytes,
+            "not_modified_rate": stats["not_modified"] / refreshed if refreshed else 0.0,
+            "path": self.db_path,
+        })
+        return stats
+
+# ============================================================================
+# PROCESS-WIDE CACHE
+# ============================================================================
+
+_cache = None
+_lock = threading.Lock()
+
+def get_page_cache():
+    """Return the process-wide page cache, or None if PAGE_CACHE_ENABLED=false"""
+    global _cache
+    if os.getenv("PAGE_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    with _lock:
+        if _cache is None:
+            default_path = Path(__file__).parent.parent / ".cache" / "pages.db"
+            _cache = PageCache(
+                os.getenv("PAGE_CACHE_PATH", str(default_path)),
+                max_bytes=int(float(os.getenv("PAGE_CACHE_MAX_MB", "512")) * 1024 * 1024),
+            )
+        return _cache
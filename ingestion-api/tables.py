@@ -0,0 +1,74 @@
+"""
+Vector Tables
+
+DB2 table helpers shared by the service and the offline bulk loader, and
+the local state kept about a table's rows (cached search answers, chunk
+signatures, document records) that has to go when the rows do. Importers
+put the repository root on sys.path first (for rag_common).
+"""
+
+from rag_common.answer_cache import invalidate_table
+from dedup import get_signature_index
+
+def table_exists(connection, table_name):
+    """Check if database table exists"""
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT COUNT(*) FROM SYSCAT.TABLES
+        WHERE TABNAME = ? AND TABSCHEMA = CURRENT SCHEMA
+    """, (table_name.upper(),))
+    exists = cursor.fetchone()[0] > 0
+    cursor.close()
+    return exists
+
+def drop_table(connection, table_name):
+    """Drop/delete a database table completely"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"DROP TABLE {table_name}")
+        connection.commit()
+        cursor.close()
+        return True
+    except Exception as e:
+        cursor.close()
+        raise e
+
+def truncate_table(connection, table_name):
+    """Remove all rows from table but keep table structure"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"TRUNCATE TABLE {table_name} IMMEDIATE")
+        connection.commit()
+        cursor.close()
+        return True
+    except Exception as e:
+        cursor.close()
+        raise e
+
+def invalidate_cached_answers(table_name):
+    """Drop search answers cached for a table whose contents just changed"""
+    try:
+        invalidate_table(table_name)
+    except Exception as e:
+        print(f"Warning: Failed to invalidate cached answers for '{table_name}': {e}")
+
+def clear_chunk_signatures(table_name):
+    """Forget chunk signatures of a table that was dropped"""
+    index = get_signature_index()
+    if index is not None:
+        index.clear(table_name)
+
+def drop_vector_table(connection, table_name, document_store):
+    """Drop a table if it exists, with what is kept about its rows; returns False when it doesn't"""
+    print(f"Checking if table '{table_name}' exists...")
+    if not table_exists(connection, table_name):
+        return False
+
+    # Drop the table completely
+    print(f"Dropping table '{table_name}'...")
+    drop_table(connection, table_name)
+
+    invalidate_cached_answers(table_name)
+    clear_chunk_signatures(table_name)
+    document_store.delete_table(table_name)
+    return True
@@ -0,0 +1,112 @@
+"""
+Tests for conditional-GET revalidation of cached pages, against a local
+http.server stand-in for the site.
+"""
+
+import asyncio
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import fetcher
+import ingestion_api
+import page_cache
+
+class Site:
+    """One page with validators; answers 304 when a request's validators still match"""
+
+    def __init__(self):
+        self.html = b"<html><body><p>First version.</p></body></html>"
+        self.etag = '"v1"'
+        self.last_modified = "Mon, 05 Oct 2026 10:00:00 GMT"
+        self.requests = []
+
+    def change(self, html, etag, last_modified):
+        self.html, self.etag, self.last_modified = html, etag, last_modified
+
+def handler_for(site):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            site.requests.append(dict(self.headers))
+            if self.headers.get("If-None-Match") == site.etag:
+                self.send_response(304)
+                self.send_header("ETag", site.etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(site.html)))
+            self.send_header("ETag", site.etag)
+            self.send_header("Last-Modified", site.last_modified)
+            self.end_headers()
+            self.wfile.write(site.html)
+
+        def log_message(self, format, *args):
+            pass
+    return Handler
+
+@pytest.fixture
+def site():
+    site = Site()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_for(site))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    site.url = f"http://127.0.0.1:{server.server_address[1]}/article"
+    yield site
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def extractions(monkeypatch, tmp_path):
+    monkeypatch.setenv("PAGE_CACHE_PATH", str(tmp_path / "pages.db"))
+    monkeypatch.setenv("FETCH_RETRIES", "0")
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    monkeypatch.setattr(page_cache, "_cache", None)
+    monkeypatch.setattr(fetcher, "_fetcher", None)
+
+    calls = []
+    async def extract_html(downloaded):
+        calls.append(downloaded)
+        return downloaded.decode("utf-8").split("<p>")[1].split("</p>")[0]
+    monkeypatch.setattr(ingestion_api, "extract_html", extract_html)
+    return calls
+
+def test_revalidation_reuses_or_replaces_cached_article(site, extractions):
+    async def run():
+        try:
+            first = await ingestion_api.fetch_article(site.url)
+            second = await ingestion_api.fetch_article(site.url)
+            extracted_before_change = len(extractions)
+            site.change(b"<html><body><p>Second version.</p></body></html>", '"v2"', "Tue, 06 Oct 2026 10:00:00 GMT")
+            third = await ingestion_api.fetch_article(site.url)
+            return first, second, third, extracted_before_change
+        finally:
+            await fetcher.close_fetcher()
+
+    first, second, third, extracted_before_change = asyncio.run(run())
+    cache = page_cache.get_page_cache()
+
+    # First fetch: nothing cached, so no validators sent
+    assert "If-None-Match" not in site.requests[0] and "If-Modified-Since" not in site.requests[0]
+    assert first == ("First version.", {"etag": '"v1"', "last_modified": "Mon, 05 Oct 2026 10:00:00 GMT"})
+
+    # Second fetch revalidates; the 304 returns the cached article without extracting
+    assert site.requests[1]["If-None-Match"] == '"v1"'
+    assert site.requests[1]["If-Modified-Since"] == "Mon, 05 Oct 2026 10:00:00 GMT"
+    assert second == first
+    assert extracted_before_change == 1
+
+    # Third fetch: the page changed, so the new page and article replace the cached ones
+    assert site.requests[2]["If-None-Match"] == '"v1"'
+    assert third == ("Second version.", {"etag": '"v2"', "last_modified": "Tue, 06 Oct 2026 10:00:00 GMT"})
+    assert len(extractions) == 2
+    entry = cache.get(site.url)
+    assert entry["etag"] == '"v2"' and entry["last_modified"] == "Tue, 06 Oct 2026 10:00:00 GMT"
+    assert entry["html"] == site.html and entry["article"] == "Second version."
+
+    stats = cache.stats()
+    assert (stats["uncached"], stats["not_modified"], stats["modified"]) == (1, 1, 1)
@@ -0,0 +1,6 @@
+"""
+Shared components for the ingestion, search and gateway services.
+
+Modules here hold process-wide resources (models, connections) so that a
+process hosting several services loads each of them only once.
+"""
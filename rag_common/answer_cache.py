@@ -0,0 +1,190 @@
+"""
+Semantic Answer Cache
+
+Caches agent answers by query embedding. A new question whose embedding is
+within max_distance (cosine) of a cached question for the same table gets
+the cached answer without running the agent.
+
+Entries live in SQLite so the ingestion service (a separate process, or
+the same one under the gateway) can invalidate a table: every table has a
+generation number, ingestion bumps it, and only answers stored under the
+current generation are served.
+"""
+
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+
+def unit_vector(vector):
+    """Scale a vector to length 1 so a dot product gives cosine similarity"""
+    norm = math.sqrt(math.sumprod(vector, vector)) or 1.0
+    return [x / norm for x in vector]
+
+class SemanticAnswerCache:
+    """Table-scoped answer cache matched on query embedding similarity"""
+
+    def __init__(self, db_path, max_distance=0.05, max_entries_per_table=1000):
+        self.db_path = str(db_path)
+        self.max_distance = max_distance
+        self.max_entries_per_table = max_entries_per_table
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS table_generations (
+                    table_name TEXT PRIMARY KEY,
+                    generation INTEGER NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS answers (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    table_name TEXT NOT NULL,
+                    generation INTEGER NOT NULL,
+                    query TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    answer TEXT NOT NULL,
+                    source_ids TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS answers_table ON answers (table_name, generation)")
+
+        # table -> (generation, [(unit_vector, answer, query, source_ids)])
+        self._loaded = {}
+        self._metrics = {"hits": 0, "misses": 0, "stores": 0, "invalidations": 0}
+
+    @staticmethod
+    def _key(table_name):
+        return table_name.upper()
+
+    def _generation(self, table):
+        row = self._conn.execute(
+            "SELECT generation FROM table_generations WHERE table_name = ?", (table,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _entries(self, table, generation):
+        """In-memory entries for a table, reloaded when its generation changes"""
+        loaded = self._loaded.get(table)
+        if loaded is None or loaded[0] != generation:
+            rows = self._conn.execute(
+                "SELECT vector, answer, query, source_ids FROM answers WHERE table_name = ? AND generation = ?",
+                (table, generation)
+            ).fetchall()
+            entries = []
+            for blob, answer, query, source_ids in rows:
+                vector = array("f")
+                vector.frombytes(blob)
+                entries.append((vector.tolist(), answer, query, json.loads(source_ids)))
+            loaded = (generation, entries)
+            self._loaded[table] = loaded
+        return loaded[1]
+
+    def lookup(self, table_name, query_vector):
+        """Return (hit, generation); hit is a dict with the answer or None"""
+        table = self._key(table_name)
+        query_unit = unit_vector(query_vector)
+        with self._lock:
+            generation = self._generation(table)
+            best, best_distance = None, self.max_distance
+            for entry in self._entries(table, generation):
+                distance = 1.0 - math.sumprod(entry[0], query_unit)
+                if distance <= best_distance:
+                    best, best_distance = entry, distance
+
+            if best is None:
+                self._metrics["misses"] += 1
+                return None, generation
+            self._metrics["hits"] += 1
+
+        return {
+            "answer": best[1],
+            "cached_query": best[2],
+            "source_ids": best[3],
+            "distance": best_distance,
+        }, generation
+
+    def store(self, table_name, generation, query, query_vector, answer, source_ids):
+        """Cache an answer computed under the given table generation"""
+        table = self._key(table_name)
+        unit = unit_vector(query_vector)
+        with self._lock:
+            # The table changed while the answer was being generated: don't cache it
+            if self._generation(table) != generation:
+                return False
+            self._conn.execute(
+                "INSERT INTO answers (table_name, generation, query, vector, answer, source_ids, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (table, generation, query, array("f", unit).tobytes(), answer, json.dumps(source_ids), time.time())
+            )
+            self._conn.execute("""
+                DELETE FROM answers WHERE table_name = ? AND id NOT IN (
+                    SELECT id FROM answers WHERE table_name = ? ORDER BY id DESC LIMIT ?
+                )
+            """, (table, table, self.max_entries_per_table))
+            self._loaded.pop(table, None)
+            self._metrics["stores"] += 1
+        return True
+
+    def invalidate(self, table_name):
+        """Drop cached answers for a table after its contents change"""
+        table = self._key(table_name)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("""
+                INSERT INTO table_generations (table_name, generation) VALUES (?, 1)
+                ON CONFLICT (table_name) DO UPDATE SET generation = generation + 1
+            """, (table,))
+            self._conn.execute("DELETE FROM answers WHERE table_name = ?", (table,))
+            self._conn.execute("COMMIT")
+            self._loaded.pop(table, None)
+            self._metrics["invalidations"] += 1
+
+    def stats(self):
+        """Hit rate and entry counts"""
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["entries"] = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        lookups = stats["hits"] + stats["misses"]
+        stats.update({
+            "max_distance": self.max_distance,
+            "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+        })
+        return stats
+
+# ============================================================================
+# PROCESS-WIDE CACHE
+# ============================================================================
+
+_cache = None
+_lock = threading.Lock()
+
+def get_answer_cache():
+    """Return the process-wide answer cache, or None if ANSWER_CACHE_ENABLED=false"""
+    global _cache
+    if os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    with _lock:
+        if _cache is None:
+            default_path = Path(__file__).parent.parent / ".cache" / "answers.db"
+            _cache = SemanticAnswerCache(
+                os.getenv("ANSWER_CACHE_PATH", str(default_path)),
+                max_distance=float(os.getenv("ANSWER_CACHE_MAX_DISTANCE", "0.05")),
+                max_entries_per_table=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000")),
+            )
+        return _cache
+
+def invalidate_table(table_name):
+    """Invalidate cached answers for a table (no-op when the cache is disabled)"""
+    cache = get_answer_cache()
+    if cache is not None:
+        cache.invalidate(table_name)
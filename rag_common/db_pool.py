@@ -0,0 +1,283 @@
+"""
+DB2 Connection Pool
+
+Bounded pool of ibm_db_dbi connections shared by every service in the
+process, so requests check out an open connection instead of paying the
+TCP + authentication handshake each time.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import ibm_db_dbi
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+def build_connection_string():
+    """DB2 connection string from environment variables"""
+    return f"DATABASE={os.getenv('DB_NAME')};hostname={os.getenv('DB_HOST')};port={os.getenv('DB_PORT')};protocol={os.getenv('DB_PROTOCOL')};uid={os.getenv('DB_USER')};pwd={os.getenv('DB_PASSWORD')}"
+
+def connect():
+    """Open a new, unpooled DB2 connection"""
+    return ibm_db_dbi.connect(build_connection_string(), '', '')
+
+class PoolError(Exception):
+    """Raised when the pool cannot hand out a connection"""
+
+class PoolTimeout(PoolError):
+    """Raised when no connection becomes available within the checkout timeout"""
+
+# ============================================================================
+# POOL
+# ============================================================================
+
+class ConnectionPool:
+    """Thread-safe bounded connection pool with idle reaping and liveness checks"""
+
+    def __init__(self, name="default", connect_fn=connect, min_size=1, max_size=10,
+                 idle_timeout=300.0, checkout_timeout=30.0,
+                 validation_query="SELECT 1 FROM SYSIBM.SYSDUMMY1"):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.validation_query = validation_query
+        self._connect = connect_fn
+
+        self._idle = deque()  # (connection, returned_at), most recently used on the right
+        self._size = 0        # open connections, idle + checked out
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self._metrics = {
+            "checkouts": 0,
+            "created": 0,
+            "closed": 0,
+            "reaped": 0,
+            "validation_failures": 0,
+            "timeouts": 0,
+            "waits": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+
+    # ------------------------------------------------------------------------
+    # Connection lifecycle
+    # ------------------------------------------------------------------------
+
+    def _open(self):
+        connection = self._connect()
+        with self._cond:
+            self._metrics["created"] += 1
+        return connection
+
+    def _discard(self, connection):
+        """Close a connection and free its slot"""
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._metrics["closed"] += 1
+            self._cond.notify()
+
+    def is_alive(self, connection):
+        """Run the validation query; any failure means the connection is dead"""
+        if not self.validation_query:
+            return True
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(self.validation_query)
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def prefill(self):
+        """Open connections up to min_size (call at startup)"""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                connection = self._open()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append((connection, time.monotonic()))
+                self._cond.notify()
+
+    def reap_idle(self):
+        """Close connections idle longer than idle_timeout, keeping min_size open"""
+        expired = []
+        now = time.monotonic()
+        with self._cond:
+            # Oldest idle connections sit on the left
+            while (self._idle and self._size - len(expired) > self.min_size
+                   and now - self._idle[0][1] > self.idle_timeout):
+                expired.append(self._idle.popleft()[0])
+            self._metrics["reaped"] += len(expired)
+
+        for connection in expired:
+            self._discard(connection)
+        return len(expired)
+
+    # ------------------------------------------------------------------------
+    # Checkout / checkin
+    # ------------------------------------------------------------------------
+
+    def acquire(self, timeout=None):
+        """Check out a live connection, waiting up to timeout seconds for one"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        self.reap_idle()
+
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        while True:
+            connection = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError(f"Connection pool '{self.name}' is closed")
+                    if self._idle:
+                        connection = self._idle.pop()[0]
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._metrics["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"No connection available in pool '{self.name}' after {timeout:.1f}s "
+                            f"(max_size={self.max_size})"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+
+            if connection is None:
+                try:
+                    connection = self._open()
+                except Exception as e:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise PoolError(f"Database connection failed: {str(e)}") from e
+            elif not self.is_alive(connection):
+                with self._cond:
+                    self._metrics["validation_failures"] += 1
+                self._discard(connection)
+                continue
+
+            wait_seconds = time.monotonic() - started
+            with self._cond:
+                self._metrics["checkouts"] += 1
+                if waited:
+                    self._metrics["waits"] += 1
+                self._metrics["wait_seconds_total"] += wait_seconds
+                self._metrics["wait_seconds_max"] = max(self._metrics["wait_seconds_max"], wait_seconds)
+            return connection
+
+    def release(self, connection, broken=False):
+        """Return a connection to the pool, discarding it if it is broken"""
+        if not broken:
+            try:
+                # Never hand the next caller an open transaction
+                connection.rollback()
+            except Exception:
+                broken = True
+
+        with self._cond:
+            if not broken and not self._closed:
+                self._idle.append((connection, time.monotonic()))
+                self._cond.notify()
+                return
+
+        self._discard(connection)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager that checks a connection out and always returns it"""
+        connection = self.acquire(timeout)
+        try:
+            yield connection
+        except Exception:
+            self.release(connection, broken=not self.is_alive(connection))
+            raise
+        else:
+            self.release(connection)
+
+    def close(self):
+        """Close every idle connection and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            idle = [c for c, _ in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        for connection in idle:
+            self._discard(connection)
+
+    # ------------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------------
+
+    def stats(self):
+        """Pool size and checkout wait-time metrics"""
+        with self._cond:
+            metrics = dict(self._metrics)
+            metrics.update({
+                "name": self.name,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            })
+        checkouts = metrics["checkouts"]
+        metrics["wait_seconds_avg"] = metrics["wait_seconds_total"] / checkouts if checkouts else 0.0
+        return metrics
+
+# ============================================================================
+# PROCESS-WIDE POOLS
+# ============================================================================
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(name="default"):
+    """Return the named process-wide pool, creating it from DB_POOL_* settings"""
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            pool = ConnectionPool(
+                name=name,
+                min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+                max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+                idle_timeout=float(os.getenv("DB_POOL_IDLE_TIMEOUT", "300")),
+                checkout_timeout=float(os.getenv("DB_POOL_CHECKOUT_TIMEOUT", "30")),
+            )
+            _pools[name] = pool
+        return pool
+
+def all_pool_stats():
+    """Metrics for every pool created in this process"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.name: pool.stats() for pool in pools}
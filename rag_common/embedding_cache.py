@@ -0,0 +1,191 @@
+"""
+Embedding Cache
+
+Persistent, content-addressed cache of embedding vectors. Entries are keyed
+by hash(model id + normalized text), so re-ingested pages, overlapping
+chunks and repeated queries reuse vectors instead of recomputing them.
+Vectors are stored as float32 blobs in SQLite (memory-mapped reads) and the
+cache is bounded by entry count with least-recently-used eviction. Several
+processes may share one cache file: entries are counted in the database, in
+the same transaction as the eviction, never in the process.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from langchain_core.embeddings import Embeddings
+from rag_common.embeddings import registry, quantization_of
+from rag_common.embedding_service import get_embedding_service
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different copies share a cache entry"""
+    return " ".join(text.split())
+
+def cache_key(model_id, text):
+    """Content address of a text under a given model"""
+    return hashlib.sha256(f"{model_id}\x00{normalize_text(text)}".encode()).digest()
+
+def pack_vector(vector):
+    return array("f", vector).tobytes()
+
+def unpack_vector(blob):
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+class EmbeddingCache:
+    """SQLite-backed float32 vector store with LRU eviction and hit-rate metrics"""
+
+    def __init__(self, db_path, max_entries=1_000_000, mmap_bytes=256 * 1024 * 1024):
+        self.db_path = str(db_path)
+        self.max_entries = max_entries
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(f"PRAGMA mmap_size={int(mmap_bytes)}")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key BLOB PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+
+        self._metrics = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    def get_many(self, model_id, texts):
+        """Return {index: vector} for every text already in the cache"""
+        keys = [cache_key(model_id, text) for text in texts]
+        found = {}
+        with self._lock:
+            # SQLite limits bound parameters per statement, so look up in slices
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({','.join('?' * len(rows))})",
+                        [time.time()] + [key for key, _ in rows]
+                    )
+            self._metrics["hits"] += sum(1 for key in keys if key in found)
+            self._metrics["misses"] += sum(1 for key in keys if key not in found)
+
+        return {i: unpack_vector(found[key]) for i, key in enumerate(keys) if key in found}
+
+    def put_many(self, model_id, texts, vectors):
+        """Store vectors for texts, evicting least recently used entries if over capacity"""
+        now = time.time()
+        rows = [(cache_key(model_id, text), pack_vector(vector), now) for text, vector in zip(texts, vectors)]
+        with self._lock:
+            before = self._conn.total_changes
+            # IMMEDIATE takes the write lock up front, so the count below includes every process's inserts
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows)
+                added = self._conn.total_changes - before
+                entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                evicted = 0
+                if entries > self.max_entries:
+                    # Evict a little extra so we don't evict on every write
+                    evicted = self._conn.execute("""
+                        DELETE FROM embeddings WHERE key IN (
+                            SELECT key FROM embeddings ORDER BY last_used LIMIT ?
+                        )
+                    """, (entries - int(self.max_entries * 0.9),)).rowcount
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._metrics["writes"] += added
+            self._metrics["evictions"] += evicted
+
+    def stats(self):
+        """Hit rate, size and eviction counts"""
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["entries"] = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        lookups = stats["hits"] + stats["misses"]
+        stats.update({
+            "max_entries": self.max_entries,
+            "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+            "path": self.db_path,
+        })
+        return stats
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves cached vectors and only embeds misses"""
+
+    def __init__(self, embeddings, cache, model_id):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_id = model_id
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        vectors = self.cache.get_many(self.model_id, texts)
+        missing = [i for i in range(len(texts)) if i not in vectors]
+        if missing:
+            computed = self.embeddings.embed_documents([texts[i] for i in missing])
+            self.cache.put_many(self.model_id, [texts[i] for i in missing], computed)
+            vectors.update(zip(missing, computed))
+        return [vectors[i] for i in range(len(texts))]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+# ============================================================================
+# PROCESS-WIDE CACHE
+# ============================================================================
+
+_cache = None
+_cached = {}
+_lock = threading.Lock()
+
+def get_cache():
+    """Return the process-wide cache configured by EMBED_CACHE_* settings"""
+    global _cache
+    with _lock:
+        if _cache is None:
+            default_path = Path(__file__).parent.parent / ".cache" / "embeddings.db"
+            _cache = EmbeddingCache(
+                os.getenv("EMBED_CACHE_PATH", str(default_path)),
+                max_entries=int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "1000000")),
+            )
+        return _cache
+
+def get_cached_embeddings(model_path, n_ctx=512, n_batch=512):
+    """Shared embedding service for a model, fronted by the persistent cache
+
+    Set EMBED_CACHE_ENABLED=false to bypass the cache.
+    """
+    service = get_embedding_service(model_path, n_ctx, n_batch)
+    if os.getenv("EMBED_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return service
+
+    key = registry.make_key(model_path, n_ctx, n_batch)
+    with _lock:
+        cached = _cached.get(key)
+    if cached is None:
+        # Model id: file name and quantization identify the vector space
+        model_id = f"{Path(key[0]).name}:{quantization_of(key[0])}"
+        cached = CachedEmbeddings(service, get_cache(), model_id)
+        with _lock:
+            cached = _cached.setdefault(key, cached)
+    return cached
+
+def cache_stats():
+    """Metrics for the process-wide cache, if it has been opened"""
+    return _cache.stats() if _cache is not None else None
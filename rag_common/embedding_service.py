@@ -0,0 +1,183 @@
+"""
+Embedding Service
+
+Coalesces concurrent embedding requests (query embeddings from retrieval,
+chunk embeddings from ingestion) into micro-batches, so the model runs one
+larger batch instead of many single-text calls.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from langchain_core.embeddings import Embeddings
+from rag_common.embeddings import registry
+
+class MicroBatchingEmbeddings(Embeddings):
+    """Embeddings front-end that batches concurrent callers onto one model.
+
+    A background thread collects pending requests until max_batch_size texts
+    are waiting or max_wait_ms has passed since the first one arrived, then
+    embeds them in a single model call and hands each caller its vectors.
+    """
+
+    def __init__(self, model, max_batch_size=32, max_wait_ms=5.0, name="embeddings"):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.name = name
+
+        self._requests = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "cancelled": 0,
+            "texts": 0,
+            "batches": 0,
+            "max_batch_texts": 0,
+            "queue_wait_seconds_total": 0.0,
+            "embed_seconds_total": 0.0,
+        }
+        self._worker = threading.Thread(target=self._run, name=f"{name}-batcher", daemon=True)
+        self._worker.start()
+
+    # ------------------------------------------------------------------------
+    # Embeddings interface
+    # ------------------------------------------------------------------------
+
+    def submit(self, texts):
+        """Queue texts for embedding; returns a Future resolving to their vectors"""
+        future = Future()
+        if not texts:
+            future.set_result([])
+            return future
+        self._requests.put((list(texts), future, time.perf_counter()))
+        return future
+
+    def embed_documents(self, texts):
+        return self.submit(texts).result()
+
+    def embed_query(self, text):
+        return self.submit([text]).result()[0]
+
+    async def aembed_documents(self, texts):
+        return await asyncio.wrap_future(self.submit(texts))
+
+    async def aembed_query(self, text):
+        return (await asyncio.wrap_future(self.submit([text])))[0]
+
+    # ------------------------------------------------------------------------
+    # Batching loop
+    # ------------------------------------------------------------------------
+
+    def _collect(self):
+        """Block for the first request, then gather more until size or wait limit"""
+        batch = [self._requests.get()]
+        pending_texts = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+
+        while pending_texts < self.max_batch_size:
+            # Past the deadline, still take whatever is already queued
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    request = self._requests.get(timeout=remaining)
+                else:
+                    request = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(request)
+            pending_texts += len(request[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Drop requests whose callers gave up (e.g. a cancelled aembed_* task);
+            # the rest are marked running, so they can no longer be cancelled
+            waiting = [request for request in batch if request[1].set_running_or_notify_cancel()]
+            if len(waiting) < len(batch):
+                with self._stats_lock:
+                    self._stats["cancelled"] += len(batch) - len(waiting)
+            if not waiting:
+                continue
+            try:
+                self._embed_batch(waiting)
+            except Exception as e:
+                # Keep the batcher thread alive; fail whoever is still waiting
+                print(f"Warning: Embedding batch failed: {e}")
+                for _, future, _ in waiting:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _embed_batch(self, batch):
+        started = time.perf_counter()
+        texts = [text for request_texts, _, _ in batch for text in request_texts]
+
+        try:
+            # Requests larger than one batch (e.g. a whole document) are split
+            vectors = []
+            for i in range(0, len(texts), self.max_batch_size):
+                vectors.extend(self.model.embed_documents(texts[i:i + self.max_batch_size]))
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        embed_seconds = time.perf_counter() - started
+        offset = 0
+        for request_texts, future, _ in batch:
+            future.set_result(vectors[offset:offset + len(request_texts)])
+            offset += len(request_texts)
+
+        with self._stats_lock:
+            self._stats["requests"] += len(batch)
+            self._stats["texts"] += len(texts)
+            self._stats["batches"] += 1
+            self._stats["max_batch_texts"] = max(self._stats["max_batch_texts"], len(texts))
+            self._stats["queue_wait_seconds_total"] += sum(started - queued for _, _, queued in batch)
+            self._stats["embed_seconds_total"] += embed_seconds
+
+    def stats(self):
+        """Batching metrics: batch sizes, queue wait and model time"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        batches, requests = stats["batches"], stats["requests"]
+        stats.update({
+            "name": self.name,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "avg_batch_texts": stats["texts"] / batches if batches else 0.0,
+            "avg_queue_wait_ms": 1000 * stats["queue_wait_seconds_total"] / requests if requests else 0.0,
+        })
+        return stats
+
+# ============================================================================
+# PROCESS-WIDE SERVICES
+# ============================================================================
+
+_services = {}
+_services_lock = threading.Lock()
+
+def get_embedding_service(model_path, n_ctx=512, n_batch=512):
+    """Return the shared micro-batching service for a registry model"""
+    key = registry.make_key(model_path, n_ctx, n_batch)
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            service = MicroBatchingEmbeddings(
+                registry.get(model_path, n_ctx, n_batch),
+                max_batch_size=int(os.getenv("EMBED_MAX_BATCH_SIZE", "32")),
+                max_wait_ms=float(os.getenv("EMBED_MAX_WAIT_MS", "5")),
+                name=os.path.basename(key[0]),
+            )
+            _services[key] = service
+        return service
+
+def all_service_stats():
+    """Metrics for every embedding service created in this process"""
+    with _services_lock:
+        services = list(_services.values())
+    return [service.stats() for service in services]
@@ -0,0 +1,196 @@
+"""
+Embedding Model Registry
+
+Loads each GGUF embedding model once per process and hands out the shared
+instance to every caller (ingestion, retrieval, health checks).
+"""
+
+import re
+import threading
+import time
+from pathlib import Path
+from langchain_core.embeddings import Embeddings
+from langchain_community.embeddings import LlamaCppEmbeddings
+
+DEFAULT_MODEL_FILE = "granite-embedding-30m-english-Q6_K.gguf"
+
+# ============================================================================
+# HELPER FUNCTIONS
+# ============================================================================
+
+def resolve_model_path(candidates):
+    """Return the first existing path from a list of candidate model locations"""
+    for path in candidates:
+        if Path(path).exists():
+            return Path(path).resolve()
+
+    raise FileNotFoundError(
+        f"Embedding model file '{Path(candidates[0]).name}' not found. "
+        f"Searched: {', '.join(str(p) for p in candidates)}"
+    )
+
+def quantization_of(model_path):
+    """Extract the quantization tag (e.g. Q6_K, F16) from a GGUF file name"""
+    match = re.search(r"[-.](I?Q\d\w*|F16|F32|BF16)\.gguf$", str(model_path), re.IGNORECASE)
+    return match.group(1).upper() if match else "unknown"
+
+def resident_memory_bytes():
+    """Current resident set size of this process in bytes (0 if unavailable)"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    try:
+        import resource
+        import sys
+        # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return 0
+
+# ============================================================================
+# EMBEDDING WRAPPERS
+# ============================================================================
+
+class SerializedEmbeddings(Embeddings):
+    """Shared model wrapper that runs one embedding call at a time.
+
+    A llama.cpp context is not safe to use from several threads at once, so
+    executor threads serving concurrent requests take turns on the model.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            return self.model.embed_documents(texts)
+
+    def embed_query(self, text):
+        with self._lock:
+            return self.model.embed_query(text)
+
+class PrecomputedEmbeddings(Embeddings):
+    """Serves vectors computed earlier in a pipeline, falling back to a model for misses"""
+
+    def __init__(self, texts, vectors, fallback=None):
+        self.vectors = dict(zip(texts, vectors))
+        self.fallback = fallback
+
+    def _lookup(self, text):
+        vector = self.vectors.get(text)
+        if vector is not None:
+            return vector
+        if self.fallback is None:
+            raise KeyError(f"No precomputed embedding for text: {text[:50]!r}")
+        return self.fallback.embed_query(text)
+
+    def embed_documents(self, texts):
+        return [self._lookup(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._lookup(text)
+
+# ============================================================================
+# REGISTRY
+# ============================================================================
+
+class EmbeddingModelRegistry:
+    """Thread-safe, process-wide cache of loaded embedding models"""
+
+    def __init__(self):
+        self._models = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    @staticmethod
+    def make_key(model_path, n_ctx=512, n_batch=512, **model_kwargs):
+        """Registry key: resolved path, quantization, context parameters and any other model settings
+
+        Other settings (n_threads, ...) are sorted by name; ones left at None
+        are the model's defaults and are left out.
+        """
+        path = str(Path(model_path).resolve())
+        settings = tuple(sorted((name, repr(value)) for name, value in model_kwargs.items() if value is not None))
+        return (path, quantization_of(path), n_ctx, n_batch, settings)
+
+    def get(self, model_path, n_ctx=512, n_batch=512, **model_kwargs):
+        """Return the shared model for these parameters, loading it on first use"""
+        key = self.make_key(model_path, n_ctx, n_batch, **model_kwargs)
+
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        # One lock per key so loading one model doesn't block lookups of another
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            model = self._models.get(key)
+            if model is not None:
+                return model
+
+            settings = "".join(f", {name}={value}" for name, value in key[4])
+            print(f"Loading embedding model: {key[0]} ({key[1]}, n_ctx={n_ctx}, n_batch={n_batch}{settings})")
+            rss_before = resident_memory_bytes()
+            started = time.perf_counter()
+            model = SerializedEmbeddings(LlamaCppEmbeddings(
+                model_path=key[0],
+                n_ctx=n_ctx,
+                n_batch=n_batch,
+                **model_kwargs
+            ))
+            load_seconds = time.perf_counter() - started
+            rss_after = resident_memory_bytes()
+
+            self._stats[key] = {
+                "model_path": key[0],
+                "quantization": key[1],
+                "n_ctx": n_ctx,
+                "n_batch": n_batch,
+                "model_kwargs": {name: value for name, value in model_kwargs.items() if value is not None},
+                "load_seconds": round(load_seconds, 4),
+                "resident_memory_bytes": max(rss_after - rss_before, 0),
+                "loaded_at": time.time(),
+            }
+            self._models[key] = model
+            print(f"Embedding model loaded in {load_seconds:.3f}s")
+            return model
+
+    def warm_up(self, model_path, n_ctx=512, n_batch=512, **model_kwargs):
+        """Load the model and run one embedding so first requests don't pay for it"""
+        model = self.get(model_path, n_ctx, n_batch, **model_kwargs)
+        started = time.perf_counter()
+        model.embed_query("warm up")
+        key = self.make_key(model_path, n_ctx, n_batch, **model_kwargs)
+        self._stats[key]["warm_up_seconds"] = round(time.perf_counter() - started, 4)
+        return model
+
+    def is_loaded(self, model_path, n_ctx=512, n_batch=512, **model_kwargs):
+        """Check whether a model is already resident without loading it"""
+        return self.make_key(model_path, n_ctx, n_batch, **model_kwargs) in self._models
+
+    def stats(self):
+        """Load time and memory figures for every loaded model"""
+        return {
+            "models": [dict(s) for s in self._stats.values()],
+            "process_resident_memory_bytes": resident_memory_bytes(),
+        }
+
+    def clear(self):
+        """Drop all loaded models (mainly for tests and reloads)"""
+        with self._lock:
+            self._models.clear()
+            self._stats.clear()
+            self._key_locks.clear()
+
+# Process-wide registry shared by every service imported into this process
+registry = EmbeddingModelRegistry()
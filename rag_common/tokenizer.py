@@ -0,0 +1,104 @@
+"""
+Embedding Model Tokenizer
+
+Counts tokens with the GGUF embedding model's own tokenizer, so chunk sizes
+can be budgeted in the same units the model truncates by. Counts are cached
+per text; the tokenizer comes from the model already loaded in the registry.
+"""
+
+import threading
+from collections import OrderedDict
+from rag_common.embeddings import registry
+
+class TokenCounter:
+    """Cached token counts from a llama.cpp model's tokenizer"""
+
+    def __init__(self, llama, max_cached=200_000):
+        self.llama = llama
+        self.max_cached = max_cached
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "misses": 0}
+
+        # Special tokens (e.g. [CLS]/[SEP]) the model adds around every text
+        self.special_tokens = len(llama.tokenize(b"a", add_bos=True)) - len(llama.tokenize(b"a", add_bos=False))
+        # Embedding calls keep at most this many tokens and silently drop the rest
+        self.context_tokens = min(llama.n_ctx(), llama.n_batch)
+
+    @property
+    def max_text_tokens(self):
+        """Largest text, in tokens, the model embeds without truncation"""
+        return self.context_tokens - self.special_tokens
+
+    def _tokenize(self, text):
+        return len(self.llama.tokenize(text.encode("utf-8"), add_bos=False))
+
+    def count(self, text):
+        """Tokens in a text, excluding special tokens"""
+        return self.count_many([text])[0]
+
+    def count_many(self, texts):
+        """Token counts for many texts; cached and repeated texts are tokenized once"""
+        with self._lock:
+            counts = [self._cache.get(text) for text in texts]
+            for text, count in zip(texts, counts):
+                if count is not None:
+                    self._cache.move_to_end(text)
+            missing = list(dict.fromkeys(text for text, count in zip(texts, counts) if count is None))
+            self._metrics["hits"] += len(texts) - len(missing)
+            self._metrics["misses"] += len(missing)
+
+        # Tokenize outside the lock: it only reads the vocabulary
+        computed = {text: self._tokenize(text) for text in missing}
+
+        if computed:
+            with self._lock:
+                self._cache.update(computed)
+                while len(self._cache) > self.max_cached:
+                    self._cache.popitem(last=False)
+        return [count if count is not None else computed[text] for text, count in zip(texts, counts)]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["cached"] = len(self._cache)
+        stats.update({
+            "context_tokens": self.context_tokens,
+            "special_tokens": self.special_tokens,
+            "max_text_tokens": self.max_text_tokens,
+        })
+        return stats
+
+def utilization_stats(token_counts, budget_tokens, max_text_tokens):
+    """Summarize how full chunks are against the chunk budget and the model limit"""
+    if not token_counts:
+        return None
+    return {
+        "chunks": len(token_counts),
+        "budget_tokens": budget_tokens,
+        "model_max_tokens": max_text_tokens,
+        "mean_tokens": round(sum(token_counts) / len(token_counts), 1),
+        "min_tokens": min(token_counts),
+        "max_tokens": max(token_counts),
+        "mean_utilization": round(sum(token_counts) / len(token_counts) / budget_tokens, 4),
+        "truncated_chunks": sum(1 for count in token_counts if count > max_text_tokens),
+    }
+
+# ============================================================================
+# PROCESS-WIDE COUNTERS
+# ============================================================================
+
+_counters = {}
+_lock = threading.Lock()
+
+def get_token_counter(model_path, n_ctx=512, n_batch=512):
+    """Token counter for a model in the registry (loading the model if needed)"""
+    key = registry.make_key(model_path, n_ctx, n_batch)
+    with _lock:
+        counter = _counters.get(key)
+    if counter is None:
+        # registry models are SerializedEmbeddings(LlamaCppEmbeddings); .client is the llama_cpp.Llama
+        counter = TokenCounter(registry.get(model_path, n_ctx, n_batch).model.client)
+        with _lock:
+            counter = _counters.setdefault(key, counter)
+    return counter
@@ -0,0 +1,103 @@
+"""
+Search API Load Test
+
+Sends questions to a running Search API at increasing concurrency levels
+and reports throughput and latency for each level. With the async search
+path, throughput should grow with the number of in-flight requests instead
+of staying flat at one request at a time.
+
+Answers served from the answer cache are counted separately: they skip the
+agent, so measure the agent path against a service started with
+ANSWER_CACHE_ENABLED=false, or rotate through distinct questions with
+--queries-file (one per line, at least as many as requests sent in total).
+
+Usage:
+    ANSWER_CACHE_ENABLED=false uv run uvicorn search_api:app --port 8002
+    uv run python load_test.py --url http://localhost:8002 --levels 1 2 4 8 --requests 16
+"""
+
+import argparse
+import itertools
+import json
+import statistics
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+def send_search(url, query, table_name, timeout):
+    """POST one /search request; returns (latency_seconds, ok, cached)"""
+    body = json.dumps({"query": query, "table_name": table_name}).encode()
+    req = urllib.request.Request(
+        f"{url}/search", data=body, headers={"Content-Type": "application/json"}
+    )
+    started = time.perf_counter()
+    cached = False
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            result = json.loads(resp.read())
+            ok = resp.status == 200 and result.get("success", False)
+            cached = result.get("cached", False)
+    except Exception as e:
+        print(f"  request failed: {e}")
+        ok = False
+    return time.perf_counter() - started, ok, cached
+
+def run_level(url, concurrency, queries, table_name, timeout):
+    """Send each query once with `concurrency` in flight; returns summary stats"""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(
+            lambda query: send_search(url, query, table_name, timeout), queries
+        ))
+    elapsed = time.perf_counter() - started
+
+    total = len(queries)
+    latencies = sorted(latency for latency, _, _ in results)
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": sum(1 for _, ok, _ in results if not ok),
+        "cached": sum(1 for _, _, cached in results if cached),
+        "throughput_rps": total / elapsed,
+        "p50_seconds": statistics.median(latencies),
+        "p95_seconds": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Search API")
+    parser.add_argument("--url", default="http://localhost:8002")
+    parser.add_argument("--query", default="How to calculate summary statistics in DB2?")
+    parser.add_argument("--queries-file", help="Questions to rotate through, one per line (instead of repeating --query)")
+    parser.add_argument("--table-name", default="AI_KNOWLEDGE")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--requests", type=int, default=16, help="Requests per concurrency level")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    if args.queries_file:
+        with open(args.queries_file, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = [args.query]
+    # Rotate through the questions across all levels, so no question repeats until the list runs out
+    rotation = itertools.cycle(queries)
+
+    print(f"{'in-flight':>9} {'requests':>8} {'errors':>6} {'cached':>6} {'req/s':>8} {'p50 (s)':>8} {'p95 (s)':>8}")
+    baseline = None
+    cached = 0
+    for level in args.levels:
+        level_queries = list(itertools.islice(rotation, max(args.requests, level)))
+        stats = run_level(args.url, level, level_queries, args.table_name, args.timeout)
+        baseline = baseline or stats["throughput_rps"]
+        cached += stats["cached"]
+        print(
+            f"{stats['concurrency']:>9} {stats['requests']:>8} {stats['errors']:>6} {stats['cached']:>6} "
+            f"{stats['throughput_rps']:>8.2f} {stats['p50_seconds']:>8.2f} {stats['p95_seconds']:>8.2f}"
+            f"   ({stats['throughput_rps'] / baseline:.1f}x)"
+        )
+    if cached:
+        print(f"\n{cached} answers came from the answer cache; these numbers measure the cache, not the agent path.")
+        print("Restart the service with ANSWER_CACHE_ENABLED=false or pass more distinct questions with --queries-file.")
+
+if __name__ == "__main__":
+    main()
@@ -5,18 +5,28 @@ Minimalistic Agentic RAG Q&A service using IBM Watsonx and LangGraph.
 """
 
 import os
+import sys
+import json
+import time
+import hashlib
+import asyncio
+import functools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Literal
 from dotenv import load_dotenv
-import ibm_db_dbi
 
 # LangGraph imports
 from langgraph.graph import StateGraph, MessagesState, START, END
+from langgraph.config import get_stream_writer
 from langgraph.prebuilt import ToolNode, tools_condition
 from langchain_ibm import ChatWatsonx
-from langchain_community.embeddings import LlamaCppEmbeddings
 from langchain_db2.db2vs import DB2VS
 from langchain.tools import tool
 
@@ -24,10 +34,28 @@ from langchain.tools import tool
 parent_dir = Path(__file__).parent.parent
 load_dotenv(parent_dir / ".env")
 
+# Shared components (embedding registry, DB2 pool) live in parent/rag_common/
+sys.path.append(str(parent_dir))
+from rag_common.embeddings import registry, resolve_model_path, DEFAULT_MODEL_FILE
+from rag_common.embedding_service import all_service_stats
+from rag_common.embedding_cache import get_cached_embeddings, cache_stats
+from rag_common.answer_cache import get_answer_cache
+from rag_common.db_pool import get_pool, all_pool_stats, PoolError
+
 # Global variables
 llm = None
 graph = None
 
+# Table searched by retriever_tool (and scope of cached answers)
+RETRIEVER_TABLE = "AI_KNOWLEDGE"
+
+# DB2 queries and query embedding are blocking, so they run on this pool
+# while the event loop keeps serving other searches
+io_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SEARCH_IO_WORKERS", "16")),
+    thread_name_prefix="search-io"
+)
+
 # ============================================================================
 # DATA MODELS
 # ============================================================================
@@ -41,92 +69,221 @@ class SearchResponse(BaseModel):
     """Response model for search API"""
     success: bool
     answer: str
+    cached: bool = False
 
 class GradeDocuments(BaseModel):
     """Grade documents using a binary score for relevance check."""
     binary_score: str = Field(description="Relevance score: 'yes' if relevant, or 'no' if not relevant")
 
+# ============================================================================
+# QUERY EMBEDDING CACHE
+# ============================================================================
+
+class QueryEmbeddingCache:
+    """In-process LRU of query embeddings, bounded by size and entry age"""
+    
+    def __init__(self, max_size=1024, ttl_seconds=3600.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # normalized query -> (vector, stored_at)
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+    
+    @staticmethod
+    def normalize(query):
+        return " ".join(query.split())
+    
+    def get(self, query):
+        """Return the cached vector for a query, or None"""
+        key = self.normalize(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] > self.ttl_seconds:
+                del self._entries[key]
+                self._metrics["expired"] += 1
+                entry = None
+            if entry is None:
+                self._metrics["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._metrics["hits"] += 1
+            return entry[0]
+    
+    def put(self, query, vector):
+        """Store a query vector, evicting the least recently used beyond max_size"""
+        key = self.normalize(query)
+        with self._lock:
+            self._entries[key] = (vector, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._metrics["evictions"] += 1
+    
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats.update({
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+        })
+        return stats
+
+query_cache = QueryEmbeddingCache(
+    max_size=int(os.getenv("QUERY_CACHE_MAX_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("QUERY_CACHE_TTL_SECONDS", "3600"))
+)
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
+@contextmanager
 def get_db_connection():
-    """Connect to IBM DB2 database"""
-    conn_str = f"DATABASE={os.getenv('DB_NAME')};hostname={os.getenv('DB_HOST')};port={os.getenv('DB_PORT')};protocol={os.getenv('DB_PROTOCOL')};uid={os.getenv('DB_USER')};pwd={os.getenv('DB_PASSWORD')}"
+    """Check out a pooled DB2 connection; it goes back to the pool on exit"""
     try:
-        return ibm_db_dbi.connect(conn_str, '', '')
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database connection failed: {str(e)}")
+        with get_pool().connection() as connection:
+            yield connection
+    except PoolError as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-def get_embeddings():
-    """Load Granite embedding model"""
+def get_embedding_model_path():
+    """Locate Granite embedding model in ../models/ directory"""
     parent_dir = Path(__file__).parent.parent
-    model_path = parent_dir / "models" / "granite-embedding-30m-english-Q6_K.gguf"
-    
-    if model_path.exists():
-        return LlamaCppEmbeddings(model_path=str(model_path))
-    
-    raise FileNotFoundError("Embedding model not found in ../models/ directory")
+    return resolve_model_path([parent_dir / "models" / DEFAULT_MODEL_FILE])
 
-@tool
-def retriever_tool(query: str) -> str:
-    """Retrieve relevant documents from vector database"""
-    try:
-        connection = get_db_connection()
-        embeddings = get_embeddings()
-        
+def get_embeddings():
+    """Return the process-wide Granite embeddings (model loaded once, calls micro-batched, vectors cached on disk)"""
+    return get_cached_embeddings(get_embedding_model_path())
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call on the I/O executor and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_executor, functools.partial(func, *args, **kwargs))
+
+def embed_query(query):
+    """Embed a query, reusing recent embeddings of the same text (blocking)"""
+    vector = query_cache.get(query)
+    if vector is None:
+        vector = get_embeddings().embed_query(query)
+        query_cache.put(query, vector)
+    return vector
+
+def retrieve_documents(query, table_name="AI_KNOWLEDGE", k=3):
+    """Embed the query and run similarity search in DB2 (blocking)"""
+    embeddings = get_embeddings()
+    query_vector = embed_query(query)
+    
+    with get_db_connection() as connection:
         vectorstore = DB2VS(
             client=connection,
-            table_name="AI_KNOWLEDGE",  # Default table
+            table_name=table_name,
             embedding_function=embeddings
         )
         
-        docs = vectorstore.similarity_search(query, k=3)
-        connection.close()
+        return vectorstore.similarity_search_by_vector(query_vector, k=k)
+
+def check_database():
+    """Check out and return a pooled connection (validated on checkout)"""
+    with get_db_connection():
+        pass
+
+def chunk_id(doc):
+    """Stable id of a retrieved chunk (metadata id, else hash of its text)"""
+    return doc.metadata.get("id") or hashlib.sha256(doc.page_content.encode()).hexdigest()[:16].upper()
+
+@tool(response_format="content_and_artifact")
+async def retriever_tool(query: str) -> tuple[str, list[str]]:
+    """Retrieve relevant documents from vector database"""
+    try:
+        docs = await run_blocking(retrieve_documents, query, RETRIEVER_TABLE)
         
         if not docs:
-            return "No relevant documents found."
+            return "No relevant documents found.", []
         
-        return "\n\n".join([f"Document {i+1}:\n{doc.page_content}" for i, doc in enumerate(docs)])
+        content = "\n\n".join([f"Document {i+1}:\n{doc.page_content}" for i, doc in enumerate(docs)])
+        return content, [chunk_id(doc) for doc in docs]
         
     except Exception as e:
-        return f"Error retrieving documents: {str(e)}"
+        return f"Error retrieving documents: {str(e)}", []
+
+# ============================================================================
+# SEMANTIC ANSWER CACHE
+# ============================================================================
+
+async def lookup_cached_answer(query):
+    """Check the answer cache; returns (hit, query_vector, generation)"""
+    cache = get_answer_cache()
+    if cache is None:
+        return None, None, None
+    try:
+        vector = await run_blocking(embed_query, query)
+        hit, generation = await run_blocking(cache.lookup, RETRIEVER_TABLE, vector)
+        return hit, vector, generation
+    except Exception as e:
+        print(f"Warning: Answer cache lookup failed: {e}")
+        return None, None, None
+
+async def store_cached_answer(query, vector, generation, answer, source_ids):
+    """Cache a freshly generated answer (skipped if the lookup didn't run)"""
+    cache = get_answer_cache()
+    if cache is None or vector is None:
+        return
+    try:
+        await run_blocking(cache.store, RETRIEVER_TABLE, generation, query, vector, answer, source_ids)
+    except Exception as e:
+        print(f"Warning: Answer cache store failed: {e}")
+
+def retrieved_source_ids(update):
+    """Chunk ids attached to the retrieve node's tool messages"""
+    return [
+        source_id
+        for message in update.get("messages", [])
+        for source_id in (getattr(message, "artifact", None) or [])
+    ]
 
 # ============================================================================
 # WORKFLOW NODES
 # ============================================================================
 
-def generate_query_or_respond(state: MessagesState):
+async def generate_query_or_respond(state: MessagesState):
     """Decide whether to retrieve documents or respond directly"""
-    response = llm.bind_tools([retriever_tool]).invoke(state["messages"])
+    response = await llm.bind_tools([retriever_tool]).ainvoke(state["messages"])
     return {"messages": [response]}
 
-def grade_documents(state: MessagesState) -> Literal["generate_answer", "rewrite_question"]:
+async def grade_documents(state: MessagesState) -> Literal["generate_answer", "rewrite_question"]:
     """Grade document relevance"""
     question = state["messages"][0].content
     context = state["messages"][-1].content
     
     prompt = f"Grade relevance of document to question. Document: {context}\nQuestion: {question}\nRelevant? Answer 'yes' or 'no'."
     
-    response = llm.with_structured_output(GradeDocuments).invoke([{"role": "user", "content": prompt}])
+    response = await llm.with_structured_output(GradeDocuments).ainvoke([{"role": "user", "content": prompt}])
+    
+    relevant = response.binary_score == "yes"
+    # Surfaced as a "grade" event by /search/stream; a no-op for plain runs
+    get_stream_writer()({"relevant": relevant})
     
-    return "generate_answer" if response.binary_score == "yes" else "rewrite_question"
+    return "generate_answer" if relevant else "rewrite_question"
 
-def rewrite_question(state: MessagesState):
+async def rewrite_question(state: MessagesState):
     """Rewrite the question for better retrieval"""
     question = state["messages"][0].content
     prompt = f"Rewrite this question for better search results: {question}"
     
-    response = llm.invoke([{"role": "user", "content": prompt}])
+    response = await llm.ainvoke([{"role": "user", "content": prompt}])
     return {"messages": [{"role": "user", "content": response.content}]}
 
-def generate_answer(state: MessagesState):
+async def generate_answer(state: MessagesState):
     """Generate final answer"""
     question = state["messages"][0].content
     context = state["messages"][-1].content
     prompt = f"Answer this question using the context. Keep it concise.\nQuestion: {question}\nContext: {context}"
     
-    response = llm.invoke([{"role": "user", "content": prompt}])
+    response = await llm.ainvoke([{"role": "user", "content": prompt}])
     return {"messages": [response]}
 
 def build_graph():
@@ -146,27 +303,37 @@ def build_graph():
     
     return workflow.compile()
 
-def initialize_components():
-    """Initialize LLM and graph"""
+def create_llm():
+    """Watsonx chat model, checked with a test call"""
+    llm = ChatWatsonx(
+        url="https://us-south.ml.cloud.ibm.com",
+        apikey=os.getenv("WATSONX_APIKEY"),
+        model_id="mistralai/mistral-large",
+        project_id=os.getenv("WATSONX_PROJECT"),
+        params={"temperature": 0}
+    )
+    
+    # Test connection with a simple call
+    test_response = llm.invoke([{"role": "user", "content": "Hello"}])
+    return llm
+
+def initialize_components(chat_model=None):
+    """Initialize LLM and graph; chat_model replaces Watsonx (e.g. a fake model in tests)"""
     global llm, graph
     
-    # Test Watsonx connection
+    llm = chat_model if chat_model is not None else create_llm()
+    graph = build_graph()
+
+    # Load the embedding model and open pooled connections now rather than on the first retrieval
     try:
-        llm = ChatWatsonx(
-            url="https://us-south.ml.cloud.ibm.com",
-            apikey=os.getenv("WATSONX_APIKEY"),
-            model_id="mistralai/mistral-large",
-            project_id=os.getenv("WATSONX_PROJECT"),
-            params={"temperature": 0}
-        )
-        
-        # Test connection with a simple call
-        test_response = llm.invoke([{"role": "user", "content": "Hello"}])
-        
+        registry.warm_up(get_embedding_model_path())
     except Exception as e:
-        raise e
+        print(f"Warning: Embedding model warm-up failed: {e}")
     
-    graph = build_graph()
+    try:
+        get_pool().prefill()
+    except Exception as e:
+        print(f"Warning: Database pool prefill failed: {e}")
 
 # ============================================================================
 # FASTAPI APPLICATION
@@ -190,24 +357,34 @@ async def search(request: SearchRequest):
         if graph is None:
             raise HTTPException(status_code=503, detail="Service not initialized")
         
+        hit, query_vector, generation = await lookup_cached_answer(request.query)
+        if hit is not None:
+            return SearchResponse(success=True, answer=hit["answer"], cached=True)
+        
         initial_state = {"messages": [{"role": "user", "content": request.query}]}
         
         final_answer = ""
+        source_ids = []
         try:
-            for chunk in graph.stream(initial_state):
+            async for chunk in graph.astream(initial_state):
                 for node, update in chunk.items():
+                    if node == "retrieve" and update:
+                        source_ids = retrieved_source_ids(update)
                     if node == "generate_answer" and update.get("messages"):
                         final_answer = update["messages"][-1].content
                         break
+            
+            if final_answer:
+                await store_cached_answer(request.query, query_vector, generation, final_answer, source_ids)
         except Exception as graph_error:
             # Fallback: try direct retrieval without the full workflow
             try:
-                retrieved_docs = retriever_tool.invoke({"query": request.query})
+                retrieved_docs = await retriever_tool.ainvoke({"query": request.query})
                 
                 # Simple prompt for answer generation
                 simple_prompt = f"Based on this context, answer the question briefly:\n\nQuestion: {request.query}\n\nContext: {retrieved_docs}"
                 
-                response = llm.invoke([{"role": "user", "content": simple_prompt}])
+                response = await llm.ainvoke([{"role": "user", "content": simple_prompt}])
                 final_answer = response.content
                 
             except Exception as fallback_error:
@@ -226,6 +403,81 @@ async def search(request: SearchRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
+def sse_event(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_search_events(query):
+    """Run the agent and yield SSE progress events followed by answer tokens"""
+    hit, query_vector, generation = await lookup_cached_answer(query)
+    if hit is not None:
+        yield sse_event("token", {"content": hit["answer"]})
+        yield sse_event("done", {"success": True, "answer": hit["answer"], "cached": True})
+        return
+    
+    initial_state = {"messages": [{"role": "user", "content": query}]}
+    answer_parts = []
+    source_ids = []
+    
+    try:
+        async for mode, payload in graph.astream(initial_state, stream_mode=["updates", "messages", "custom"]):
+            if mode == "messages":
+                # Token chunks from LLM calls; only the final answer goes to the client
+                chunk, metadata = payload
+                if metadata.get("langgraph_node") == "generate_answer" and chunk.content:
+                    answer_parts.append(chunk.content)
+                    yield sse_event("token", {"content": chunk.content})
+            elif mode == "custom":
+                yield sse_event("grade", payload)
+            else:
+                for node, update in payload.items():
+                    if node == "retrieve" and update:
+                        source_ids = retrieved_source_ids(update)
+                    event = {"node": node}
+                    if node == "rewrite_question" and update:
+                        event["question"] = update["messages"][-1]["content"]
+                    yield sse_event("progress", event)
+        
+        if answer_parts:
+            await store_cached_answer(query, query_vector, generation, "".join(answer_parts), source_ids)
+    except Exception as graph_error:
+        # Fallback: direct retrieval without the full workflow, still streamed
+        yield sse_event("fallback", {"reason": str(graph_error)})
+        try:
+            retrieved_docs = await retriever_tool.ainvoke({"query": query})
+            simple_prompt = f"Based on this context, answer the question briefly:\n\nQuestion: {query}\n\nContext: {retrieved_docs}"
+            
+            async for chunk in llm.astream([{"role": "user", "content": simple_prompt}]):
+                if chunk.content:
+                    answer_parts.append(chunk.content)
+                    yield sse_event("token", {"content": chunk.content})
+        except Exception:
+            yield sse_event("error", {"detail": f"Both main workflow and fallback failed. Watsonx error: {str(graph_error)}"})
+            return
+    
+    if not answer_parts:
+        yield sse_event("error", {"detail": "No answer generated"})
+        return
+    
+    yield sse_event("done", {"success": True, "answer": "".join(answer_parts), "cached": False})
+
+@app.post("/search/stream")
+async def search_stream(request: SearchRequest):
+    """
+    Stream an Agentic RAG answer as Server-Sent Events
+    
+    Events: progress (node finished), grade (document relevance),
+    fallback, token (answer text as generated), done (full answer), error
+    """
+    if graph is None:
+        raise HTTPException(status_code=503, detail="Service not initialized")
+    
+    return StreamingResponse(
+        stream_search_events(request.query),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -234,42 +486,58 @@ async def health_check():
     # Check LLM
     try:
         if llm is not None:
-            test_response = llm.invoke([{"role": "user", "content": "test"}])
+            test_response = await llm.ainvoke([{"role": "user", "content": "test"}])
             status["watsonx"] = "healthy"
         else:
             status["watsonx"] = "not_initialized"
     except Exception as e:
         status["watsonx"] = f"error: {str(e)}"
     
-    # Check database
+    # Check database (checkout validates the pooled connection)
     try:
-        conn = get_db_connection()
-        conn.close()
+        await run_blocking(check_database)
         status["database"] = "healthy"
     except Exception as e:
         status["database"] = f"error: {str(e)}"
+    status["database_pools"] = all_pool_stats()
     
-    # Check embeddings
+    # Check embeddings (only reports on the resident model, never loads it)
     try:
-        embeddings = get_embeddings()
-        status["embeddings"] = "healthy"
+        if registry.is_loaded(get_embedding_model_path()):
+            status["embeddings"] = "healthy"
+        else:
+            status["embeddings"] = "not_loaded"
+        status["embedding_models"] = registry.stats()
+        status["embedding_services"] = all_service_stats()
+        status["embedding_cache"] = cache_stats()
     except Exception as e:
         status["embeddings"] = f"error: {str(e)}"
     
     # Overall status
-    if all("error" not in str(v) for v in status.values() if v != "Search API"):
+    if all("error" not in str(v) for k, v in status.items() if k not in ("service", "embedding_models", "embedding_services", "embedding_cache", "database_pools")):
         status["status"] = "healthy"
     else:
         status["status"] = "unhealthy"
     
     return status
 
+@app.get("/metrics")
+async def metrics():
+    """Cache, embedding and connection pool metrics"""
+    return {
+        "query_embedding_cache": query_cache.stats(),
+        "answer_cache": get_answer_cache().stats() if get_answer_cache() else None,
+        "embedding_cache": cache_stats(),
+        "embedding_services": all_service_stats(),
+        "database_pools": all_pool_stats()
+    }
+
 @app.get("/test-retrieval")
 async def test_retrieval():
     """Test document retrieval without full workflow"""
     try:
         test_query = "test query"
-        result = retriever_tool.invoke({"query": test_query})
+        result = await retriever_tool.ainvoke({"query": test_query})
         return {"success": True, "retrieved_docs": result}
     except Exception as e:
         return {"success": False, "error": str(e)}
@@ -0,0 +1,81 @@
+"""
+Tests for /search/stream event order, with a local fake chat model in place
+of Watsonx and a stubbed retriever in place of DB2.
+"""
+
+import asyncio
+import json
+import sys
+from itertools import chain, repeat
+from pathlib import Path
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import search_api
+
+ANSWER = "Db2 stores vectors in VECTOR columns."
+
+class FakeChatModel(GenericFakeChatModel):
+    """GenericFakeChatModel that accepts tools and grades every document relevant"""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def with_structured_output(self, schema, **kwargs):
+        return RunnableLambda(lambda _: schema(binary_score="yes"))
+
+def tool_call(query):
+    # OpenAI-style tool calls in additional_kwargs survive GenericFakeChatModel's streaming
+    return AIMessage(content="", additional_kwargs={"tool_calls": [{
+        "id": "call_1",
+        "type": "function",
+        "function": {"name": "retriever_tool", "arguments": json.dumps({"query": query})},
+    }]})
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+@pytest.fixture
+def fake_search(monkeypatch):
+    monkeypatch.setenv("ANSWER_CACHE_ENABLED", "false")
+    # No embedding model load or DB2 connections at startup
+    monkeypatch.setattr(search_api.registry, "warm_up", lambda path: None)
+    monkeypatch.setattr(search_api, "get_pool", lambda: type("Pool", (), {"prefill": lambda self: None})())
+    monkeypatch.setattr(
+        search_api, "retrieve_documents",
+        lambda query, table_name="AI_KNOWLEDGE", k=3: [Document(page_content="Db2 has a VECTOR type.", metadata={"id": "doc-1"})],
+    )
+    messages = chain([tool_call("vectors in db2"), AIMessage(content=ANSWER)], repeat(AIMessage(content="unused")))
+    search_api.initialize_components(chat_model=FakeChatModel(messages=messages))
+    yield
+    monkeypatch.setattr(search_api, "llm", None)
+    monkeypatch.setattr(search_api, "graph", None)
+
+async def collect(query):
+    return "".join([event async for event in search_api.stream_search_events(query)])
+
+def test_stream_emits_progress_grade_tokens_then_done(fake_search):
+    events = parse_events(asyncio.run(collect("How does Db2 store vectors?")))
+    kinds = [kind for kind, _ in events]
+
+    assert kinds.index("progress") < kinds.index("grade") < kinds.index("token") < kinds.index("done")
+    assert kinds[-1] == "done"
+    assert "fallback" not in kinds and "error" not in kinds
+
+    nodes = [data["node"] for kind, data in events if kind == "progress"]
+    assert nodes == ["generate_query_or_respond", "retrieve", "generate_answer"]
+    assert [data for kind, data in events if kind == "grade"] == [{"relevant": True}]
+
+    tokens = [data["content"] for kind, data in events if kind == "token"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == ANSWER
+    assert events[-1][1] == {"success": True, "answer": ANSWER, "cached": False}